@@ -0,0 +1 @@
+"""パフォーマンス計測用のベンチマーク群"""
@@ -0,0 +1,7 @@
+"""python -m benchmarks でベンチマークスイートを実行"""
+
+import sys
+
+from benchmarks.suite import main
+
+sys.exit(main())
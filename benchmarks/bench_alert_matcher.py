@@ -0,0 +1,73 @@
+"""
+警報タイプマッチングのマイクロベンチマーク
+
+変更前の線形探索と、Aho-Corasickによるマッチャー（メモ化なし/あり）を
+マッピングの大きさを変えて比較します。
+
+使い方:
+    python -m benchmarks.bench_alert_matcher
+"""
+
+import random
+import string
+import sys
+import timeit
+
+from weather_zip_lookup.services.alert_matcher import AlertTypeMatcher
+from weather_zip_lookup.services.weather_service import WeatherService
+
+
+def make_mapping(size: int, seed: int = 0) -> dict[str, str]:
+    """
+    既定のマッピングに合成キーを加えた大きなマッピングを生成
+    
+    Args:
+        size: 追加する合成キーの数
+        seed: 乱数シード
+        
+    Returns:
+        マッピング辞書
+    """
+    rng = random.Random(seed)
+    mapping = {}
+    while len(mapping) < size:
+        key = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14)))
+        mapping[f"{key} warning"] = f"合成{len(mapping)}"
+    mapping.update(WeatherService.ALERT_TYPE_MAPPING)
+    return mapping
+
+
+def linear_match(mapping: dict[str, str], event: str) -> str:
+    """変更前の実装（定義順の線形探索）"""
+    for key, value in mapping.items():
+        if key in event:
+            return value
+    return event.title()
+
+
+def main() -> int:
+    """ベンチマークを実行"""
+    events = [
+        'thunderstorm warning', 'heavy rain advisory', 'strong wind warning',
+        'dense fog advisory', 'high surf warning', 'flood watch',
+    ]
+    number = 2000
+    
+    print(f"{'mapping size':>12} {'linear':>12} {'matcher':>12} {'memoized':>12}  (µs/event)")
+    for size in (8, 100, 1000, 5000):
+        mapping = make_mapping(size)
+        matcher = AlertTypeMatcher(mapping)
+        
+        def run(func):
+            elapsed = timeit.timeit(lambda: [func(event) for event in events], number=number)
+            return elapsed / (number * len(events)) * 1e6
+        
+        linear = run(lambda event: linear_match(mapping, event))
+        compiled = run(matcher._map_event)
+        memoized = run(matcher.map_event)
+        print(f"{len(mapping):>12} {linear:>12.2f} {compiled:>12.2f} {memoized:>12.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
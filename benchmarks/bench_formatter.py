@@ -0,0 +1,85 @@
+"""
+OutputFormatterの描画スループットを計測するベンチマーク
+
+使い方:
+    python -m benchmarks.bench_formatter [レコード数]
+"""
+
+import io
+import random
+import sys
+import time
+
+from weather_zip_lookup.models import WeatherData, WeatherAlert
+from weather_zip_lookup.services import OutputFormatter
+
+
+def make_records(count: int, seed: int = 0) -> list[WeatherData]:
+    """
+    ベンチマーク用の天気データを生成
+    
+    Args:
+        count: レコード数
+        seed: 乱数シード
+        
+    Returns:
+        WeatherDataのリスト
+    """
+    rng = random.Random(seed)
+    alert = WeatherAlert(alert_type='大雨', description='大雨警報が発令されています', severity='Severe')
+    return [
+        WeatherData(
+            postal_code=f"{rng.randrange(10_000_000):07d}",
+            temperature=rng.uniform(-10, 40),
+            precipitation_probability=rng.uniform(0, 100),
+            alerts=[alert] if rng.random() < 0.1 else [],
+            location_name=rng.choice(['東京', '大阪', '札幌', '那覇', '千代田区'])
+        )
+        for _ in range(count)
+    ]
+
+
+def measure(label: str, func, count: int) -> float:
+    """
+    関数を実行して1秒あたりの行数を表示
+    
+    Args:
+        label: 表示名
+        func: 計測する関数
+        count: 処理するレコード数
+        
+    Returns:
+        1秒あたりの処理レコード数
+    """
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed
+    print(f"{label:<40} {rate:>12,.0f} rows/s  ({elapsed * 1000:.1f} ms)")
+    return rate
+
+
+def main() -> int:
+    """ベンチマークを実行"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+    formatter = OutputFormatter()
+    
+    def per_record():
+        stream = io.StringIO()
+        for record in records:
+            stream.write(formatter.format_weather_output(record) + "\n")
+    
+    def table(color):
+        return lambda: formatter.render_table(records, io.StringIO(), color=color)
+    
+    print(f"records: {count:,}")
+    baseline = measure("format_weather_output (per record)", per_record, count)
+    colored = measure("render_table (color)", table(True), count)
+    plain = measure("render_table (no color)", table(False), count)
+    print(f"speedup: color x{colored / baseline:.1f}, no color x{plain / baseline:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
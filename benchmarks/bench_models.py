@@ -0,0 +1,107 @@
+"""
+天気データモデルのメモリ使用量を計測するベンチマーク
+
+従来の（__dict__を持つ）データクラス、スロット付きのWeatherData、
+列指向のWeatherBatchについて、1レコードあたりのバイト数を比較します。
+
+使い方:
+    python -m benchmarks.bench_models [レコード数]
+"""
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from benchmarks.bench_formatter import make_records
+from weather_zip_lookup.models import WeatherAlert, WeatherBatch, WeatherData
+
+
+@dataclass
+class LegacyWeatherAlert:
+    """比較用: スロットなしの警報データクラス（変更前の定義）"""
+    alert_type: str
+    description: str
+    severity: str
+
+
+@dataclass
+class LegacyWeatherData:
+    """比較用: スロットなしの天気データクラス（変更前の定義）"""
+    postal_code: str
+    temperature: float
+    precipitation_probability: float
+    alerts: list
+    location_name: str
+
+
+def measure_bytes(build) -> int:
+    """
+    オブジェクト構築時に確保されたメモリ量を計測
+    
+    Args:
+        build: 計測対象のオブジェクトを作成して返す関数
+        
+    Returns:
+        確保されたバイト数
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main() -> int:
+    """ベンチマークを実行"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    # 実データと同様に、郵便番号・数値は毎回新しいオブジェクトとして作る
+    rows = [
+        (r.postal_code, r.temperature, r.precipitation_probability, r.location_name, bool(r.alerts))
+        for r in make_records(count)
+    ]
+    
+    def build_legacy():
+        return [
+            LegacyWeatherData(
+                postal_code=f"{int(code):07d}",
+                temperature=temp + 0.0,
+                precipitation_probability=precip + 0.0,
+                alerts=[LegacyWeatherAlert('大雨', '大雨警報', 'Severe')] if has_alert else [],
+                location_name=''.join(name)
+            )
+            for code, temp, precip, name, has_alert in rows
+        ]
+    
+    def build_slotted():
+        return [
+            WeatherData(
+                postal_code=f"{int(code):07d}",
+                temperature=temp + 0.0,
+                precipitation_probability=precip + 0.0,
+                alerts=[WeatherAlert('大雨', '大雨警報', 'Severe')] if has_alert else [],
+                location_name=''.join(name)
+            )
+            for code, temp, precip, name, has_alert in rows
+        ]
+    
+    # バッチは構築元のWeatherDataを保持しないため、変換後のサイズだけを計測
+    slotted_records = build_slotted()
+    
+    results = [
+        ("dataclass (__dict__)", measure_bytes(build_legacy)),
+        ("dataclass(slots=True)", measure_bytes(build_slotted)),
+        ("WeatherBatch (columnar)", measure_bytes(lambda: WeatherBatch(slotted_records))),
+    ]
+    
+    print(f"records: {count:,}")
+    for label, size in results:
+        print(f"{label:<28} {size / count:>8.1f} bytes/record  ({size / 1024 / 1024:.1f} MiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Flaskの /api/weather エンドポイントの負荷試験ハーネス
+
+create_app() で作成したアプリケーションをWerkzeugのスレッド付きサーバーで起動し、
+上流APIをスタブサーバーに向けた状態で、指定した並列数とリクエストの内訳
+（新規/繰り返しの郵便番号、無効な郵便番号、デフォルト郵便番号）で負荷をかけます。
+スループット、p50/p95/p99レイテンシ、エラー率、1リクエストあたりの上流呼び出し数を報告します。
+
+使い方:
+    python -m benchmarks.loadtest --concurrency 16 --duration 10
+    python -m benchmarks.loadtest --mix distinct=20,repeated=70,invalid=5,default=5 --latency lognormal:40,0.5
+    python -m benchmarks.loadtest --target http://127.0.0.1:8000 --upstream http://127.0.0.1:8081
+"""
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Optional
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.stub_server import LatencyDistribution, StubServer, StubServerConfig, parse_latency
+from weather_zip_lookup import create_app
+
+
+# リクエストの種類と既定の内訳（重み）
+REQUEST_KINDS = ('distinct', 'repeated', 'invalid', 'default')
+DEFAULT_MIX = {'distinct': 30, 'repeated': 60, 'invalid': 5, 'default': 5}
+
+# 繰り返しリクエストで使う郵便番号の数
+REPEATED_POOL_SIZE = 20
+
+# 無効な郵便番号の例
+INVALID_POSTAL_CODES = ('123', '12345678', 'abcdefg', '100-0001x')
+
+# アプリケーションのデフォルト郵便番号
+DEFAULT_POSTAL_CODE = '1000001'
+
+
+@dataclass
+class LoadTestResult:
+    """負荷試験の結果"""
+    duration: float
+    latencies: list = field(default_factory=list)  # 秒
+    statuses: Counter = field(default_factory=Counter)
+    kinds: Counter = field(default_factory=Counter)
+    failures: int = 0  # 接続エラーなどでレスポンスを受け取れなかった件数
+    upstream_calls: dict = field(default_factory=dict)
+    
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.failures
+    
+    def percentile(self, fraction: float) -> float:
+        """レイテンシのパーセンタイル（秒）"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    
+    def summary(self) -> dict:
+        """
+        結果を集計した辞書を返す
+        
+        Returns:
+            スループット、レイテンシ（ミリ秒）、エラー率、上流呼び出し数を含む辞書
+        """
+        total = self.requests
+        server_errors = sum(count for status, count in self.statuses.items() if status >= 500)
+        client_errors = sum(count for status, count in self.statuses.items() if 400 <= status < 500)
+        upstream_total = sum(self.upstream_calls.values())
+        return {
+            'requests': total,
+            'duration_sec': round(self.duration, 3),
+            'throughput_rps': round(total / self.duration, 1) if self.duration else 0.0,
+            'latency_ms': {
+                'p50': round(self.percentile(0.50) * 1000, 2),
+                'p95': round(self.percentile(0.95) * 1000, 2),
+                'p99': round(self.percentile(0.99) * 1000, 2),
+                'mean': round(statistics.fmean(self.latencies) * 1000, 2) if self.latencies else 0.0,
+                'max': round(max(self.latencies, default=0.0) * 1000, 2),
+            },
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'kinds': dict(self.kinds),
+            'error_rate': {
+                '4xx': round(client_errors / total, 4) if total else 0.0,
+                '5xx': round(server_errors / total, 4) if total else 0.0,
+                'failed': round(self.failures / total, 4) if total else 0.0,
+            },
+            'upstream_calls': self.upstream_calls,
+            'upstream_calls_per_request': round(upstream_total / total, 3) if total else 0.0,
+        }
+
+
+def parse_mix(spec: str) -> dict:
+    """
+    "distinct=30,repeated=60,invalid=5,default=5" 形式の内訳を解析
+    
+    Args:
+        spec: 種類=重み のカンマ区切り
+    
+    Returns:
+        種類 → 重み の辞書
+    
+    Raises:
+        argparse.ArgumentTypeError: 形式が不正な場合
+    """
+    mix = {}
+    for part in spec.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise argparse.ArgumentTypeError(f"未知のリクエスト種別です: {kind}（{', '.join(REQUEST_KINDS)}）")
+        try:
+            mix[kind] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"重みは数値で指定してください: {part}")
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("重みの合計は正の値にしてください")
+    return mix
+
+
+class RequestGenerator:
+    """内訳に従ってリクエストの郵便番号を生成する（スレッドセーフ）"""
+    
+    def __init__(self, mix: dict, seed: Optional[int] = None):
+        self._kinds = list(mix)
+        self._weights = [mix[kind] for kind in self._kinds]
+        self._rng = random.Random(seed)
+        self._distinct = count(2_000_000)
+        self._repeated = [f"{1_000_000 + number * 1111:07d}" for number in range(REPEATED_POOL_SIZE)]
+        self._lock = threading.Lock()
+    
+    def next(self) -> tuple[str, str]:
+        """
+        次のリクエストを生成
+        
+        Returns:
+            (種類, 郵便番号)。defaultの場合は郵便番号は空文字列
+        """
+        with self._lock:
+            kind = self._rng.choices(self._kinds, self._weights)[0]
+            if kind == 'distinct':
+                return kind, f"{next(self._distinct) % 10_000_000:07d}"
+            if kind == 'repeated':
+                return kind, self._rng.choice(self._repeated)
+            if kind == 'invalid':
+                return kind, self._rng.choice(INVALID_POSTAL_CODES)
+            return kind, ''
+
+
+def run_load(target: str, generator: RequestGenerator, concurrency: int,
+             duration: Optional[float] = None, total_requests: Optional[int] = None) -> LoadTestResult:
+    """
+    対象URLに負荷をかける
+    
+    Args:
+        target: アプリケーションのベースURL
+        generator: リクエストの生成器
+        concurrency: 並列数（クライアントスレッド数）
+        duration: 実行時間（秒）
+        total_requests: 送信するリクエスト数（durationより優先）
+    
+    Returns:
+        LoadTestResult
+    """
+    url = f"{target.rstrip('/')}/api/weather"
+    lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    kinds = Counter()
+    failures = 0
+    issued = count()
+    deadline = None
+    
+    def should_continue() -> bool:
+        if total_requests is not None:
+            return next(issued) < total_requests
+        return time.perf_counter() < deadline
+    
+    def worker() -> None:
+        nonlocal failures
+        session = requests.Session()
+        # 負荷生成側のオーバーヘッド（プロキシ設定の走査）を減らす
+        session.trust_env = False
+        local_latencies = []
+        local_statuses = Counter()
+        local_kinds = Counter()
+        local_failures = 0
+        while should_continue():
+            kind, postal_code = generator.next()
+            started = time.perf_counter()
+            try:
+                response = session.post(url, json={'postal_code': postal_code}, timeout=30)
+                response.content
+            except requests.RequestException:
+                local_failures += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[response.status_code] += 1
+            local_kinds[kind] += 1
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            kinds.update(local_kinds)
+            failures += local_failures
+    
+    started = time.perf_counter()
+    deadline = started + (duration if duration is not None else 10.0)
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    return LoadTestResult(duration=elapsed, latencies=latencies, statuses=statuses, kinds=kinds, failures=failures)
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    """アクセスログを出力しないリクエストハンドラー"""
+    
+    def log_request(self, *args, **kwargs) -> None:
+        pass
+
+
+class AppServer:
+    """create_app() で作成したアプリケーションをバックグラウンドのWerkzeugサーバーで起動"""
+    
+    def __init__(self, upstream: str, host: str = '127.0.0.1', port: int = 0):
+        app = create_app({
+            'OPENWEATHER_API_KEY': 'loadtest_api_key',
+            'OPENWEATHER_BASE_URL': upstream,
+            'DEFAULT_POSTAL_CODE': DEFAULT_POSTAL_CODE,
+            'TESTING': True,
+        })
+        self._server = make_server(host, port, app, threaded=True, request_handler=_QuietRequestHandler)
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self._server.host}:{self._server.port}"
+    
+    def __enter__(self) -> 'AppServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._thread.join()
+        self._server.server_close()
+
+
+def _fetch_upstream_stats(upstream: str) -> dict:
+    try:
+        return requests.get(f"{upstream.rstrip('/')}/__stats", timeout=5).json().get('calls', {})
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def _reset_upstream_stats(upstream: str) -> None:
+    try:
+        requests.post(f"{upstream.rstrip('/')}/__reset", timeout=5)
+    except requests.RequestException:
+        pass
+
+
+def print_report(summary: dict) -> None:
+    """集計結果を表形式で出力"""
+    latency = summary['latency_ms']
+    errors = summary['error_rate']
+    print(f"リクエスト数:       {summary['requests']}（{summary['duration_sec']:.1f}秒）")
+    print(f"スループット:       {summary['throughput_rps']:,.1f} req/s")
+    print(f"レイテンシ(ms):     p50={latency['p50']}  p95={latency['p95']}  p99={latency['p99']}  max={latency['max']}")
+    print(f"ステータス:         {summary['statuses']}")
+    print(f"エラー率:           4xx={errors['4xx']:.2%}  5xx={errors['5xx']:.2%}  接続失敗={errors['failed']:.2%}")
+    print(f"上流呼び出し:       {summary['upstream_calls']}（{summary['upstream_calls_per_request']} 回/リクエスト）")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """負荷試験を実行"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description='/api/weather の負荷試験')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='並列数')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='実行時間（秒）')
+    parser.add_argument('-n', '--requests', type=int, help='送信するリクエスト数（指定時は--durationより優先）')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='リクエストの内訳（例: distinct=30,repeated=60,invalid=5,default=5）')
+    parser.add_argument('--target', help='既に起動しているアプリケーションのURL（省略時はcreate_app()を起動）')
+    parser.add_argument('--upstream', help='既に起動しているスタブサーバーのURL（省略時はプロセス内で起動）')
+    parser.add_argument('--latency', type=parse_latency, default=LatencyDistribution.parse('fixed:20'),
+                        help='プロセス内スタブサーバーの遅延分布')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='プロセス内スタブサーバーが429を返す割合')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='プロセス内スタブサーバーが5xxを返す割合')
+    parser.add_argument('--seed', type=int, default=0, help='乱数のシード')
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    args = parser.parse_args(argv)
+    
+    if args.target and not args.upstream:
+        parser.error('--target を指定する場合は、アプリケーションが使用している --upstream も指定してください')
+    
+    generator = RequestGenerator(args.mix, seed=args.seed)
+    stub = None
+    if args.upstream:
+        upstream = args.upstream
+    else:
+        stub = StubServer(StubServerConfig(
+            latency=args.latency, rate_429=args.rate_429, rate_5xx=args.rate_5xx, seed=args.seed
+        )).start()
+        upstream = stub.base_url
+    
+    try:
+        _reset_upstream_stats(upstream)
+        if args.target:
+            result = run_load(args.target, generator, args.concurrency, args.duration, args.requests)
+        else:
+            with AppServer(upstream) as app_server:
+                result = run_load(app_server.base_url, generator, args.concurrency, args.duration, args.requests)
+        result.upstream_calls = _fetch_upstream_stats(upstream)
+    finally:
+        if stub is not None:
+            stub.stop()
+    
+    summary = result.summary()
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_report(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
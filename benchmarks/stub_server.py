@@ -0,0 +1,389 @@
+"""
+OpenWeatherMap APIを模擬するローカルスタブサーバー
+
+WeatherServiceが使う geo/1.0/zip、data/2.5/weather、data/3.0/onecall を実装し、
+レイテンシの分布、429/5xxエラーの注入率、ペイロードサイズを設定できます。
+ネットワークを含めた性能をオフラインで再現性よく計測するために使います。
+
+使い方:
+    python -m benchmarks.stub_server --port 8081 --latency lognormal:40,0.5 --rate-429 0.01
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8081 weather-zip-lookup 1000001
+
+エンドポイントごとの呼び出し回数は GET /__stats で取得、POST /__reset でリセットできます。
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+# エンドポイントのパスと短い名前の対応
+ENDPOINTS = {
+    '/geo/1.0/zip': 'geocode',
+    '/data/2.5/weather': 'weather',
+    '/data/3.0/onecall': 'onecall',
+}
+
+# この接頭辞で始まる郵便番号は存在しないもの（404）として扱う
+NOT_FOUND_PREFIX = '000'
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """
+    レスポンスを返すまでの遅延の分布（ミリ秒）
+    
+    kind ごとのパラメータ:
+        fixed: a=遅延
+        uniform: a=最小, b=最大
+        normal: a=平均, b=標準偏差
+        lognormal: a=中央値, b=対数の標準偏差
+        exp: a=平均
+    """
+    kind: str = 'fixed'
+    a: float = 0.0
+    b: float = 0.0
+    
+    KINDS = ('fixed', 'uniform', 'normal', 'lognormal', 'exp')
+    
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyDistribution':
+        """
+        "lognormal:40,0.5" 形式の文字列から分布を作成
+        
+        Args:
+            spec: 分布名とパラメータ（カンマ区切り）
+        
+        Returns:
+            LatencyDistribution
+        
+        Raises:
+            ValueError: 分布名やパラメータが不正な場合
+        """
+        kind, _, params = spec.partition(':')
+        if kind not in cls.KINDS:
+            raise ValueError(f"未知のレイテンシ分布です: {kind}（{', '.join(cls.KINDS)}）")
+        values = [float(value) for value in params.split(',') if value] if params else []
+        if kind == 'fixed' and not values:
+            values = [0.0]
+        if len(values) > 2 or (kind in ('uniform', 'normal', 'lognormal') and len(values) != 2):
+            raise ValueError(f"レイテンシ分布のパラメータが不正です: {spec}")
+        return cls(kind, *values)
+    
+    def sample(self, rng: random.Random) -> float:
+        """
+        遅延を1つサンプリング
+        
+        Args:
+            rng: 乱数生成器
+        
+        Returns:
+            遅延（秒）
+        """
+        if self.kind == 'fixed':
+            millis = self.a
+        elif self.kind == 'uniform':
+            millis = rng.uniform(self.a, self.b)
+        elif self.kind == 'normal':
+            millis = rng.gauss(self.a, self.b)
+        elif self.kind == 'lognormal':
+            millis = rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        else:
+            millis = rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        return max(0.0, millis) / 1000
+
+
+@dataclass
+class StubServerConfig:
+    """スタブサーバーの動作設定"""
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    endpoint_latency: dict = field(default_factory=dict)  # エンドポイント名 → LatencyDistribution
+    rate_429: float = 0.0  # 429を返す割合
+    rate_5xx: float = 0.0  # 500/502/503を返す割合
+    hourly_entries: int = 48  # One Call の hourly の件数
+    alerts: int = 1  # One Call の alerts の件数
+    padding_bytes: int = 0  # One Call のレスポンスに追加するダミーデータのバイト数
+    seed: Optional[int] = None
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """OpenWeatherMapのエンドポイントを模擬するハンドラー"""
+    
+    # キープアライブを有効にし、クライアントの接続プールが実際と同じように働くようにする
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別々に送るため、Nagleアルゴリズムと遅延ACKで約40msの遅延が入るのを防ぐ
+    disable_nagle_algorithm = True
+    server: 'StubServer'
+    
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == '/__stats':
+            self._send_json(200, self.server.stats())
+            return
+        
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            self._send_json(404, {'cod': '404', 'message': 'Internal error'})
+            return
+        
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, body = self.server.respond(endpoint, params)
+        self._send_json(status, body)
+    
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path == '/__reset':
+            self.server.reset_stats()
+            self._send_json(200, {})
+        else:
+            self._send_json(404, {'cod': '404', 'message': 'Internal error'})
+    
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    OpenWeatherMap APIのスタブサーバー
+    
+    テストやベンチマークからはコンテキストマネージャーとして使えます:
+        
+        with StubServer(StubServerConfig(latency=LatencyDistribution.parse('fixed:20'))) as server:
+            service = WeatherService(api_key, base_url=server.base_url)
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, config: Optional[StubServerConfig] = None, host: str = '127.0.0.1', port: int = 0,
+                 verbose: bool = False):
+        """
+        Args:
+            config: 動作設定（省略時は遅延・エラーなし）
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0の場合は空いているポートを使用）
+            verbose: アクセスログを出力するかどうか
+        """
+        super().__init__((host, port), _StubRequestHandler)
+        self.config = config if config is not None else StubServerConfig()
+        self.verbose = verbose
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._calls = Counter()
+        self._statuses = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._padding = 'x' * self.config.padding_bytes
+    
+    @property
+    def base_url(self) -> str:
+        """WeatherServiceのbase_urlに指定するURL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def respond(self, endpoint: str, params: dict) -> tuple[int, dict]:
+        """
+        エンドポイントへのリクエストに対するステータスとレスポンスを決定
+        
+        遅延の待機もここで行います。
+        
+        Args:
+            endpoint: エンドポイント名（geocode/weather/onecall）
+            params: クエリパラメータ
+        
+        Returns:
+            (HTTPステータス, レスポンス辞書)
+        """
+        config = self.config
+        with self._lock:
+            # 乱数生成器はスレッドセーフでないため、サンプリングはロック内で行う
+            delay = config.endpoint_latency.get(endpoint, config.latency).sample(self._rng)
+            roll = self._rng.random()
+            server_error = self._rng.choice((500, 502, 503))
+        
+        time.sleep(delay)
+        
+        if not params.get('appid'):
+            status, body = 401, {'cod': 401, 'message': 'Invalid API key.'}
+        elif roll < config.rate_429:
+            status, body = 429, {'cod': 429, 'message': 'Your account is temporary blocked due to exceeding of requests limitation.'}
+        elif roll < config.rate_429 + config.rate_5xx:
+            status, body = server_error, {'cod': server_error, 'message': 'Internal error'}
+        else:
+            status, body = getattr(self, f'_{endpoint}')(params)
+        
+        with self._lock:
+            self._calls[endpoint] += 1
+            self._statuses[status] += 1
+        return status, body
+    
+    def _geocode(self, params: dict) -> tuple[int, dict]:
+        postal_code = params.get('zip', '').split(',')[0]
+        if not postal_code.isdigit() or postal_code.startswith(NOT_FOUND_PREFIX):
+            return 404, {'cod': '404', 'message': 'not found'}
+        # 郵便番号から決定的に座標を作る（日本の範囲内）
+        number = int(postal_code)
+        return 200, {
+            'zip': postal_code,
+            'name': f'地域{postal_code[:3]}',
+            'lat': round(30.0 + (number % 15000) / 1000, 4),
+            'lon': round(130.0 + (number // 15000 % 15000) / 1000, 4),
+            'country': 'JP',
+        }
+    
+    def _weather(self, params: dict) -> tuple[int, dict]:
+        lat = float(params.get('lat', 35.0))
+        return 200, {
+            'weather': [{'id': 803, 'main': 'Clouds', 'description': '曇りがち'}],
+            'main': {'temp': round(35.0 - (lat - 30.0) * 1.5, 2), 'humidity': 60},
+            'name': 'Stub',
+        }
+    
+    def _onecall(self, params: dict) -> tuple[int, dict]:
+        now = int(time.time()) // 3600 * 3600
+        body = {
+            'lat': float(params.get('lat', 35.0)),
+            'lon': float(params.get('lon', 139.0)),
+            'timezone': 'Asia/Tokyo',
+            'hourly': [
+                {'dt': now + hour * 3600, 'temp': 20.0 + hour % 6, 'pop': round((hour % 10) / 10, 1)}
+                for hour in range(self.config.hourly_entries)
+            ],
+        }
+        if self.config.alerts:
+            body['alerts'] = [
+                {
+                    'sender_name': 'Japan Meteorological Agency',
+                    'event': 'Heavy rain warning',
+                    'start': now,
+                    'end': now + 6 * 3600,
+                    'description': '大雨警報が発令されています',
+                    'tags': ['Rain'],
+                }
+                for _ in range(self.config.alerts)
+            ]
+        if self._padding:
+            body['padding'] = self._padding
+        return 200, body
+    
+    def stats(self) -> dict:
+        """
+        エンドポイントごとの呼び出し回数とステータスごとの件数を取得
+        
+        Returns:
+            {'calls': {...}, 'statuses': {...}}
+        """
+        with self._lock:
+            return {
+                'calls': dict(self._calls),
+                'statuses': {str(status): count for status, count in self._statuses.items()},
+            }
+    
+    def reset_stats(self) -> None:
+        """呼び出し回数をリセット"""
+        with self._lock:
+            self._calls.clear()
+            self._statuses.clear()
+    
+    def start(self) -> 'StubServer':
+        """バックグラウンドスレッドでサーバーを起動"""
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """サーバーを停止"""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+    
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def _parse_endpoint_latency(spec: str) -> tuple[str, LatencyDistribution]:
+    name, _, distribution = spec.partition('=')
+    if name not in ENDPOINTS.values():
+        raise argparse.ArgumentTypeError(f"未知のエンドポイントです: {name}（{', '.join(ENDPOINTS.values())}）")
+    try:
+        return name, LatencyDistribution.parse(distribution)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_latency(spec: str) -> LatencyDistribution:
+    try:
+        return LatencyDistribution.parse(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """スタブサーバーのコマンドライン引数パーサーを作成"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.stub_server', description='OpenWeatherMap APIのスタブサーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス')
+    parser.add_argument('--port', type=int, default=8081, help='待ち受けるポート')
+    parser.add_argument('--latency', type=parse_latency, default=LatencyDistribution(),
+                        help='全エンドポイントの遅延分布（例: fixed:20, uniform:10,50, lognormal:40,0.5, exp:30）')
+    parser.add_argument('--endpoint-latency', type=_parse_endpoint_latency, action='append', default=[],
+                        metavar='NAME=DIST', help='エンドポイントごとの遅延分布（例: onecall=lognormal:80,0.5）')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='429を返す割合（0〜1）')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='5xxを返す割合（0〜1）')
+    parser.add_argument('--hourly', type=int, default=48, help='One Call の hourly の件数')
+    parser.add_argument('--alerts', type=int, default=1, help='One Call の alerts の件数')
+    parser.add_argument('--padding', type=int, default=0, help='One Call のレスポンスに追加するバイト数')
+    parser.add_argument('--seed', type=int, help='乱数のシード（遅延とエラー注入を再現する）')
+    parser.add_argument('-v', '--verbose', action='store_true', help='アクセスログを出力')
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> StubServerConfig:
+    """コマンドライン引数から動作設定を作成"""
+    return StubServerConfig(
+        latency=args.latency,
+        endpoint_latency=dict(args.endpoint_latency),
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        hourly_entries=args.hourly,
+        alerts=args.alerts,
+        padding_bytes=args.padding,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """スタブサーバーを起動し、Ctrl+Cで停止するまで待ち受ける"""
+    args = build_parser().parse_args(argv)
+    server = StubServer(config_from_args(args), host=args.host, port=args.port, verbose=args.verbose)
+    print(f"スタブサーバーを起動しました: {server.base_url}")
+    print(f"OPENWEATHER_BASE_URL={server.base_url} を設定して使用してください")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
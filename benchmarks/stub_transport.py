@@ -0,0 +1,81 @@
+"""
+OpenWeatherMap APIを模擬するrequests用トランスポートアダプター
+
+ネットワークを使わずにWeatherServiceの処理コストだけを計測するため、
+WeatherServiceに渡すSessionにマウントして使います。
+"""
+
+import json
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+
+# 模擬レスポンス
+GEOCODING_RESPONSE = {'zip': '1000001', 'name': '千代田区', 'lat': 35.6895, 'lon': 139.6917, 'country': 'JP'}
+CURRENT_WEATHER_RESPONSE = {'main': {'temp': 22.5, 'humidity': 60}, 'weather': [{'main': 'Clouds'}], 'name': 'Tokyo'}
+ONE_CALL_RESPONSE = {
+    'hourly': [{'dt': 1_700_000_000 + hour * 3600, 'temp': 20.0 + hour % 5, 'pop': 0.45} for hour in range(48)],
+    'alerts': [
+        {'event': 'Heavy rain warning', 'description': '大雨警報が発令されています', 'tags': ['Rain']},
+    ],
+}
+
+
+class StubTransport(BaseAdapter):
+    """パスに応じて固定のJSONを返すアダプター"""
+    
+    def __init__(self, responses: dict = None):
+        """
+        Args:
+            responses: パスの末尾 → レスポンス辞書 の対応（省略時は既定の模擬レスポンス）
+        """
+        super().__init__()
+        self.responses = responses if responses is not None else {
+            '/geo/1.0/zip': GEOCODING_RESPONSE,
+            '/data/2.5/weather': CURRENT_WEATHER_RESPONSE,
+            '/data/3.0/onecall': ONE_CALL_RESPONSE,
+        }
+        # JSONのエンコードはリクエストごとに行わず事前に済ませておく
+        self._bodies = {path: json.dumps(body).encode('utf-8') for path, body in self.responses.items()}
+        self.calls = Counter()
+    
+    def send(self, request, **kwargs):
+        path = urlsplit(request.url).path
+        self.calls[path] += 1
+        
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        body = self._bodies.get(path)
+        if body is None:
+            response.status_code = 404
+            response._content = b'{"message": "not found"}'
+        else:
+            response.status_code = 200
+            response._content = body
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        return response
+    
+    def close(self):
+        pass
+
+
+def create_stub_session(transport: StubTransport = None) -> requests.Session:
+    """
+    StubTransportをマウントしたSessionを作成
+    
+    Args:
+        transport: 使用するアダプター（省略時は新規作成）
+        
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    adapter = transport if transport is not None else StubTransport()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,397 @@
+"""
+サービス・フォーマッター・モデルのマイクロベンチマークスイート
+
+上流APIはStubTransportで置き換え、ネットワークを除いた処理コストを計測します。
+結果はJSONのベースラインとして保存でき、ベースラインと比較して
+しきい値を超えて遅くなったケースがあれば終了コード1で失敗します。
+
+使い方:
+    python -m benchmarks --save-baseline            # ベースラインを保存
+    python -m benchmarks --compare                  # ベースラインと比較
+    python -m benchmarks --compare --threshold 0.1  # 10%以上の劣化で失敗
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from benchmarks.stub_transport import create_stub_session
+from weather_zip_lookup.models import WeatherData, WeatherAlert
+from weather_zip_lookup.services import OutputFormatter, PostalIndex, Timings, TTLCache, WeatherService
+
+
+# ベースラインの既定の保存先
+DEFAULT_BASELINE_PATH = Path(__file__).parent / 'results' / 'baseline.json'
+
+# 劣化とみなす既定のしきい値（最小値の増加率）
+DEFAULT_THRESHOLD = 0.25
+
+# 1バッチの最小実行時間（秒）とバッチ数
+MIN_BATCH_TIME = 0.005
+BATCHES = 30
+
+
+@dataclass
+class BenchmarkCase:
+    """ベンチマークケースの定義"""
+    name: str
+    description: str
+    setup: Callable[[], Callable[[], Any]]  # 計測対象の処理を返す関数
+    items_per_op: int = 1  # 1回の処理で扱う件数（スループット計算用）
+
+
+def _make_service(**kwargs) -> WeatherService:
+    """StubTransportを使うWeatherServiceを作成"""
+    return WeatherService("bench_api_key", session=create_stub_session(), **kwargs)
+
+
+def _postal_codes():
+    """重複しない郵便番号を無限に生成"""
+    number = 0
+    while True:
+        yield f"{number % 10_000_000:07d}"
+        number += 1
+
+
+def _setup_lookup_cold():
+    # キャッシュが効かないよう毎回異なる郵便番号を使う
+    service = _make_service(geocode_cache=TTLCache(maxsize=0))
+    codes = _postal_codes()
+    return lambda: service.get_weather_by_postal_code(next(codes))
+
+
+def _setup_lookup_cached():
+    service = _make_service(weather_cache=TTLCache(ttl=3600))
+    service.get_weather_by_postal_code("1000001")
+    return lambda: service.get_weather_by_postal_code("1000001")
+
+
+THROUGHPUT_BATCH = 64
+THROUGHPUT_WORKERS = 8
+
+
+def _setup_lookup_throughput():
+    service = _make_service(geocode_cache=TTLCache(maxsize=0), pool_size=THROUGHPUT_WORKERS)
+    executor = ThreadPoolExecutor(max_workers=THROUGHPUT_WORKERS)
+    codes = _postal_codes()
+    
+    def run():
+        batch = [next(codes) for _ in range(THROUGHPUT_BATCH)]
+        return list(executor.map(service.get_weather_by_postal_code, batch))
+    
+    return run
+
+
+def _setup_validate():
+    service = WeatherService("bench_api_key")
+    return lambda: service._validate_postal_code("1000001")
+
+
+def _setup_map_alert_type():
+    service = WeatherService("bench_api_key")
+    events = ['thunderstorm warning', 'heavy rain advisory', 'dense fog', 'flood watch']
+    return lambda: [service._map_alert_type(event) for event in events]
+
+
+def _setup_map_alert_type_uncached():
+    matcher = WeatherService._get_alert_type_matcher()
+    events = ['thunderstorm warning', 'heavy rain advisory', 'dense fog', 'flood watch']
+    return lambda: [matcher._map_event(event) for event in events]
+
+
+def _sample_weather_data() -> WeatherData:
+    return WeatherData(
+        postal_code="1000001",
+        temperature=22.5,
+        precipitation_probability=45.0,
+        alerts=[WeatherAlert(alert_type='大雨', description='大雨警報が発令されています', severity='Severe')],
+        location_name='千代田区'
+    )
+
+
+def _setup_format_output():
+    formatter = OutputFormatter()
+    weather_data = _sample_weather_data()
+    return lambda: formatter.format_weather_output(weather_data)
+
+
+def _setup_construct():
+    alerts = [WeatherAlert(alert_type='大雨', description='大雨警報', severity='Severe')]
+    return lambda: WeatherData(
+        postal_code="1000001",
+        temperature=22.5,
+        precipitation_probability=45.0,
+        alerts=alerts,
+        location_name='千代田区'
+    )
+
+
+def _setup_postal_index_search():
+    # 全国の郵便番号（約12万件）と同程度の件数のインデックス
+    index = PostalIndex((f"{number * 83:07d}", f"地名{number % 2000}") for number in range(120_000))
+    return lambda: index.search('123', limit=10)
+
+
+def _weather_request_context(weather_cache_ttl: float = 300):
+    """/api/weather（gzipを受け付けるクライアント）のリクエストコンテキストを開始"""
+    from weather_zip_lookup import create_app
+    from weather_zip_lookup.routes.main import get_weather_service
+    
+    app = create_app({
+        'TESTING': True,
+        'OPENWEATHER_API_KEY': 'bench_api_key',
+        'WEATHER_CACHE_TTL': weather_cache_ttl
+    })
+    context = app.test_request_context('/api/weather', method='POST', headers={'Accept-Encoding': 'gzip'})
+    context.push()
+    return get_weather_service()
+
+
+def _alerting_weather_data() -> WeatherData:
+    # 警報が発令中の地域（上流APIの警報の説明文は数百文字になる）
+    description = '気象庁は大雨警報を発表しました。土砂災害、浸水害、河川の増水に警戒してください。' * 4
+    return WeatherData(
+        postal_code="1000001",
+        temperature=22.5,
+        precipitation_probability=80.0,
+        alerts=[
+            WeatherAlert(alert_type=alert_type, description=description, severity='Severe')
+            for alert_type in ('大雨', '洪水', '雷')
+        ],
+        location_name='千代田区'
+    )
+
+
+def _setup_weather_jsonify():
+    # エンコード済みのレスポンスをキャッシュする前の処理（毎回jsonifyする）
+    from flask import jsonify
+    
+    _weather_request_context()
+    weather_data = _alerting_weather_data()
+    
+    def run():
+        with Timings().span('serialize'):
+            return jsonify({'success': True, 'data': weather_data.to_dict()})
+    
+    return run
+
+
+def _setup_weather_response_uncached():
+    from weather_zip_lookup.routes.main import weather_response
+    
+    _weather_request_context(weather_cache_ttl=0)
+    weather_data = _alerting_weather_data()
+    return lambda: weather_response('1000001', weather_data, Timings())
+
+
+def _setup_weather_response_miss():
+    from flask import current_app
+    from weather_zip_lookup.routes.main import weather_response
+    
+    service = _weather_request_context()
+    weather_data = _alerting_weather_data()
+    service.weather_cache.set('1000001', weather_data)
+    response_cache = current_app.extensions['response_cache']
+    
+    def run():
+        response_cache.delete('1000001')
+        return weather_response('1000001', weather_data, Timings())
+    
+    return run
+
+
+def _setup_weather_response_hit():
+    from weather_zip_lookup.routes.main import weather_response
+    
+    service = _weather_request_context()
+    weather_data = _alerting_weather_data()
+    service.weather_cache.set('1000001', weather_data)
+    weather_response('1000001', weather_data, Timings())
+    return lambda: weather_response('1000001', weather_data, Timings())
+
+
+CASES = [
+    BenchmarkCase('service.lookup_cold', 'get_weather_by_postal_code（キャッシュなし、スタブ上流）', _setup_lookup_cold),
+    BenchmarkCase('service.lookup_cached', 'get_weather_by_postal_code（天気キャッシュヒット）', _setup_lookup_cached),
+    BenchmarkCase(
+        'service.lookup_throughput',
+        f'get_weather_by_postal_code を{THROUGHPUT_WORKERS}並列で{THROUGHPUT_BATCH}件',
+        _setup_lookup_throughput,
+        items_per_op=THROUGHPUT_BATCH
+    ),
+    BenchmarkCase('service.validate_postal_code', '_validate_postal_code', _setup_validate),
+    BenchmarkCase('service.map_alert_type', '_map_alert_type（4イベント、メモ化あり）', _setup_map_alert_type, items_per_op=4),
+    BenchmarkCase(
+        'service.map_alert_type_uncached',
+        'AlertTypeMatcher（4イベント、メモ化なし）',
+        _setup_map_alert_type_uncached,
+        items_per_op=4
+    ),
+    BenchmarkCase('formatter.format_weather_output', 'OutputFormatter.format_weather_output', _setup_format_output),
+    BenchmarkCase('models.weather_data_construction', 'WeatherDataの構築', _setup_construct),
+    BenchmarkCase('postal_index.search', 'PostalIndex.search（12万件から前方一致で10件）', _setup_postal_index_search),
+    BenchmarkCase('routes.weather_jsonify', '/api/weather のレスポンスをjsonifyで構築（警報3件）', _setup_weather_jsonify),
+    BenchmarkCase(
+        'routes.weather_response_uncached',
+        '/api/weather のレスポンス（警報3件、天気データのキャッシュが無効でjsonify）',
+        _setup_weather_response_uncached
+    ),
+    BenchmarkCase(
+        'routes.weather_response_miss',
+        '/api/weather のレスポンス（警報3件をJSONにエンコードしてキャッシュし、gzipで返す）',
+        _setup_weather_response_miss
+    ),
+    BenchmarkCase(
+        'routes.weather_response_hit',
+        '/api/weather のレスポンス（警報3件、エンコード済みのgzipをそのまま返す）',
+        _setup_weather_response_hit
+    ),
+]
+
+
+def run_case(case: BenchmarkCase, batches: int = BATCHES) -> dict:
+    """
+    ベンチマークケースを実行して統計値を返す
+    
+    1回の処理時間がMIN_BATCH_TIME以上になるよう繰り返し回数を調整したバッチを
+    batches回実行し、バッチごとの1件あたりの時間から統計値を求めます。
+    
+    Args:
+        case: ベンチマークケース
+        batches: バッチ数
+        
+    Returns:
+        最小/p50/p95/平均（マイクロ秒/件）とスループット（件/秒）を含む辞書
+    """
+    op = case.setup()
+    
+    # ウォームアップと繰り返し回数の調整
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            op()
+        if time.perf_counter() - started >= MIN_BATCH_TIME:
+            break
+        iterations *= 2
+    
+    samples = []
+    for _ in range(batches):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            op()
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed / (iterations * case.items_per_op) * 1e6)
+    
+    samples.sort()
+    p50 = statistics.median(samples)
+    return {
+        'min_us': samples[0],
+        'p50_us': p50,
+        'p95_us': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'mean_us': statistics.fmean(samples),
+        'throughput_per_sec': 1e6 / p50,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    ベースラインと比較して劣化したケースを列挙
+    
+    ノイズの影響を受けにくいよう、バッチごとの最小値同士を比較します。
+    
+    Args:
+        results: 今回の結果（ケース名 → 統計値）
+        baseline: ベースラインの結果
+        threshold: 劣化とみなす最小値の増加率
+        
+    Returns:
+        劣化したケースの説明のリスト
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = current['min_us'] / previous['min_us'] - 1
+        if ratio > threshold:
+            regressions.append(
+                f"{name}: {previous['min_us']:.2f}µs → {current['min_us']:.2f}µs (+{ratio:.0%})"
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    ベンチマークスイートを実行
+    
+    Args:
+        argv: コマンドライン引数（省略時はsys.argv）
+        
+    Returns:
+        終了コード（0: 成功、1: 劣化を検出）
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='マイクロベンチマークスイート')
+    parser.add_argument('-k', '--filter', default='', help='名前にこの文字列を含むケースだけを実行')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE_PATH, help='ベースラインファイルのパス')
+    parser.add_argument('--save-baseline', action='store_true', help='結果をベースラインとして保存')
+    parser.add_argument('--compare', action='store_true', help='ベースラインと比較し、劣化があれば失敗')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='劣化とみなす最小値の増加率')
+    parser.add_argument('--output', type=Path, help='結果をJSONで保存するパス')
+    args = parser.parse_args(argv)
+    
+    results = {}
+    print(f"{'case':<36} {'min µs':>10} {'p50 µs':>10} {'p95 µs':>10} {'ops/s':>14}")
+    for case in CASES:
+        if args.filter not in case.name:
+            continue
+        stats = run_case(case)
+        results[case.name] = stats
+        print(f"{case.name:<36} {stats['min_us']:>10.2f} {stats['p50_us']:>10.2f} {stats['p95_us']:>10.2f} {stats['throughput_per_sec']:>14,.0f}")
+    
+    document = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(document, indent=2), encoding='utf-8')
+    
+    exit_code = 0
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"ベースラインがありません: {args.baseline}")
+            return 1
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{args.threshold:.0%}を超える劣化を検出しました:")
+            for line in regressions:
+                print(f"  {line}")
+            exit_code = 1
+        else:
+            print(f"\n劣化なし（しきい値 {args.threshold:.0%}）")
+    
+    if args.save_baseline:
+        if args.baseline.exists():
+            # 一部のケースだけを実行した場合も他のケースの値は残す
+            previous = json.loads(args.baseline.read_text(encoding='utf-8'))
+            document['results'] = {**previous.get('results', {}), **results}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(document, indent=2), encoding='utf-8')
+        print(f"ベースラインを保存しました: {args.baseline}")
+    
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""テスト全体で共有するフィクスチャ"""
+
+import pytest
+
+from weather_zip_lookup.metrics import upstream_request_counts
+
+
+@pytest.fixture(autouse=True)
+def isolated_cli_state(tmp_path, monkeypatch):
+    """CLIの永続キャッシュとデーモンソケットをテストごとの一時ディレクトリに隔離"""
+    from weather_zip_lookup import cli, config, daemon
+    
+    state_dir = tmp_path / "cli-state"
+    monkeypatch.setenv(cli.CACHE_DIR_ENV, str(state_dir))
+    monkeypatch.setenv(daemon.SOCKET_PATH_ENV, str(state_dir / "daemon.sock"))
+    monkeypatch.delenv(config.BASE_URL_ENV, raising=False)
+    monkeypatch.delenv(config.POSTAL_DATASET_ENV, raising=False)
+    monkeypatch.delenv(config.VALIDATE_POSTAL_CODES_ENV, raising=False)
+    return state_dir
+
+
+@pytest.fixture
+def stub_server():
+    """遅延・エラーなしのOpenWeatherMapスタブサーバー"""
+    from benchmarks.stub_server import StubServer
+    
+    with StubServer() as server:
+        yield server
+
+
+class UpstreamBudget:
+    """
+    上流APIの呼び出し回数の上限（エンドポイントごと、または合計）
+    
+    with ブロックの間に増えた上流APIへのリクエスト数をメトリクスから求め、上限を超えていれば
+    AssertionError にします。エンドポイント名は geocode / weather / onecall / other です。
+    total を指定しない場合、指定していないエンドポイントの上限は0です（重複した呼び出しや
+    想定外のエンドポイントへの呼び出しが紛れ込まないようにするため）。
+    """
+    
+    def __init__(self, total=None, **endpoints):
+        """
+        Args:
+            total: すべてのエンドポイントの合計の上限（省略時は合計を制限しない）
+            **endpoints: エンドポイント名 → 上限
+        """
+        self.total = total
+        self.endpoints = endpoints
+        self.calls = {}
+        self._before = None
+    
+    def __enter__(self):
+        self._before = upstream_request_counts()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        after = upstream_request_counts()
+        self.calls = {
+            endpoint: count - self._before.get(endpoint, 0)
+            for endpoint, count in after.items()
+            if count != self._before.get(endpoint, 0)
+        }
+        if exc_type is None:
+            self.check()
+        return False
+    
+    def check(self) -> None:
+        """
+        記録した呼び出し回数が上限以内かを確認
+        
+        Raises:
+            AssertionError: 上限を超えている場合
+        """
+        over = []
+        for endpoint, count in sorted(self.calls.items()):
+            limit = self.endpoints.get(endpoint, None if self.total is not None else 0)
+            if limit is not None and count > limit:
+                over.append(f"{endpoint}: {count}回（上限 {limit}回）")
+        total = sum(self.calls.values())
+        if self.total is not None and total > self.total:
+            over.append(f"合計: {total}回（上限 {self.total}回）")
+        if over:
+            raise AssertionError("上流APIの呼び出し回数が上限を超えました: " + "、".join(over))
+
+
+@pytest.fixture
+def upstream_budget():
+    """
+    上流APIの呼び出し回数に上限を設けるコンテキストマネージャーを返す
+    
+    例:
+        with upstream_budget(geocode=1, onecall=1, weather=1):
+            service.get_weather_by_postal_code('1000001')
+        with upstream_budget(total=0):  # キャッシュヒットは上流APIを呼ばない
+            service.get_weather_by_postal_code('1000001')
+    """
+    return UpstreamBudget
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """@pytest.mark.upstream_budget(...) が付いたテストは、テスト全体の呼び出し回数を上限と比べる"""
+    marker = item.get_closest_marker('upstream_budget')
+    if marker is None:
+        return (yield)
+    with UpstreamBudget(*marker.args, **marker.kwargs):
+        return (yield)
@@ -28,7 +28,8 @@ def mock_weather_service():
         location_name="東京都千代田区"
     )
     
-    with patch('weather_zip_lookup.services.weather_service.WeatherService') as mock_service:
+    # ルートが参照するWeatherServiceを差し替える
+    with patch('weather_zip_lookup.routes.main.WeatherService') as mock_service:
         mock_service_instance = mock_service.return_value
         mock_service_instance.get_weather_by_postal_code.return_value = mock_weather_data
         yield mock_service
@@ -64,6 +65,13 @@ def flask_server(flask_app):
     yield "http://127.0.0.1:5555"
 
 
+@pytest.fixture(autouse=True)
+def no_upstream_calls(upstream_budget):
+    """E2Eテストはモックのサービスで応答するため、上流APIを1回も呼ばないことを確認"""
+    with upstream_budget(total=0):
+        yield
+
+
 # スクリーンショットと動画の保存ディレクトリを設定
 @pytest.fixture(scope="session")
 def browser_context_args(browser_context_args):
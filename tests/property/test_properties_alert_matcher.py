@@ -0,0 +1,46 @@
+"""警報タイプマッチャーのプロパティベーステスト"""
+
+from hypothesis import given, strategies as st
+
+from weather_zip_lookup.services.alert_matcher import AlertTypeMatcher
+from weather_zip_lookup.services.weather_service import WeatherService
+
+
+def linear_match(mapping, event):
+    """比較用: 変更前の線形探索による実装"""
+    for key, value in mapping.items():
+        if key in event:
+            return value
+    return None
+
+
+# 一致が起こりやすいように小さなアルファベットを使う
+SMALL_TEXT = st.text(alphabet="abc ", min_size=1, max_size=4)
+
+
+# Feature: weather-zip-lookup, Property: 警報タイプマッチングの等価性
+@given(
+    keys=st.lists(SMALL_TEXT, min_size=1, max_size=20, unique=True),
+    event=st.text(alphabet="abc ", max_size=30)
+)
+def test_matcher_equals_linear_scan(keys, event):
+    """
+    プロパティ: 任意のマッピングとイベント名に対して、マッチャーの結果は
+    定義順の線形探索（最初に部分一致したキー）と一致するべきである
+    """
+    mapping = {key: f"type-{index}" for index, key in enumerate(keys)}
+    matcher = AlertTypeMatcher(mapping)
+    
+    assert matcher.match(event) == linear_match(mapping, event)
+
+
+@given(event=st.text(max_size=60))
+def test_default_mapping_equals_linear_scan(event):
+    """
+    プロパティ: 既定のALERT_TYPE_MAPPINGでも線形探索と同じ結果になるべきである
+    """
+    event = event.lower()
+    service = WeatherService("test_api_key")
+    expected = linear_match(WeatherService.ALERT_TYPE_MAPPING, event)
+    
+    assert service._map_alert_type(event) == (expected if expected is not None else event.title())
@@ -0,0 +1,34 @@
+"""空間インデックスのプロパティベーステスト"""
+
+from hypothesis import given, strategies as st
+
+from weather_zip_lookup.services.spatial_index import SpatialIndex, haversine_km
+
+
+# 日本周辺の座標
+POINTS = st.tuples(st.floats(min_value=24.0, max_value=46.0), st.floats(min_value=122.0, max_value=146.0))
+
+
+# Feature: weather-zip-lookup, Property: 空間インデックスの検索と全件走査の等価性
+@given(
+    points=st.lists(POINTS, max_size=40),
+    center=POINTS,
+    precision=st.integers(min_value=2, max_value=6),
+    distance=st.floats(min_value=0.5, max_value=300.0)
+)
+def test_nearby_equals_brute_force(points, center, precision, distance):
+    """
+    プロパティ: 任意の座標の集合・中心・精度・距離に対して、nearbyの結果は
+    全件の距離を計算して距離以内のものを近い順に並べた結果と一致するべきである
+    """
+    index = SpatialIndex(precision)
+    for number, point in enumerate(points):
+        index.add(f"{number:07d}", *point)
+    
+    expected = sorted(
+        (haversine_km(*center, *point), f"{number:07d}")
+        for number, point in enumerate(points)
+        if haversine_km(*center, *point) <= distance
+    )
+    
+    assert index.nearby(*center, distance) == expected
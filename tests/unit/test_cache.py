@@ -0,0 +1,124 @@
+"""TTLCacheのユニットテスト"""
+
+import pytest
+
+from weather_zip_lookup.services import ComponentTTLCache, TTLCache
+
+
+class FakeClock:
+    """テスト用の手動で進める時計"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """TTLCacheのテスト"""
+    
+    def test_get_and_set(self):
+        """保存した値を取得できる"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("1000001", (35.0, 139.0, "東京"))
+        
+        assert cache.get("1000001") == (35.0, 139.0, "東京")
+        assert cache.hits == 1
+    
+    def test_missing_key_returns_default(self):
+        """存在しないキーはデフォルト値を返す"""
+        cache = TTLCache()
+        
+        assert cache.get("missing") is None
+        assert cache.get("missing", "default") == "default"
+        assert cache.misses == 2
+    
+    def test_entry_expires_after_ttl(self):
+        """TTLを過ぎたエントリは取得できない"""
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, clock=clock)
+        cache.set("key", "value")
+        
+        clock.now = 9.9
+        assert cache.get("key") == "value"
+        
+        clock.now = 10.0
+        assert cache.get("key") is None
+        assert len(cache) == 0
+    
+    def test_max_age(self):
+        """max_ageを指定するとTTL内でも古いエントリは返さない"""
+        clock = FakeClock()
+        cache = TTLCache(ttl=100, clock=clock)
+        cache.set("key", "value")
+        clock.now = 30
+        
+        assert cache.get("key", max_age=10) is None
+        assert cache.get("key", max_age=60) == "value"
+    
+    def test_age(self):
+        """保存時に経過秒数を指定すると、その分だけ古いエントリとして扱う"""
+        clock = FakeClock()
+        cache = TTLCache(ttl=100, clock=clock)
+        cache.set("key", "value", age=95)
+        clock.now = 3
+        
+        assert cache.age("key") == 98
+        assert cache.age("missing") is None
+        assert cache.get("key") == "value"
+        clock.now = 5
+        assert cache.get("key") is None
+    
+    def test_evicts_least_recently_used(self):
+        """最大件数を超えると最も古く使われたエントリを破棄する"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+    
+    def test_on_evict(self):
+        """期限切れ・最大件数の超過で破棄したキーを通知する（max_ageで返さなかっただけなら通知しない）"""
+        clock = FakeClock()
+        evicted = []
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock, on_evict=evicted.append)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert evicted == ["a"]
+        
+        clock.now = 5
+        assert cache.get("b", max_age=1) is None
+        clock.now = 10
+        assert cache.get("b") is None
+        assert evicted == ["a", "b"]
+
+
+class TestComponentTTLCache:
+    """ComponentTTLCacheのテスト"""
+    
+    def test_components_expire_independently(self):
+        """構成要素ごとの有効期限で期限切れになる"""
+        clock = FakeClock()
+        cache = ComponentTTLCache({'temperature': 10, 'alerts': 60}, clock=clock)
+        cache.set_component("1000001", 'temperature', 22.5)
+        cache.set_component("1000001", 'alerts', [])
+        
+        clock.now = 30
+        assert cache.get_component("1000001", 'temperature') is None
+        assert cache.get_component("1000001", 'alerts') == []
+        
+        cache.set_component("1000001", 'temperature', 23.0)
+        assert cache.get_component("1000001", 'temperature') == 23.0
+        assert cache.ttl == 60
+    
+    def test_requires_ttls(self):
+        """有効期限を指定しないとエラー"""
+        with pytest.raises(ValueError):
+            ComponentTTLCache({})
@@ -249,3 +249,342 @@ class TestMain:
             assert exit_code == 2
             captured = capsys.readouterr()
             assert '無効なAPIキーです' in captured.out
+
+
+class TestBulkMode:
+    """一括取得モードのテスト"""
+    
+    @staticmethod
+    def make_service(failing=()):
+        """郵便番号ごとに結果を返すモックサービスを作成"""
+        from unittest.mock import MagicMock
+        from weather_zip_lookup.models import WeatherData
+        from weather_zip_lookup.exceptions import APIError
+        
+        def lookup(postal_code):
+            if postal_code in failing:
+                raise APIError("指定された郵便番号が見つかりませんでした。")
+            return WeatherData(
+                postal_code=postal_code,
+                temperature=20.0,
+                precipitation_probability=10.0,
+                alerts=[],
+                location_name='東京'
+            )
+        
+        service = MagicMock()
+        service.get_weather_by_postal_code.side_effect = lookup
+        return service
+    
+    def test_parse_multiple_postal_codes(self):
+        """複数の郵便番号が解析され、一括取得モードになることを確認"""
+        from weather_zip_lookup.cli import is_bulk_request
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '1000001', '5430001', '-w', '8']):
+            args = parse_arguments()
+        
+        assert args.postal_codes == ['1000001', '5430001']
+        assert args.postal_code == '1000001'
+        assert args.workers == 8
+        assert is_bulk_request(args)
+    
+    def test_single_postal_code_is_not_bulk(self):
+        """単一の郵便番号は従来のモードで処理されることを確認"""
+        from weather_zip_lookup.cli import is_bulk_request
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '1000001']):
+            args = parse_arguments()
+        
+        assert not is_bulk_request(args)
+    
+    def test_invalid_workers(self):
+        """並列数に0を指定するとエラーになることを確認"""
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '-w', '0']):
+            with pytest.raises(SystemExit):
+                parse_arguments()
+    
+    def test_iter_postal_codes_from_file_and_stdin(self, tmp_path):
+        """ファイルと標準入力から郵便番号を読み込めることを確認"""
+        import io
+        from weather_zip_lookup.cli import iter_postal_codes
+        
+        codes_file = tmp_path / "codes.txt"
+        codes_file.write_text("# コメント\n1000001\n\n5430001\n", encoding='utf-8')
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '0600000', '-', '-f', str(codes_file)]):
+            args = parse_arguments()
+        
+        codes = list(iter_postal_codes(args, stdin=io.StringIO("9100000\n")))
+        assert codes == ['0600000', '9100000', '1000001', '5430001']
+    
+    def test_run_bulk_jsonl_output(self):
+        """JSON Lines形式で成功と失敗が1行ずつ出力されることを確認"""
+        import io
+        import json
+        from weather_zip_lookup.cli import run_bulk
+        
+        service = self.make_service(failing={'9999999'})
+        out, err = io.StringIO(), io.StringIO()
+        
+        exit_code = run_bulk(
+            ['1000001', '9999999', '5430001'], service,
+            workers=2, output_format='jsonl', out=out, err=err
+        )
+        
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert len(records) == 3
+        succeeded = {r['data']['postal_code'] for r in records if r['success']}
+        assert succeeded == {'1000001', '5430001'}
+        failed = [r for r in records if not r['success']]
+        assert failed == [{
+            'postal_code': '9999999',
+            'success': False,
+            'error': '指定された郵便番号が見つかりませんでした。',
+            'exit_code': 2
+        }]
+        assert exit_code == 2
+        assert '3件中 2件成功、1件失敗' in err.getvalue()
+        assert '9999999: 終了コード 2' in err.getvalue()
+    
+    def test_run_bulk_text_output(self):
+        """テキスト形式ではOutputFormatterで出力されることを確認"""
+        import io
+        from weather_zip_lookup.cli import run_bulk
+        
+        service = self.make_service()
+        out, err = io.StringIO(), io.StringIO()
+        
+        exit_code = run_bulk(['1000001', '5430001'], service, workers=2, out=out, err=err)
+        
+        assert exit_code == 0
+        assert out.getvalue().count('天気情報 - 東京') == 2
+        assert '2件中 2件成功、0件失敗' in err.getvalue()
+    
+    def test_main_bulk_mode_uses_one_service(self):
+        """一括取得モードでは1つのサービスを共有することを確認"""
+        from weather_zip_lookup.cli import main
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '1000001', '5430001', '--format', 'jsonl']), \
+             patch('weather_zip_lookup.cli.ConfigManager') as mock_config_manager, \
+             patch('weather_zip_lookup.cli.WeatherService') as mock_weather_service:
+            
+            mock_config_manager.return_value.get_api_key.return_value = 'test_api_key'
+            mock_weather_service.return_value = self.make_service()
+            
+            exit_code = main()
+        
+        assert exit_code == 0
+        mock_weather_service.assert_called_once()
+        assert mock_weather_service.return_value.get_weather_by_postal_code.call_count == 2
+
+
+class TestAggregateMode:
+    """地域の天気の集計モードのテスト"""
+    
+    @staticmethod
+    def make_aggregate():
+        from weather_zip_lookup.models import AggregateWeather
+        
+        return AggregateWeather(
+            prefix='100',
+            postal_codes=12,
+            locations=3,
+            failed=1,
+            min_temperature=18.0,
+            max_temperature=23.5,
+            mean_temperature=20.25,
+            max_precipitation_probability=60.0,
+            alerts=[]
+        )
+    
+    def test_run_aggregate_outputs(self):
+        """テキストとJSONで集計結果が出力されることを確認"""
+        import io
+        import json
+        from unittest.mock import MagicMock
+        from weather_zip_lookup.cli import run_aggregate
+        
+        service = MagicMock()
+        service.get_weather_by_prefix.return_value = self.make_aggregate()
+        index = object()
+        
+        text, jsonl = io.StringIO(), io.StringIO()
+        assert run_aggregate('100', index, service, workers=2, out=text) == 0
+        assert run_aggregate('100', index, service, output_format='jsonl', out=jsonl) == 0
+        
+        assert '郵便番号 100*（12件、3地点）' in text.getvalue()
+        assert '取得できなかった郵便番号: 1件' in text.getvalue()
+        assert json.loads(jsonl.getvalue())['mean_temperature'] == 20.25
+        service.get_weather_by_prefix.assert_any_call('100', index, workers=2)
+    
+    def test_main_aggregate_without_dataset(self, capsys):
+        """郵便番号データが設定されていなければ終了コード4"""
+        from weather_zip_lookup.cli import main
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '--aggregate', '100', '--no-cache']), \
+             patch('weather_zip_lookup.cli.ConfigManager') as mock_config_manager:
+            mock_config_manager.return_value.get_postal_dataset.return_value = None
+            
+            exit_code = main()
+        
+        assert exit_code == 4
+        assert '郵便番号データが設定されていません' in capsys.readouterr().out
+
+
+class TestWatchMode:
+    """監視モードのテスト"""
+    
+    def test_parse_watch_arguments(self):
+        """監視モードの引数が解析されることを確認"""
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '--watch', '--interval', '30', '1000001']):
+            args = parse_arguments()
+        
+        assert args.watch
+        assert args.interval == 30.0
+        assert args.postal_codes == ['1000001']
+    
+    def test_run_watch_redraws_changed_lines_only(self):
+        """2回目のポーリングでは変化した行だけを再描画することを確認"""
+        import io
+        from unittest.mock import MagicMock
+        from weather_zip_lookup.cli import run_watch
+        from weather_zip_lookup.models import WeatherData
+        
+        temperatures = {'1000001': iter([20.0, 21.0]), '5430001': iter([15.0, 15.0])}
+        
+        def lookup(postal_code):
+            return WeatherData(
+                postal_code=postal_code,
+                temperature=next(temperatures[postal_code]),
+                precipitation_probability=10.0,
+                alerts=[],
+                location_name='テスト'
+            )
+        
+        service = MagicMock()
+        service.get_weather_by_postal_code.side_effect = lookup
+        out = io.StringIO()
+        
+        with patch('weather_zip_lookup.cli.IncrementalRenderer') as mock_renderer:
+            exit_code = run_watch(
+                ['1000001', '5430001'], service,
+                interval=1, out=out, max_polls=2, sleep=lambda _: None
+            )
+        
+        assert exit_code == 0
+        first, second = [call.args[0] for call in mock_renderer.return_value.render.call_args_list]
+        assert first[0] == second[0]  # ヘッダー
+        assert first[1] != second[1]  # 1000001は気温が変化
+        assert first[2] == second[2]  # 5430001は変化なし
+    
+    def test_run_watch_shows_errors_inline(self):
+        """取得に失敗した郵便番号はエラー行として表示されることを確認"""
+        import io
+        from unittest.mock import MagicMock
+        from weather_zip_lookup.cli import run_watch
+        from weather_zip_lookup.exceptions import APIError
+        
+        service = MagicMock()
+        service.get_weather_by_postal_code.side_effect = APIError("見つかりませんでした")
+        out = io.StringIO()
+        
+        run_watch(['9999999'], service, out=out, max_polls=1, sleep=lambda _: None)
+        
+        assert '9999999' in out.getvalue()
+        assert '取得失敗: 見つかりませんでした' in out.getvalue()
+
+
+class TestPersistentCache:
+    """永続キャッシュとオフラインモードのテスト"""
+    
+    @staticmethod
+    def run_main(argv):
+        """ConfigManagerとWeatherServiceをモックしてmainを実行"""
+        from weather_zip_lookup.cli import main
+        from weather_zip_lookup.models import WeatherData
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', *argv]), \
+             patch('weather_zip_lookup.cli.ConfigManager') as mock_config_manager, \
+             patch('weather_zip_lookup.cli.WeatherService') as mock_weather_service:
+            mock_config_instance = mock_config_manager.return_value
+            mock_config_instance.get_api_key.return_value = 'test_api_key'
+            mock_config_instance.load_config.return_value = {}
+            
+            def lookup(postal_code, **kwargs):
+                weather_data = WeatherData(
+                    postal_code=postal_code,
+                    temperature=18.0,
+                    precipitation_probability=20.0,
+                    alerts=[],
+                    location_name='札幌'
+                )
+                # 実際のWeatherServiceと同様にキャッシュへ保存
+                mock_weather_service.call_args.kwargs['weather_cache'].set(postal_code, weather_data)
+                return weather_data
+            
+            mock_weather_service.return_value.get_weather_by_postal_code.side_effect = lookup
+            return main(), mock_weather_service
+    
+    def test_second_run_is_served_from_cache(self, capsys):
+        """2回目の実行はサービスを初期化せずキャッシュから応答する"""
+        exit_code, first_service = self.run_main(['0600000'])
+        assert exit_code == 0
+        first_service.assert_called_once()
+        
+        exit_code, second_service = self.run_main(['0600000'])
+        
+        assert exit_code == 0
+        second_service.assert_not_called()
+        assert '札幌' in capsys.readouterr().out
+    
+    def test_offline_without_cache(self, capsys):
+        """オフラインモードでキャッシュがない場合は終了コード6"""
+        exit_code, service = self.run_main(['--offline', '0600000'])
+        
+        assert exit_code == 6
+        service.assert_not_called()
+        assert 'キャッシュがありません' in capsys.readouterr().out
+    
+    def test_offline_with_cache(self):
+        """オフラインモードではキャッシュから応答する"""
+        self.run_main(['0600000'])
+        
+        exit_code, service = self.run_main(['--offline', '0600000'])
+        
+        assert exit_code == 0
+        service.assert_not_called()
+    
+    def test_no_cache_always_fetches(self):
+        """--no-cacheでは常にサービスから取得する"""
+        from weather_zip_lookup.cli import main
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '--no-cache', '0600000']), \
+             patch('weather_zip_lookup.cli.ConfigManager') as mock_config_manager, \
+             patch('weather_zip_lookup.cli.WeatherService') as mock_weather_service:
+            mock_config_manager.return_value.get_api_key.return_value = 'test_api_key'
+            
+            main()
+        
+        assert 'weather_cache' not in mock_weather_service.call_args.kwargs
+    
+    def test_timings_printed_to_stderr(self, capsys):
+        """--timingsではステージごとの所要時間を標準エラー出力に表示する"""
+        self.run_main(['0600000'])
+        capsys.readouterr()
+        
+        exit_code, _ = self.run_main(['--timings', '0600000'])
+        
+        assert exit_code == 0
+        captured = capsys.readouterr()
+        assert 'disk_cache' in captured.err
+        assert 'cache=hit' in captured.err
+        assert 'タイミング' not in captured.out
+    
+    def test_profile_printed_to_stderr(self, capsys):
+        """--profileでは実行全体のプロファイルを標準エラー出力に表示する"""
+        exit_code, _ = self.run_main(['--profile', 'cpu', '0600000'])
+        
+        assert exit_code == 0
+        captured = capsys.readouterr()
+        assert 'プロファイル' in captured.err
+        assert 'cumulative' in captured.err
@@ -0,0 +1,147 @@
+"""ConfigManagerのキャッシュ・監視機能のユニットテスト"""
+
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from weather_zip_lookup.config import ConfigManager
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    """一時ディレクトリ内の設定ファイルパス"""
+    path = tmp_path / "weather-zip-lookup" / "config.json"
+    with patch.object(ConfigManager, 'get_config_path', return_value=path):
+        yield path
+
+
+def write_config(path, data):
+    """設定ファイルを書き込み、mtimeを確実に進める"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestConfigCache:
+    """設定キャッシュのテスト"""
+    
+    def test_parses_file_only_once(self, config_file):
+        """変更がなければファイルは一度だけパースされる"""
+        write_config(config_file, {"api_key": "key", "default_postal_code": "1000001"})
+        config_manager = ConfigManager()
+        
+        with patch('weather_zip_lookup.config.json.load', wraps=json.load) as mock_load:
+            assert config_manager.get_api_key() == "key"
+            assert config_manager.get_default_postal_code() == "1000001"
+            assert config_manager.load_config()["api_key"] == "key"
+        
+        assert mock_load.call_count == 1
+    
+    def test_reloads_when_file_changes(self, config_file):
+        """ファイルが変更されると再読み込みされる"""
+        write_config(config_file, {"api_key": "old"})
+        config_manager = ConfigManager()
+        assert config_manager.get_api_key() == "old"
+        
+        write_config(config_file, {"api_key": "new"})
+        assert config_manager.get_api_key() == "new"
+    
+    def test_file_created_after_first_load(self, config_file):
+        """最初は存在しなかったファイルも作成後に読み込まれる"""
+        config_manager = ConfigManager()
+        assert config_manager.get_api_key() is None
+        
+        write_config(config_file, {"api_key": "created"})
+        assert config_manager.get_api_key() == "created"
+    
+    def test_load_config_returns_copy(self, config_file):
+        """load_config()の戻り値を変更してもキャッシュに影響しない"""
+        write_config(config_file, {"api_key": "key"})
+        config_manager = ConfigManager()
+        
+        config = config_manager.load_config()
+        config["api_key"] = "mutated"
+        
+        assert config_manager.get_api_key() == "key"
+
+
+class TestConfigWatcher:
+    """設定ファイル監視のテスト"""
+    
+    def test_watcher_picks_up_changes(self, config_file):
+        """監視スレッドが変更を検出してコールバックを呼ぶ"""
+        write_config(config_file, {"api_key": "old"})
+        config_manager = ConfigManager()
+        changes = []
+        
+        config_manager.start_watching(0.01, changes.append)
+        try:
+            write_config(config_file, {"api_key": "new"})
+            deadline = time.monotonic() + 2
+            while not changes and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            config_manager.stop_watching()
+        
+        assert changes[-1]["api_key"] == "new"
+        assert config_manager.get_api_key() == "new"
+    
+    def test_watching_skips_stat_on_hot_path(self, config_file):
+        """監視中はload_config()がstatを行わない"""
+        write_config(config_file, {"api_key": "key"})
+        config_manager = ConfigManager()
+        config_manager.start_watching(60)
+        try:
+            with patch('weather_zip_lookup.config.os.stat') as mock_stat:
+                assert config_manager.get_api_key() == "key"
+            mock_stat.assert_not_called()
+        finally:
+            config_manager.stop_watching()
+
+
+class TestBaseUrl:
+    """上流APIのベースURL設定のテスト"""
+    
+    def test_base_url_from_file(self, config_file):
+        """設定ファイルのbase_urlを返す"""
+        write_config(config_file, {"base_url": "http://127.0.0.1:8081"})
+        assert ConfigManager().get_base_url() == "http://127.0.0.1:8081"
+    
+    def test_environment_overrides_file(self, config_file, monkeypatch):
+        """環境変数が設定ファイルより優先される"""
+        write_config(config_file, {"base_url": "http://127.0.0.1:8081"})
+        monkeypatch.setenv("OPENWEATHER_BASE_URL", "http://127.0.0.1:9000")
+        assert ConfigManager().get_base_url() == "http://127.0.0.1:9000"
+    
+    def test_base_url_not_set(self, config_file):
+        """未設定の場合はNone"""
+        write_config(config_file, {"api_key": "key"})
+        assert ConfigManager().get_base_url() is None
+
+
+class TestPostalDataset:
+    """郵便番号データのパス設定のテスト"""
+    
+    def test_postal_dataset_from_file(self, config_file):
+        """設定ファイルのpostal_datasetを返す"""
+        write_config(config_file, {"postal_dataset": "/data/KEN_ALL.CSV"})
+        assert ConfigManager().get_postal_dataset() == "/data/KEN_ALL.CSV"
+    
+    def test_environment_overrides_file(self, config_file, monkeypatch):
+        """環境変数が設定ファイルより優先される"""
+        write_config(config_file, {"postal_dataset": "/data/KEN_ALL.CSV"})
+        monkeypatch.setenv("POSTAL_DATASET", "/tmp/postal.csv")
+        assert ConfigManager().get_postal_dataset() == "/tmp/postal.csv"
+    
+    def test_validate_postal_codes(self, config_file, monkeypatch):
+        """validate_postal_codesはデフォルトで無効、環境変数が設定ファイルより優先される"""
+        write_config(config_file, {})
+        assert ConfigManager().get_validate_postal_codes() is False
+        write_config(config_file, {"validate_postal_codes": True})
+        assert ConfigManager().get_validate_postal_codes() is True
+        monkeypatch.setenv("VALIDATE_POSTAL_CODES", "0")
+        assert ConfigManager().get_validate_postal_codes() is False
@@ -0,0 +1,251 @@
+"""デーモン/クライアントのユニットテスト"""
+
+import json
+import socket
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from weather_zip_lookup import daemon
+from weather_zip_lookup.daemon import DaemonClient, WeatherDaemon
+from weather_zip_lookup.exceptions import APIError, DaemonUnavailableError
+from weather_zip_lookup.models import WeatherData, WeatherAlert
+
+
+pytestmark = pytest.mark.skipif(not daemon.is_supported(), reason="Unixドメインソケットが必要")
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    """モックサービスを保持したデーモンを別スレッドで起動"""
+    service = MagicMock()
+    
+    def lookup(postal_code, **kwargs):
+        if postal_code == '9999999':
+            raise APIError("指定された郵便番号が見つかりませんでした。")
+        return WeatherData(
+            postal_code=postal_code,
+            temperature=22.5,
+            precipitation_probability=40.0,
+            alerts=[WeatherAlert(alert_type='大雨', description='大雨警報', severity='Severe')],
+            location_name='東京'
+        )
+    
+    service.get_weather_by_postal_code.side_effect = lookup
+    service.weather_cache.age.return_value = 30.0
+    weather_daemon = WeatherDaemon(service, str(tmp_path / "daemon.sock"))
+    weather_daemon.bind()
+    thread = threading.Thread(target=weather_daemon.serve_forever, daemon=True)
+    thread.start()
+    
+    yield weather_daemon
+    
+    weather_daemon.shutdown()
+    thread.join(timeout=5)
+
+
+class TestDaemon:
+    """デーモンとクライアントの通信テスト"""
+    
+    def test_client_receives_weather_data(self, running_daemon):
+        """クライアントがデーモン経由で天気データを取得できる"""
+        client = DaemonClient(running_daemon.socket_path)
+        
+        weather_data = client.get_weather_by_postal_code('1000001')
+        
+        assert weather_data.postal_code == '1000001'
+        assert weather_data.temperature == 22.5
+        assert weather_data.alerts[0].alert_type == '大雨'
+    
+    def test_client_passes_max_age_and_receives_age(self, running_daemon):
+        """max_ageをデーモンのサービスに渡し、キャッシュに保存してからの経過秒数を受け取る"""
+        client = DaemonClient(running_daemon.socket_path)
+        
+        weather_data, age = client.get_weather_with_age('1000001', max_age=60)
+        
+        assert weather_data.postal_code == '1000001'
+        assert age == 30.0
+        assert running_daemon.weather_service.get_weather_by_postal_code.call_args.kwargs['max_age'] == 60
+    
+    def test_invalid_max_age_is_protocol_error(self, running_daemon):
+        """数値でないmax_ageはProtocolError"""
+        response = running_daemon.handle_request({'op': 'weather', 'postal_code': '1000001', 'max_age': '60'})
+        
+        assert response['error'] == 'ProtocolError'
+    
+    @pytest.mark.parametrize('request_line', [b'[]\n', b'1\n', b'"x"\n', b'{"op": "weather", "postal_code": 1000001}\n'])
+    def test_request_that_is_not_an_object_is_protocol_error(self, running_daemon, request_line):
+        """オブジェクトでないリクエストや文字列でない郵便番号にはProtocolErrorを返し、接続を続ける"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(running_daemon.socket_path)
+            stream = sock.makefile('rwb')
+            stream.write(request_line + b'{"op": "ping"}\n')
+            stream.flush()
+            
+            assert json.loads(stream.readline())['error'] == 'ProtocolError'
+            assert json.loads(stream.readline()) == {'ok': True}
+    
+    def test_client_reraises_service_errors(self, running_daemon):
+        """デーモン側のエラーは同じ例外クラスで再送出される"""
+        client = DaemonClient(running_daemon.socket_path)
+        
+        with pytest.raises(APIError, match="見つかりませんでした"):
+            client.get_weather_by_postal_code('9999999')
+    
+    def test_flight_recorder(self, running_daemon):
+        """デーモンでの取得処理がフライトレコーダーに記録される"""
+        client = DaemonClient(running_daemon.socket_path)
+        client.get_weather_by_postal_code('1000001')
+        with pytest.raises(APIError):
+            client.get_weather_by_postal_code('9999999')
+        
+        snapshot = client.dump_flight_recorder()
+        
+        assert snapshot['recorded'] == 2
+        assert [record['postal_code'] for record in snapshot['recent']] == ['9999999', '1000001']
+        assert [record['outcome'] for record in snapshot['recent']] == ['APIError', 'ok']
+    
+    def test_ping(self, running_daemon):
+        """起動中のデーモンはpingに応答する"""
+        assert DaemonClient(running_daemon.socket_path).ping()
+    
+    def test_second_daemon_refuses_to_start(self, running_daemon):
+        """同じソケットで2つ目のデーモンは起動できない"""
+        with pytest.raises(DaemonUnavailableError):
+            WeatherDaemon(MagicMock(), running_daemon.socket_path).bind()
+    
+    def test_socket_removed_on_shutdown(self, tmp_path):
+        """停止するとソケットファイルが削除される"""
+        socket_path = tmp_path / "daemon.sock"
+        weather_daemon = WeatherDaemon(MagicMock(), str(socket_path))
+        weather_daemon.bind()
+        thread = threading.Thread(target=weather_daemon.serve_forever, daemon=True)
+        thread.start()
+        
+        weather_daemon.shutdown()
+        thread.join(timeout=5)
+        
+        assert not socket_path.exists()
+
+
+class TestClientFallback:
+    """デーモンが起動していない場合のテスト"""
+    
+    def test_client_without_daemon(self, tmp_path):
+        """デーモンがなければDaemonUnavailableErrorになる"""
+        client = DaemonClient(str(tmp_path / "missing.sock"))
+        
+        assert not client.ping()
+        with pytest.raises(DaemonUnavailableError):
+            client.get_weather_by_postal_code('1000001')
+    
+    def test_cli_falls_back_to_in_process(self, tmp_path, monkeypatch):
+        """CLIはデーモンがなければプロセス内で取得する"""
+        import sys
+        from unittest.mock import patch
+        from weather_zip_lookup.cli import main
+        
+        monkeypatch.setenv(daemon.SOCKET_PATH_ENV, str(tmp_path / "missing.sock"))
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '1000001']), \
+             patch('weather_zip_lookup.cli.ConfigManager') as mock_config_manager, \
+             patch('weather_zip_lookup.cli.WeatherService') as mock_weather_service:
+            mock_config_manager.return_value.get_api_key.return_value = 'test_api_key'
+            mock_weather_service.return_value.get_weather_by_postal_code.return_value = WeatherData(
+                postal_code='1000001',
+                temperature=20.0,
+                precipitation_probability=0.0,
+                alerts=[],
+                location_name='東京'
+            )
+            
+            assert main() == 0
+        
+        mock_weather_service.return_value.get_weather_by_postal_code.assert_called_once_with('1000001')
+    
+    def test_cli_uses_running_daemon(self, running_daemon, monkeypatch, capsys):
+        """CLIは起動中のデーモンがあればサービスを初期化しない"""
+        import sys
+        from unittest.mock import patch
+        from weather_zip_lookup.cli import main
+        
+        monkeypatch.setenv(daemon.SOCKET_PATH_ENV, running_daemon.socket_path)
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '1000001']), \
+             patch('weather_zip_lookup.cli.ConfigManager'), \
+             patch('weather_zip_lookup.cli.WeatherService') as mock_weather_service:
+            assert main() == 0
+        
+        mock_weather_service.assert_not_called()
+        assert '東京' in capsys.readouterr().out
+    
+    def test_cli_keeps_daemon_fetch_time(self, running_daemon, monkeypatch, tmp_path):
+        """--max-ageをデーモンに渡し、デーモンの答えは元の取得時刻のまま永続キャッシュに保存する"""
+        import sys
+        from unittest.mock import patch
+        from weather_zip_lookup.cli import PersistentCaches, main
+        from weather_zip_lookup.services import DiskCache
+        
+        monkeypatch.setenv(daemon.SOCKET_PATH_ENV, running_daemon.socket_path)
+        caches = PersistentCaches(
+            geocode=DiskCache(tmp_path / "cache.db", 'geocode', 3600),
+            weather=DiskCache(
+                tmp_path / "cache.db", 'weather', 300,
+                encode=WeatherData.to_dict,
+                decode=WeatherData.from_dict
+            )
+        )
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '--max-age', '60', '1000001']), \
+             patch('weather_zip_lookup.cli.ConfigManager'), \
+             patch('weather_zip_lookup.cli.open_persistent_caches', return_value=caches):
+            assert main() == 0
+        
+        assert running_daemon.weather_service.get_weather_by_postal_code.call_args.kwargs['max_age'] == 60
+        assert caches.weather.get('1000001', max_age=60) is not None
+        assert caches.weather.get('1000001', max_age=20) is None
+    
+    def test_cli_dumps_flight_recorder(self, running_daemon, monkeypatch, capsys):
+        """--flight-recorderでデーモンの記録をJSONで表示する"""
+        import json
+        import sys
+        from unittest.mock import patch
+        from weather_zip_lookup.cli import main
+        
+        monkeypatch.setenv(daemon.SOCKET_PATH_ENV, running_daemon.socket_path)
+        DaemonClient(running_daemon.socket_path).get_weather_by_postal_code('1000001')
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '--flight-recorder']), \
+             patch('weather_zip_lookup.cli.ConfigManager'):
+            assert main() == 0
+        
+        snapshot = json.loads(capsys.readouterr().out)
+        assert snapshot['recent'][0]['postal_code'] == '1000001'
+    
+    def test_cli_flight_recorder_without_daemon(self, tmp_path, monkeypatch, capsys):
+        """デーモンが起動していなければエラーになる"""
+        import sys
+        from unittest.mock import patch
+        from weather_zip_lookup.cli import main
+        
+        monkeypatch.setenv(daemon.SOCKET_PATH_ENV, str(tmp_path / "missing.sock"))
+        
+        with patch.object(sys, 'argv', ['weather-zip-lookup', '--flight-recorder']), \
+             patch('weather_zip_lookup.cli.ConfigManager'):
+            assert main() == 1
+        
+        assert 'エラー' in capsys.readouterr().out
+
+
+class TestCreateDaemonService:
+    """デーモン用のWeatherServiceの作成のテスト"""
+    
+    def test_rate_limit_zero_disables_limiter(self):
+        """rate_limit_per_minuteが0以下なら上流APIへのリクエストを制限しない"""
+        config_manager = MagicMock()
+        config_manager.load_config.return_value = {'api_key': 'test_api_key', 'rate_limit_per_minute': 0}
+        config_manager.get_base_url.return_value = None
+        
+        assert daemon.create_daemon_service(config_manager).rate_limiter is None
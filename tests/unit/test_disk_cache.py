@@ -0,0 +1,76 @@
+"""DiskCacheのユニットテスト"""
+
+from weather_zip_lookup.models import WeatherData, WeatherAlert
+from weather_zip_lookup.services import DiskCache
+
+
+class FakeClock:
+    """テスト用の手動で進める時計"""
+    
+    def __init__(self):
+        self.now = 1_700_000_000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestDiskCache:
+    """DiskCacheのテスト"""
+    
+    def test_persists_across_instances(self, tmp_path):
+        """別インスタンス（別プロセス相当）からも値を取得できる"""
+        path = tmp_path / "cache.sqlite3"
+        DiskCache(path, "geocode", ttl=60, encode=list, decode=tuple).set("1000001", (35.0, 139.0, "東京"))
+        
+        cache = DiskCache(path, "geocode", ttl=60, encode=list, decode=tuple)
+        
+        assert cache.get("1000001") == (35.0, 139.0, "東京")
+    
+    def test_weather_data_roundtrip(self, tmp_path):
+        """WeatherDataを保存して復元できる"""
+        cache = DiskCache(
+            tmp_path / "cache.sqlite3", "weather", ttl=60,
+            encode=WeatherData.to_dict, decode=WeatherData.from_dict
+        )
+        weather_data = WeatherData(
+            postal_code="1000001",
+            temperature=22.5,
+            precipitation_probability=40.0,
+            alerts=[WeatherAlert(alert_type="大雨", description="大雨警報", severity="Severe")],
+            location_name="東京"
+        )
+        
+        cache.set("1000001", weather_data)
+        
+        assert cache.get("1000001") == weather_data
+    
+    def test_namespaces_are_separate(self, tmp_path):
+        """同じファイルでも名前空間ごとに独立している"""
+        path = tmp_path / "cache.sqlite3"
+        DiskCache(path, "a", ttl=60).set("key", "a")
+        
+        assert DiskCache(path, "b", ttl=60).get("key") is None
+    
+    def test_ttl_and_max_age(self, tmp_path):
+        """TTLを過ぎると取得できないが、max_ageで期限切れも許容できる"""
+        clock = FakeClock()
+        cache = DiskCache(tmp_path / "cache.sqlite3", "weather", ttl=60, clock=clock)
+        cache.set("key", "value")
+        
+        clock.now += 120
+        
+        assert cache.get("key") is None
+        assert cache.get("key", max_age=300) == "value"
+        assert cache.get("key", max_age=float('inf')) == "value"
+    
+    def test_retention_prunes_old_entries(self, tmp_path):
+        """保持期間を過ぎたエントリは開く時に削除される"""
+        clock = FakeClock()
+        path = tmp_path / "cache.sqlite3"
+        DiskCache(path, "weather", ttl=60, clock=clock).set("key", "value")
+        
+        clock.now += 1000
+        cache = DiskCache(path, "weather", ttl=60, retention=500, clock=clock)
+        
+        assert len(cache) == 0
+        assert cache.evictions == 1
@@ -0,0 +1,90 @@
+"""フライトレコーダーのユニットテスト"""
+
+import threading
+
+import pytest
+
+from weather_zip_lookup.services import FlightRecorder, Timings
+
+
+def make_timings(duration, fallback=None):
+    """指定した所要時間のスパンを1つ持つTimings"""
+    timings = Timings()
+    with timings.span('geocode') as span:
+        span.cache = 'miss'
+        span.status = 200
+        span.fallback = fallback
+    timings.spans[0].duration = duration
+    return timings
+
+
+class TestFlightRecorder:
+    """FlightRecorderのテスト"""
+    
+    def test_recent_is_newest_first_and_bounded(self):
+        """直近の記録は新しい順で、件数の上限を超えると古いものから捨てる"""
+        recorder = FlightRecorder(capacity=3)
+        for index in range(5):
+            recorder.record(f"100000{index}", make_timings(0.01), 200)
+        
+        snapshot = recorder.snapshot()
+        
+        assert snapshot['recorded'] == 5
+        assert [record['postal_code'] for record in snapshot['recent']] == ['1000004', '1000003', '1000002']
+    
+    def test_slowest_keeps_tail(self):
+        """最も遅い記録を遅い順に保持する"""
+        recorder = FlightRecorder(capacity=2)
+        for index, duration in enumerate([0.05, 0.5, 0.01, 0.2, 0.02]):
+            recorder.record(f"100000{index}", make_timings(duration), 200)
+        
+        slowest = recorder.snapshot()['slowest']
+        
+        assert [record['postal_code'] for record in slowest] == ['1000001', '1000003']
+        assert [record['duration_ms'] for record in slowest] == [500.0, 200.0]
+    
+    def test_record_contents(self):
+        """スパンのキャッシュ・ステータス・フォールバックを記録する"""
+        recorder = FlightRecorder()
+        recorder.record('1000001', make_timings(0.0125, fallback='onecall_failed'), 'ok', duration=0.02)
+        
+        record = recorder.snapshot()['recent'][0]
+        
+        assert record['duration_ms'] == 20.0
+        assert record['outcome'] == 'ok'
+        assert record['fallbacks'] == ['geocode:onecall_failed']
+        assert record['spans'] == [{
+            'name': 'geocode', 'duration_ms': 12.5, 'cache': 'miss', 'status': 200, 'fallback': 'onecall_failed'
+        }]
+    
+    def test_clear(self):
+        """clearですべての記録を削除する"""
+        recorder = FlightRecorder()
+        recorder.record('1000001', make_timings(0.01), 200)
+        
+        recorder.clear()
+        
+        assert recorder.snapshot() == {'capacity': recorder.capacity, 'recorded': 0, 'recent': [], 'slowest': []}
+    
+    def test_concurrent_records(self):
+        """複数スレッドから記録しても件数が失われない"""
+        recorder = FlightRecorder(capacity=10)
+        
+        def worker():
+            for _ in range(200):
+                recorder.record('1000001', make_timings(0.01), 200)
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        snapshot = recorder.snapshot()
+        assert snapshot['recorded'] == 800
+        assert len(snapshot['recent']) == len(snapshot['slowest']) == 10
+    
+    def test_invalid_capacity(self):
+        """件数が1未満ならValueError"""
+        with pytest.raises(ValueError):
+            FlightRecorder(capacity=0)
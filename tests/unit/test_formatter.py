@@ -186,3 +186,154 @@ class TestOutputFormatter:
         result_70 = formatter._format_precipitation(70.0)
         assert "70%" in result_70
         assert Fore.RED in result_70
+
+
+class TestIncrementalRenderer:
+    """IncrementalRendererクラスのテスト"""
+    
+    def test_first_render_writes_all_lines(self):
+        """初回はすべての行を出力する"""
+        import io
+        from weather_zip_lookup.services import IncrementalRenderer
+        
+        stream = io.StringIO()
+        renderer = IncrementalRenderer(stream, interactive=True)
+        
+        assert renderer.render(["a", "b", "c"]) == 3
+        assert stream.getvalue() == "a\nb\nc\n"
+    
+    def test_redraws_only_changed_lines(self):
+        """変化した行だけをカーソル移動で書き換える"""
+        import io
+        from weather_zip_lookup.services import IncrementalRenderer
+        
+        stream = io.StringIO()
+        renderer = IncrementalRenderer(stream, interactive=True)
+        renderer.render(["a", "b", "c"])
+        stream.seek(0)
+        stream.truncate()
+        
+        assert renderer.render(["a", "B", "c"]) == 1
+        assert stream.getvalue() == "\x1b[2A\r\x1b[2KB\x1b[2B\r"
+    
+    def test_unchanged_render_writes_nothing(self):
+        """変化がなければ何も出力しない"""
+        import io
+        from weather_zip_lookup.services import IncrementalRenderer
+        
+        stream = io.StringIO()
+        renderer = IncrementalRenderer(stream, interactive=True)
+        renderer.render(["a", "b"])
+        
+        assert renderer.render(["a", "b"]) == 0
+    
+    def test_non_interactive_appends_changed_lines(self):
+        """端末でない場合は変化した行だけを追記する"""
+        import io
+        from weather_zip_lookup.services import IncrementalRenderer
+        
+        stream = io.StringIO()
+        renderer = IncrementalRenderer(stream)
+        renderer.render(["a", "b"])
+        renderer.render(["a", "B"])
+        
+        assert stream.getvalue() == "a\nb\nB\n"
+
+
+class TestSummaryLine:
+    """1行要約フォーマットのテスト"""
+    
+    def test_format_summary_line_with_alerts(self):
+        """気温・降水確率・警報が1行に含まれる"""
+        formatter = OutputFormatter()
+        weather_data = WeatherData(
+            postal_code="1000001",
+            temperature=20.5,
+            precipitation_probability=30.0,
+            alerts=[WeatherAlert(alert_type="大雨", description="", severity="高")],
+            location_name="東京都千代田区"
+        )
+        
+        line = formatter.format_summary_line(weather_data)
+        
+        assert "\n" not in line
+        assert "1000001 東京都千代田区" in line
+        assert "20.5°C" in line
+        assert "30%" in line
+        assert "大雨" in line
+
+
+class TestRenderTable:
+    """表形式の一括描画のテスト"""
+    
+    @staticmethod
+    def make_records():
+        return [
+            WeatherData(
+                postal_code="1000001",
+                temperature=5.0,
+                precipitation_probability=80.0,
+                alerts=[WeatherAlert(alert_type="大雨", description="", severity="高")],
+                location_name="東京"
+            ),
+            WeatherData(
+                postal_code="0600000",
+                temperature=20.0,
+                precipitation_probability=10.0,
+                alerts=[],
+                location_name="札幌"
+            ),
+        ]
+    
+    def test_render_table_without_color(self):
+        """色なしでは1レコード1行のプレーンテキストになる"""
+        import io
+        
+        formatter = OutputFormatter()
+        stream = io.StringIO()
+        
+        count = formatter.render_table(self.make_records(), stream, color=False)
+        lines = stream.getvalue().splitlines()
+        
+        assert count == 2
+        assert lines[0] == OutputFormatter.TABLE_HEADER
+        assert lines[1].startswith("1000001")
+        assert "5.0°C" in lines[1] and "80%" in lines[1] and "東京" in lines[1] and "大雨" in lines[1]
+        assert lines[2].startswith("0600000")
+        assert "\x1b[" not in stream.getvalue()
+    
+    def test_render_table_with_color(self):
+        """色ありではしきい値に応じたエスケープシーケンスが付く"""
+        import io
+        
+        formatter = OutputFormatter()
+        stream = io.StringIO()
+        
+        formatter.render_table(self.make_records(), stream, color=True, header=False)
+        first, second = stream.getvalue().splitlines()
+        
+        assert f"{Fore.BLUE}   5.0°C{Style.RESET_ALL}" in first
+        assert f"{Fore.RED}     80%{Style.RESET_ALL}" in first
+        assert f"{Fore.GREEN}  20.0°C{Style.RESET_ALL}" in second
+    
+    def test_color_disabled_when_not_tty(self):
+        """出力先がTTYでなければ自動的に色を付けない"""
+        import io
+        
+        formatter = OutputFormatter()
+        stream = io.StringIO()
+        
+        formatter.render_table(self.make_records(), stream)
+        
+        assert "\x1b[" not in stream.getvalue()
+    
+    def test_render_table_writes_in_chunks(self):
+        """chunk_sizeごとにまとめて書き込む"""
+        from unittest.mock import MagicMock
+        
+        formatter = OutputFormatter()
+        stream = MagicMock()
+        
+        formatter.render_table(self.make_records() * 5, stream, color=False, header=False, chunk_size=4)
+        
+        assert stream.write.call_count == 3
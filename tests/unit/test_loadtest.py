@@ -0,0 +1,71 @@
+"""負荷試験ハーネスのユニットテスト"""
+
+import argparse
+
+import pytest
+
+from benchmarks.loadtest import AppServer, LoadTestResult, RequestGenerator, parse_mix, run_load
+from benchmarks.stub_server import StubServer
+
+
+class TestParseMix:
+    """リクエスト内訳の解析のテスト"""
+    
+    def test_parse_mix(self):
+        """種類=重み の形式を解析できる"""
+        assert parse_mix("distinct=1,repeated=3") == {"distinct": 1.0, "repeated": 3.0}
+    
+    @pytest.mark.parametrize("spec", ["unknown=1", "distinct=x", "distinct=0"])
+    def test_parse_mix_invalid(self, spec):
+        """未知の種類、数値でない重み、合計0はエラー"""
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_mix(spec)
+
+
+class TestRequestGenerator:
+    """リクエスト生成のテスト"""
+    
+    def test_distinct_codes_are_unique(self):
+        """distinctの郵便番号は重複しない"""
+        generator = RequestGenerator({"distinct": 1})
+        codes = [generator.next()[1] for _ in range(100)]
+        assert len(set(codes)) == 100
+        assert all(len(code) == 7 and code.isdigit() for code in codes)
+    
+    def test_default_sends_empty_postal_code(self):
+        """defaultは空の郵便番号を送る"""
+        generator = RequestGenerator({"default": 1})
+        assert generator.next() == ("default", "")
+
+
+class TestLoadTestResult:
+    """集計のテスト"""
+    
+    def test_summary(self):
+        """パーセンタイル、エラー率、上流呼び出し数を集計する"""
+        result = LoadTestResult(
+            duration=2.0,
+            latencies=[i / 1000 for i in range(1, 101)],
+            upstream_calls={"geocode": 50, "weather": 50},
+        )
+        result.statuses.update({200: 90, 400: 5, 500: 5})
+        
+        summary = result.summary()
+        
+        assert summary["throughput_rps"] == 50.0
+        assert summary["latency_ms"]["p50"] == 51.0
+        assert summary["latency_ms"]["p99"] == 100.0
+        assert summary["error_rate"]["4xx"] == 0.05
+        assert summary["error_rate"]["5xx"] == 0.05
+        assert summary["upstream_calls_per_request"] == 1.0
+
+
+def test_run_load_against_app():
+    """スタブ上流を使うアプリケーションに指定数のリクエストを送る"""
+    with StubServer() as stub, AppServer(stub.base_url) as app_server:
+        result = run_load(app_server.base_url, RequestGenerator({"repeated": 1, "invalid": 1}, seed=0), 2, total_requests=10)
+    
+    assert result.requests == 10
+    assert result.failures == 0
+    assert set(result.statuses) <= {200, 400}
+    assert result.statuses[200] == result.kinds["repeated"]
@@ -0,0 +1,231 @@
+"""Prometheus形式のメトリクスのユニットテスト"""
+
+import pytest
+import requests
+import responses
+
+from weather_zip_lookup import create_app
+from weather_zip_lookup.metrics import (
+    Counter,
+    FORECAST_REQUESTS,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    REQUESTS,
+    REQUESTS_IN_FLIGHT,
+    render_cache_metrics,
+    upstream_metrics,
+)
+from weather_zip_lookup.services import TTLCache
+
+
+class TestCollectors:
+    """カウンター・ゲージ・ヒストグラムのテスト"""
+    
+    def test_counter_with_labels(self):
+        """ラベルごとに値を持ち、テキスト形式で出力する"""
+        counter = Counter('test_requests_total', 'テスト', ('status',))
+        counter.labels(200).inc()
+        counter.labels(200).inc()
+        counter.labels(500).inc()
+        
+        lines = list(counter.render())
+        
+        assert lines[:2] == ['# HELP test_requests_total テスト', '# TYPE test_requests_total counter']
+        assert 'test_requests_total{status="200"} 2' in lines
+        assert 'test_requests_total{status="500"} 1' in lines
+    
+    def test_labels_returns_same_child(self):
+        """同じラベルの子メトリクスは再利用される"""
+        counter = Counter('test_total', 'テスト', ('endpoint',))
+        assert counter.labels('geocode') is counter.labels('geocode')
+    
+    def test_labels_count_mismatch(self):
+        """ラベル数が一致しなければエラー"""
+        counter = Counter('test_total', 'テスト', ('endpoint',))
+        with pytest.raises(ValueError):
+            counter.labels('geocode', '200')
+    
+    def test_gauge(self):
+        """ゲージは増減できる"""
+        gauge = Gauge('test_in_flight', 'テスト')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert list(gauge.render())[-1] == 'test_in_flight 1'
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """バケットは累積で出力し、合計と件数も出力する"""
+        histogram = Histogram('test_duration_seconds', 'テスト', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        
+        lines = list(histogram.render())
+        
+        assert 'test_duration_seconds_bucket{le="0.1"} 2' in lines
+        assert 'test_duration_seconds_bucket{le="1"} 3' in lines
+        assert 'test_duration_seconds_bucket{le="+Inf"} 4' in lines
+        assert 'test_duration_seconds_sum 2.65' in lines
+        assert 'test_duration_seconds_count 4' in lines
+    
+    def test_label_values_are_escaped(self):
+        """ラベルの値の引用符とバックスラッシュをエスケープする"""
+        counter = Counter('test_total', 'テスト', ('name',))
+        counter.labels('a"b\\c').inc()
+        assert 'test_total{name="a\\"b\\\\c"} 1' in list(counter.render())
+    
+    def test_registry_rejects_duplicates(self):
+        """同じ名前のメトリクスは登録できない"""
+        registry = MetricsRegistry()
+        registry.register(Counter('test_total', 'テスト'))
+        with pytest.raises(ValueError):
+            registry.register(Counter('test_total', 'テスト'))
+
+
+class TestCacheMetrics:
+    """キャッシュの統計情報のテスト"""
+    
+    def test_render_cache_metrics(self):
+        """ヒット数・ミス数・件数・ヒット率を出力する"""
+        cache = TTLCache()
+        cache.set('1000001', 'value')
+        cache.get('1000001')
+        cache.get('1000001')
+        cache.get('9999999')
+        
+        text = render_cache_metrics({'geocode': cache, 'weather': None})
+        
+        assert 'weather_zip_lookup_cache_hits_total{cache="geocode"} 2' in text
+        assert 'weather_zip_lookup_cache_misses_total{cache="geocode"} 1' in text
+        assert 'weather_zip_lookup_cache_entries{cache="geocode"} 1' in text
+        assert 'weather_zip_lookup_cache_hit_ratio{cache="geocode"} 0.6666666666666666' in text
+        assert 'cache="weather"' not in text
+    
+    def test_no_caches(self):
+        """キャッシュがなければ何も出力しない"""
+        assert render_cache_metrics({}) == ''
+
+
+class TestMetricsEndpoint:
+    """/metrics エンドポイントのテスト"""
+    
+    @pytest.fixture
+    def client(self):
+        app = create_app({'TESTING': True, 'OPENWEATHER_API_KEY': 'test_api_key'})
+        return app.test_client()
+    
+    @responses.activate
+    def test_metrics_after_weather_request(self, client):
+        """天気リクエストの件数・上流呼び出し・キャッシュを公開する"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'message': 'rate limited'},
+            status=429
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'hourly': [{'dt': 1700000000, 'temp': 22.5, 'pop': 0.45}]},
+            status=200
+        )
+        succeeded = REQUESTS.labels(200).get()
+        rate_limited = upstream_metrics('onecall').rate_limited.get()
+        
+        # One Call APIが失敗した天気データはキャッシュしないため、2回目は取得し直す
+        for _ in range(3):
+            client.post('/api/weather', json={'postal_code': '1000001'})
+        response = client.get('/metrics')
+        
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        assert REQUESTS.labels(200).get() == succeeded + 3
+        assert upstream_metrics('onecall').rate_limited.get() == rate_limited + 1
+        assert REQUESTS_IN_FLIGHT.labels().get() == 0
+        text = response.get_data(as_text=True)
+        assert 'weather_zip_lookup_request_duration_seconds_bucket{le="+Inf"}' in text
+        assert 'weather_zip_lookup_upstream_requests_total{endpoint="onecall",status="429"}' in text
+        # 3回目はアプリケーションで共有する天気データのキャッシュにヒットする
+        assert 'weather_zip_lookup_cache_hits_total{cache="weather"} 1' in text
+    
+    @responses.activate
+    def test_forecast_requests_are_counted_separately(self, client):
+        """/api/forecast は /api/weather とは別のメトリクスに記録する"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'hourly': [{'dt': 1700000000, 'temp': 20.0, 'pop': 0.1}]},
+            status=200
+        )
+        weather_requests = REQUESTS.labels(200).get()
+        forecast_requests = FORECAST_REQUESTS.labels(200).get()
+        
+        assert client.post('/api/forecast', json={'postal_code': '1000001'}).status_code == 200
+        
+        assert REQUESTS.labels(200).get() == weather_requests
+        assert FORECAST_REQUESTS.labels(200).get() == forecast_requests + 1
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'weather_zip_lookup_forecast_request_duration_seconds_bucket{le="+Inf"}' in text
+        assert 'weather_zip_lookup_forecast_requests_in_flight 0' in text
+    
+    @responses.activate
+    def test_negative_cache_metrics(self, client):
+        """見つからなかった郵便番号のキャッシュのヒットを公開する"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'message': 'not found'},
+            status=404
+        )
+        
+        client.post('/api/weather', json={'postal_code': '9999999'})
+        client.post('/api/weather', json={'postal_code': '9999999'})
+        text = client.get('/metrics').get_data(as_text=True)
+        
+        assert len(responses.calls) == 1
+        assert 'weather_zip_lookup_cache_hits_total{cache="negative"} 1' in text
+        assert 'weather_zip_lookup_cache_evictions_total{cache="negative"} 0' in text
+    
+    @responses.activate
+    def test_timeout_counter(self, client):
+        """タイムアウトを数える"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            body=requests.exceptions.Timeout()
+        )
+        timeouts = upstream_metrics('geocode').timeouts.get()
+        
+        response = client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert response.status_code == 500
+        assert upstream_metrics('geocode').timeouts.get() == timeouts + 1
+    
+    def test_metrics_can_be_disabled(self):
+        """METRICS_ENABLEDがFalseなら登録しない"""
+        app = create_app({'TESTING': True, 'METRICS_ENABLED': False})
+        assert app.test_client().get('/metrics').status_code == 404
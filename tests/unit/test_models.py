@@ -46,3 +46,114 @@ def test_weather_data_no_alerts():
         location_name="東京都千代田区"
     )
     assert len(weather.alerts) == 0
+
+
+def test_models_are_slotted():
+    """WeatherDataとWeatherAlertはインスタンスごとの__dict__を持たない"""
+    import dataclasses
+    import pytest
+    
+    alert = WeatherAlert(alert_type="雷", description="雷注意報", severity="low")
+    weather = WeatherData(
+        postal_code="1000001",
+        temperature=20.0,
+        precipitation_probability=10.0,
+        alerts=[alert],
+        location_name="東京都千代田区"
+    )
+    
+    assert not hasattr(weather, '__dict__')
+    assert not hasattr(alert, '__dict__')
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        alert.severity = "high"
+
+
+def test_weather_batch_roundtrip():
+    """WeatherBatchに格納したデータをビュー経由で復元できる"""
+    from weather_zip_lookup.models import WeatherBatch
+    
+    alert = WeatherAlert(alert_type="大雨", description="大雨警報", severity="high")
+    records = [
+        WeatherData(postal_code="0600000", temperature=-3.5, precipitation_probability=80.0,
+                    alerts=[alert], location_name="札幌"),
+        WeatherData(postal_code="1000001", temperature=22.5, precipitation_probability=10.0,
+                    alerts=[], location_name="東京"),
+        WeatherData(postal_code="0600001", temperature=-2.0, precipitation_probability=70.0,
+                    alerts=[], location_name="札幌"),
+    ]
+    
+    batch = WeatherBatch(records)
+    
+    assert len(batch) == 3
+    assert [view.to_weather_data() for view in batch] == records
+    assert batch[0].postal_code == "0600000"  # 先頭の0が保持される
+    assert batch[-1].location_name == "札幌"
+    assert batch.locations == ["札幌", "東京"]  # 地名は重複なく保持される
+    assert list(batch.temperatures) == [-3.5, 22.5, -2.0]
+    assert batch.alerts_at(0) == (alert,)
+    assert batch.alerts_at(1) == ()
+    assert batch[1].to_dict() == records[1].to_dict()
+
+
+def test_weather_batch_index_out_of_range():
+    """範囲外のインデックスはIndexError"""
+    import pytest
+    from weather_zip_lookup.models import WeatherBatch
+    
+    with pytest.raises(IndexError):
+        WeatherBatch()[0]
+
+
+def test_hourly_forecast_from_onecall():
+    """One Call APIのhourly配列から予報を構築し、不完全な要素は読み飛ばす"""
+    from weather_zip_lookup.models import HourlyForecast, HourlyPoint
+    
+    forecast = HourlyForecast.from_onecall([
+        {'dt': 1700000000, 'temp': 22.37, 'pop': 0.45},
+        {'dt': 1700003600, 'temp': 21.5},
+        {'dt': 1700007200, 'pop': 0.1},
+    ])
+    
+    assert len(forecast) == 2
+    assert list(forecast)[1] == HourlyPoint(1700003600, 21.5, 0.0)
+    assert forecast.to_list() == [
+        {'time': 1700000000, 'temperature': 22.37, 'precipitation_probability': 45.0},
+        {'time': 1700003600, 'temperature': 21.5, 'precipitation_probability': 0.0},
+    ]
+    assert len(forecast.head(1)) == 1
+    assert forecast.temperatures.itemsize == 4
+
+
+def test_hourly_forecast_length_mismatch():
+    """配列の長さが揃っていなければValueError"""
+    import pytest
+    from weather_zip_lookup.models import HourlyForecast
+    
+    with pytest.raises(ValueError):
+        HourlyForecast([1700000000], [20.0], [])
+
+
+def test_aggregate_weather_from_batch():
+    """地点ごとの天気データから気温の範囲と平均、最大降水確率、重複のない警報を計算する"""
+    import pytest
+    from weather_zip_lookup.models import AggregateWeather, WeatherBatch
+    
+    alert = WeatherAlert(alert_type="大雨", description="大雨警報", severity="high")
+    batch = WeatherBatch([
+        WeatherData(postal_code="1000001", temperature=20.0, precipitation_probability=30.0,
+                    alerts=[alert], location_name="東京"),
+        WeatherData(postal_code="1000002", temperature=21.0, precipitation_probability=80.0,
+                    alerts=[alert], location_name="東京"),
+        WeatherData(postal_code="1000003", temperature=23.5, precipitation_probability=10.0,
+                    alerts=[], location_name="東京"),
+    ])
+    
+    aggregate = AggregateWeather.from_batch("100", batch, postal_codes=5, failed=1)
+    
+    assert (aggregate.min_temperature, aggregate.max_temperature) == (20.0, 23.5)
+    assert aggregate.to_dict()['mean_temperature'] == 21.5
+    assert aggregate.max_precipitation_probability == 80.0
+    assert aggregate.alerts == [alert]
+    assert aggregate.to_dict()['locations'] == 3
+    with pytest.raises(ValueError):
+        AggregateWeather.from_batch("100", WeatherBatch(), postal_codes=0)
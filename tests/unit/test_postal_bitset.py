@@ -0,0 +1,77 @@
+"""郵便番号のビットセットのユニットテスト"""
+
+import os
+
+import pytest
+
+from weather_zip_lookup.services import PostalBitset
+from weather_zip_lookup.services.postal_bitset import SIZE_BYTES
+
+
+class TestPostalBitset:
+    """PostalBitsetのテスト"""
+    
+    def test_contains(self):
+        """登録した郵便番号だけが含まれる"""
+        bitset = PostalBitset.from_postal_codes(['0000000', '1000001', '9999999'])
+        
+        assert '0000000' in bitset
+        assert '1000001' in bitset
+        assert '9999999' in bitset
+        assert '1000002' not in bitset
+        assert '100000' not in bitset
+        assert 'abcdefg' not in bitset
+        assert len(bitset) == 3
+    
+    def test_save_and_open_memory_mapped(self, tmp_path):
+        """保存したビットセットを約1.25MBのファイルとしてメモリマップで開ける"""
+        path = tmp_path / 'postal.bitset'
+        PostalBitset.from_postal_codes(['1000001', '5300001']).save(path)
+        
+        bitset = PostalBitset.open(path)
+        try:
+            assert path.stat().st_size == SIZE_BYTES == 1_250_000
+            assert '5300001' in bitset
+            assert '5300002' not in bitset
+        finally:
+            bitset.close()
+    
+    def test_open_rejects_wrong_size(self, tmp_path):
+        """大きさの違うファイルはValueError"""
+        path = tmp_path / 'postal.bitset'
+        path.write_bytes(b'\0' * 10)
+        with pytest.raises(ValueError):
+            PostalBitset.open(path)
+    
+    def test_for_dataset_builds_once_and_rebuilds_when_stale(self, tmp_path):
+        """郵便番号データの隣に保存し、データが更新されたら作り直す"""
+        dataset = tmp_path / 'postal.csv'
+        dataset.write_text('1000001,東京都千代田区千代田\n', encoding='utf-8')
+        
+        bitset = PostalBitset.for_dataset(dataset)
+        assert '1000001' in bitset
+        saved = tmp_path / 'postal.csv.bitset'
+        assert saved.stat().st_size == SIZE_BYTES
+        bitset.close()
+        
+        dataset.write_text('5300001,大阪府大阪市北区梅田\n', encoding='utf-8')
+        stat = saved.stat()
+        os.utime(dataset, (stat.st_atime, stat.st_mtime + 10))
+        bitset = PostalBitset.for_dataset(dataset)
+        assert '1000001' not in bitset
+        assert '5300001' in bitset
+        bitset.close()
+    
+    def test_for_dataset_without_postal_codes(self, tmp_path):
+        """郵便番号を1件も読み取れないデータはValueErrorにし、ビットセットを保存しない"""
+        dataset = tmp_path / 'postal.csv'
+        dataset.write_text('1000001;東京都千代田区千代田\n', encoding='utf-8')
+        (tmp_path / 'postal.csv.bitset').write_bytes(b'\0' * SIZE_BYTES)  # 以前に保存された空のビットセット
+        
+        with pytest.raises(ValueError):
+            PostalBitset.for_dataset(dataset)
+    
+    def test_for_dataset_missing(self, tmp_path):
+        """郵便番号データがなければOSError"""
+        with pytest.raises(OSError):
+            PostalBitset.for_dataset(tmp_path / 'missing.csv')
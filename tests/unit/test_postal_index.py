@@ -0,0 +1,89 @@
+"""郵便番号インデックスのユニットテスト"""
+
+import pytest
+
+from weather_zip_lookup.services import PostalIndex
+
+
+# KEN_ALL.CSV形式の行（全国地方公共団体コード, 旧郵便番号, 郵便番号, カナ3列, 都道府県, 市区町村, 町域, フラグ6列）
+KEN_ALL_ROWS = [
+    '13101,"100  ","1000000","ﾄｳｷｮｳﾄ","ﾁﾖﾀﾞｸ","ｲｶﾆｹｲｻｲｶﾞﾅｲﾊﾞｱｲ","東京都","千代田区","以下に掲載がない場合",0,0,0,0,0,0',
+    '13101,"100  ","1000005","ﾄｳｷｮｳﾄ","ﾁﾖﾀﾞｸ","ﾏﾙﾉｳﾁ","東京都","千代田区","丸の内（次のビルを除く）",0,0,1,0,0,0',
+    '13101,"100  ","1000005","ﾄｳｷｮｳﾄ","ﾁﾖﾀﾞｸ","ﾏﾙﾉｳﾁ","東京都","千代田区","丸の内（別の行）",0,0,1,0,0,0',
+    '13101,"100  ","1006890","ﾄｳｷｮｳﾄ","ﾁﾖﾀﾞｸ","ﾏﾙﾉｳﾁ","東京都","千代田区","丸の内ＪＰタワー（地階・階層不明）",0,0,0,0,0,0',
+    '27127,"530  ","5300001","ｵｵｻｶﾌ","ｵｵｻｶｼｷﾀｸ","ｳﾒﾀﾞ","大阪府","大阪市北区","梅田",0,0,1,0,0,0',
+]
+
+
+@pytest.fixture
+def index():
+    return PostalIndex([
+        ('1000005', '東京都千代田区丸の内'),
+        ('1000001', '東京都千代田区千代田'),
+        ('100-6890', '東京都千代田区丸の内'),
+        ('1010001', '東京都千代田区神田須田町'),
+        ('5300001', '大阪府大阪市北区梅田'),
+    ])
+
+
+class TestPostalIndex:
+    """PostalIndexのテスト"""
+    
+    def test_search_prefix_in_order(self, index):
+        """前方一致する郵便番号を郵便番号順に返す"""
+        assert index.search('100') == [
+            ('1000001', '東京都千代田区千代田'),
+            ('1000005', '東京都千代田区丸の内'),
+            ('1006890', '東京都千代田区丸の内'),
+        ]
+        assert index.search('1000') == index.search('100')[:2]
+        assert index.search('999') == []
+    
+    def test_search_is_bounded(self, index):
+        """件数の上限を超えては返さず、countは全件数を返す"""
+        assert len(index.search('10', limit=2)) == 2
+        assert index.count('10') == 4
+        assert index.search('10', limit=0) == []
+    
+    def test_location_name_and_contains(self, index):
+        """完全一致で地名を返す"""
+        assert index.location_name('5300001') == '大阪府大阪市北区梅田'
+        assert index.location_name('5300002') is None
+        assert '1000001' in index
+        assert 'abc' not in index
+        assert len(index) == 5
+        assert list(index)[0] == '1000001'
+    
+    def test_invalid_prefix(self, index):
+        """数字でない、または7桁を超える前方一致はValueError"""
+        with pytest.raises(ValueError):
+            index.search('10a')
+        with pytest.raises(ValueError):
+            index.count('12345678')
+    
+    def test_invalid_postal_code(self):
+        """7桁でない郵便番号はValueError"""
+        with pytest.raises(ValueError):
+            PostalIndex([('123', '不明')])
+    
+    @pytest.mark.parametrize('encoding', ['cp932', 'utf-8'])
+    def test_from_ken_all_csv(self, tmp_path, encoding):
+        """KEN_ALL.CSV形式を文字コードを判別して読み込む"""
+        path = tmp_path / 'KEN_ALL.CSV'
+        path.write_text('\r\n'.join(KEN_ALL_ROWS) + '\r\n', encoding=encoding)
+        
+        index = PostalIndex.from_csv(path)
+        
+        assert index.search('100') == [
+            ('1000000', '東京都千代田区'),
+            ('1000005', '東京都千代田区丸の内'),
+            ('1006890', '東京都千代田区丸の内ＪＰタワー'),
+        ]
+        assert index.location_name('5300001') == '大阪府大阪市北区梅田'
+    
+    def test_from_simple_csv(self, tmp_path):
+        """見出し付きの「郵便番号,地名」のCSVを読み込む"""
+        path = tmp_path / 'postal.csv'
+        path.write_text('postal_code,location_name\n100-0001,東京都千代田区千代田\n', encoding='utf-8')
+        
+        assert PostalIndex.from_csv(path).search('100') == [('1000001', '東京都千代田区千代田')]
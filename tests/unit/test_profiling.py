@@ -0,0 +1,132 @@
+"""リクエスト単位のプロファイリングのユニットテスト"""
+
+import pytest
+import responses
+
+from weather_zip_lookup import create_app
+from weather_zip_lookup.profiling import PROFILE_RESULT_HEADER, RequestProfiler
+
+
+def busy_work():
+    return sorted(str(number) for number in range(1000))
+
+
+def add_upstream_mocks():
+    """上流APIのモックを登録"""
+    responses.add(
+        responses.GET,
+        "http://api.openweathermap.org/geo/1.0/zip",
+        json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.openweathermap.org/data/2.5/weather",
+        json={'main': {'temp': 22.5}},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.openweathermap.org/data/3.0/onecall",
+        json={'hourly': [{'pop': 0.45}]},
+        status=200
+    )
+
+
+def make_app(**config):
+    return create_app({
+        'TESTING': True,
+        'OPENWEATHER_API_KEY': 'test_api_key',
+        'PROFILING_ENABLED': True,
+        'PROFILING_SECRET': 's3cret',
+        **config,
+    })
+
+
+class TestRequestProfiler:
+    """RequestProfilerのテスト"""
+    
+    def test_cpu_profile(self):
+        """cProfileの統計に計測した関数が含まれる"""
+        with RequestProfiler('cpu') as profiler:
+            busy_work()
+        
+        summary = profiler.summary()
+        assert 'busy_work' in summary['cpu']
+        assert 'memory' not in summary
+    
+    def test_memory_profile(self):
+        """tracemallocで計測中の割り当てを記録する"""
+        with RequestProfiler('memory') as profiler:
+            data = busy_work()
+        
+        assert data
+        assert 'test_profiling.py' in profiler.summary()['memory']
+    
+    def test_write_files(self, tmp_path):
+        """統計とスナップショットをファイルに書き込む"""
+        with RequestProfiler('both') as profiler:
+            busy_work()
+        
+        paths = profiler.write(tmp_path / 'profiles', '/api/weather')
+        
+        suffixes = sorted(''.join(path.suffixes) for path in paths)
+        assert suffixes == ['.cpu.txt', '.memory.txt', '.prof', '.tracemalloc']
+        assert all(path.exists() and 'api_weather' in path.name for path in paths)
+    
+    def test_invalid_mode(self):
+        """不正な計測対象はエラー"""
+        with pytest.raises(ValueError):
+            RequestProfiler('disk')
+
+
+class TestProfilingHook:
+    """Webのプロファイリングフックのテスト"""
+    
+    @responses.activate
+    def test_inline_summary_with_secret(self):
+        """シークレットを指定したリクエストはサマリーをJSONに含める"""
+        add_upstream_mocks()
+        client = make_app().test_client()
+        
+        response = client.post('/api/weather', json={'postal_code': '1000001'}, headers={'X-Profile': 's3cret'})
+        
+        body = response.get_json()
+        assert body['success'] is True
+        assert 'get_weather_by_postal_code' in body['profile']['cpu']
+        assert response.headers[PROFILE_RESULT_HEADER] == 'inline'
+    
+    @responses.activate
+    def test_wrong_secret_is_not_profiled(self):
+        """シークレットが一致しなければ計測しない"""
+        add_upstream_mocks()
+        client = make_app().test_client()
+        
+        response = client.post('/api/weather', json={'postal_code': '1000001'}, headers={'X-Profile': 'wrong'})
+        
+        assert 'profile' not in response.get_json()
+        assert PROFILE_RESULT_HEADER not in response.headers
+    
+    @responses.activate
+    def test_write_to_directory(self, tmp_path):
+        """PROFILING_DIRを設定するとファイルに書き込む"""
+        add_upstream_mocks()
+        client = make_app(PROFILING_DIR=str(tmp_path)).test_client()
+        
+        response = client.post(
+            '/api/weather',
+            json={'postal_code': '1000001'},
+            headers={'X-Profile': 's3cret', 'X-Profile-Mode': 'memory'}
+        )
+        
+        assert 'profile' not in response.get_json()
+        written = {path.name for path in tmp_path.iterdir()}
+        assert set(response.headers[PROFILE_RESULT_HEADER].split(', ')) == written
+        assert any(name.endswith('.tracemalloc') for name in written)
+    
+    def test_disabled_registers_no_hooks(self):
+        """無効な場合、またはシークレットがない場合はフックを登録しない"""
+        for config in ({'PROFILING_ENABLED': False}, {'PROFILING_SECRET': None}):
+            app = make_app(**config)
+            assert not app.before_request_funcs
+            assert not app.after_request_funcs.get(None)
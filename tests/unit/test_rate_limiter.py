@@ -0,0 +1,53 @@
+"""RateLimiterのユニットテスト"""
+
+import pytest
+
+from weather_zip_lookup.services import RateLimiter
+
+
+class FakeClock:
+    """sleepで時刻が進むテスト用の時計"""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter:
+    """RateLimiterのテスト"""
+    
+    def test_burst_does_not_wait(self):
+        """バースト容量内のリクエストは待機しない"""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=3, clock=clock, sleep=clock.sleep)
+        
+        assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert clock.sleeps == []
+    
+    def test_waits_when_tokens_exhausted(self):
+        """トークンが尽きると補充されるまで待機する"""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=1, clock=clock, sleep=clock.sleep)
+        
+        limiter.acquire()
+        assert limiter.acquire() == pytest.approx(0.5)
+        assert limiter.acquire() == pytest.approx(0.5)
+    
+    def test_per_minute(self):
+        """1分あたりの回数から作成できる"""
+        limiter = RateLimiter.per_minute(60)
+        
+        assert limiter.rate == pytest.approx(1.0)
+        assert limiter.burst == 10
+    
+    def test_invalid_rate(self):
+        """正でないレートはエラー"""
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
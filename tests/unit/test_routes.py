@@ -0,0 +1,473 @@
+"""Webルートのユニットテスト"""
+
+import pytest
+import responses
+
+from weather_zip_lookup import create_app
+
+
+@pytest.fixture
+def client():
+    """テスト用のFlaskクライアント"""
+    app = create_app({'TESTING': True, 'OPENWEATHER_API_KEY': 'test_api_key', 'DEFAULT_POSTAL_CODE': ''})
+    return app.test_client()
+
+
+def add_upstream_mocks():
+    """上流APIのモックを登録"""
+    responses.add(
+        responses.GET,
+        "http://api.openweathermap.org/geo/1.0/zip",
+        json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.openweathermap.org/data/2.5/weather",
+        json={'main': {'temp': 22.5}},
+        status=200
+    )
+    responses.add(
+        responses.GET,
+        "https://api.openweathermap.org/data/3.0/onecall",
+        json={'hourly': [{'dt': 1700000000, 'temp': 22.5, 'pop': 0.45}]},
+        status=200
+    )
+
+
+class TestServerTiming:
+    """Server-Timingヘッダーのテスト"""
+    
+    @responses.activate
+    def test_weather_response_has_server_timing(self, client):
+        """各ステージの所要時間と上流APIのステータスを返す"""
+        add_upstream_mocks()
+        
+        response = client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert response.status_code == 200
+        header = response.headers['Server-Timing']
+        assert 'geocode;dur=' in header
+        assert 'desc="cache=miss status=200"' in header
+        assert 'current;dur=' in header
+        assert 'onecall;dur=' in header
+        assert 'serialize;dur=' in header
+    
+    @responses.activate
+    def test_error_response_has_server_timing(self, client):
+        """上流APIのエラーでもどのステージで失敗したかを返す"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'message': 'rate limited'},
+            status=429
+        )
+        
+        response = client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert response.status_code == 500
+        assert 'geocode;dur=' in response.headers['Server-Timing']
+        assert 'status=429' in response.headers['Server-Timing']
+    
+    def test_validation_error_has_no_server_timing(self, client):
+        """上流APIを呼ぶ前に失敗した場合はヘッダーを付けない"""
+        response = client.post('/api/weather', json={'postal_code': '123'})
+        
+        assert response.status_code == 400
+        assert 'Server-Timing' not in response.headers
+
+
+class TestUpstreamBudget:
+    """/api/weather 1回あたりの上流APIの呼び出し回数のテスト"""
+    
+    @responses.activate
+    def test_miss_and_hit(self, client, upstream_budget):
+        """キャッシュミスはエンドポイントごとに1回、キャッシュヒットは0回"""
+        add_upstream_mocks()
+        
+        with upstream_budget(geocode=1, onecall=1, weather=1):
+            assert client.post('/api/weather', json={'postal_code': '1000001'}).status_code == 200
+        with upstream_budget(total=0):
+            assert client.post('/api/weather', json={'postal_code': '1000001'}).status_code == 200
+
+
+class TestResponseCache:
+    """エンコード済みのレスポンスのキャッシュのテスト"""
+    
+    @staticmethod
+    def add_mocks_with_alerts():
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={
+                'hourly': [{'pop': 0.45}],
+                'alerts': [
+                    {'event': 'Rain warning', 'description': '大雨警報が発令されています。' * 5, 'tags': ['Severe']},
+                    {'event': 'Flood warning', 'description': '洪水警報が発令されています。' * 5, 'tags': ['Severe']},
+                ]
+            },
+            status=200
+        )
+    
+    @responses.activate
+    def test_hit_reuses_encoded_bytes(self, client, monkeypatch):
+        """同じ天気データの間は再シリアライズせず、キャッシュしたバイト列を返す"""
+        from weather_zip_lookup.routes import main
+        
+        self.add_mocks_with_alerts()
+        first = client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        def fail(weather_data):
+            raise AssertionError('再シリアライズされました')
+        monkeypatch.setattr(main, 'encode_weather_response', fail)
+        second = client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert second.status_code == 200
+        assert second.get_data() == first.get_data()
+        assert second.get_json()['data']['alerts'][0]['alert_type'] == '大雨'
+        assert 'serialize;dur=' in second.headers['Server-Timing']
+        assert 'desc="cache=hit"' in second.headers['Server-Timing'].split('serialize;', 1)[1]
+        assert second.headers['Vary'] == 'Accept-Encoding'
+    
+    @responses.activate
+    def test_gzip_variant(self, client):
+        """gzipを受け付けるクライアントには圧縮済みの本文を返す"""
+        import gzip
+        
+        self.add_mocks_with_alerts()
+        plain = client.post('/api/weather', json={'postal_code': '1000001'})
+        compressed = client.post(
+            '/api/weather', json={'postal_code': '1000001'}, headers={'Accept-Encoding': 'gzip, deflate'}
+        )
+        
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Encoding' not in plain.headers
+        assert gzip.decompress(compressed.get_data()) == plain.get_data()
+        assert len(compressed.get_data()) < len(plain.get_data())
+    
+    @responses.activate
+    def test_gzip_is_built_on_first_gzip_request(self, client):
+        """gzipを受け付けないクライアントだけなら圧縮しない"""
+        self.add_mocks_with_alerts()
+        client.post('/api/weather', json={'postal_code': '1000001'})
+        response_cache = client.application.extensions['response_cache']
+        assert response_cache.get('1000001').gzipped is None
+        
+        client.post('/api/weather', json={'postal_code': '1000001'}, headers={'Accept-Encoding': 'gzip'})
+        assert response_cache.get('1000001').gzipped is not None
+    
+    @responses.activate
+    def test_uncached_deployment_uses_jsonify(self, monkeypatch):
+        """天気データのキャッシュが無効なら、エンコード済みのレスポンスを作らずにjsonifyで返す"""
+        from weather_zip_lookup.routes import main
+        
+        self.add_mocks_with_alerts()
+        app = create_app({'TESTING': True, 'OPENWEATHER_API_KEY': 'test_api_key', 'WEATHER_CACHE_TTL': 0})
+        
+        def fail(weather_data):
+            raise AssertionError('エンコード済みのレスポンスを作成しました')
+        monkeypatch.setattr(main, 'encode_weather_response', fail)
+        response = app.test_client().post(
+            '/api/weather', json={'postal_code': '1000001'}, headers={'Accept-Encoding': 'gzip'}
+        )
+        
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert 'Vary' not in response.headers
+        assert response.get_json()['data']['temperature'] == 22.5
+    
+    @responses.activate
+    def test_new_weather_data_is_reencoded(self, client):
+        """天気データが新しくなればエンコードし直す"""
+        self.add_mocks_with_alerts()
+        client.post('/api/weather', json={'postal_code': '1000001'})
+        client.application.extensions['weather_service'][1].weather_cache.clear()
+        
+        response = client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert 'desc="cache=miss"' in response.headers['Server-Timing'].split('serialize;', 1)[1]
+        assert response.get_json()['success'] is True
+
+
+class TestFlightRecorder:
+    """フライトレコーダーのデバッグエンドポイントのテスト"""
+    
+    @responses.activate
+    def test_lookup_is_recorded(self, client):
+        """取得処理のスパンとステータスが記録される"""
+        add_upstream_mocks()
+        client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        response = client.get('/debug/flight-recorder')
+        
+        assert response.status_code == 200
+        record = response.get_json()['recent'][0]
+        assert record['postal_code'] == '1000001'
+        assert record['outcome'] == 200
+        assert [span['name'] for span in record['spans']] == [
+            'cache', 'geocode', 'onecall', 'current', 'alerts', 'serialize'
+        ]
+        assert record['spans'][0]['cache'] == 'miss'
+        assert record['fallbacks'] == []
+    
+    @responses.activate
+    def test_fallback_is_recorded(self, client):
+        """握りつぶしたOne Call APIの失敗がフォールバックとして記録される"""
+        add_upstream_mocks()
+        responses.replace(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'message': 'unavailable'},
+            status=503
+        )
+        client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        record = client.get('/debug/flight-recorder').get_json()['slowest'][0]
+        
+        assert record['fallbacks'] == ['onecall:onecall_failed']
+    
+    def test_requires_token_when_configured(self):
+        """DEBUG_TOKENが設定されていればトークンが必要"""
+        app = create_app({'TESTING': True, 'OPENWEATHER_API_KEY': 'test_api_key', 'DEBUG_TOKEN': 'secret'})
+        client = app.test_client()
+        
+        assert client.get('/debug/flight-recorder').status_code == 403
+        assert client.get('/debug/flight-recorder', headers={'X-Debug-Token': 'secret'}).status_code == 200
+    
+    def test_remote_access_denied_without_token(self, client):
+        """トークンが未設定の場合はローカルホスト以外からのアクセスを拒否する"""
+        response = client.get('/debug/flight-recorder', environ_base={'REMOTE_ADDR': '203.0.113.5'})
+        
+        assert response.status_code == 403
+    
+    def test_disabled(self):
+        """FLIGHT_RECORDER_SIZEが0ならエンドポイントを登録しない"""
+        app = create_app({'TESTING': True, 'OPENWEATHER_API_KEY': 'test_api_key', 'FLIGHT_RECORDER_SIZE': 0})
+        
+        assert app.test_client().get('/debug/flight-recorder').status_code == 404
+
+
+class TestForecast:
+    """予報エンドポイントのテスト"""
+    
+    @responses.activate
+    def test_forecast_served_from_weather_cache(self, client, upstream_budget):
+        """天気データを取得済みなら上流APIを呼ばずに予報を返す"""
+        add_upstream_mocks()
+        with upstream_budget(geocode=1, onecall=1, weather=1):
+            client.post('/api/weather', json={'postal_code': '1000001'})
+        
+        with upstream_budget(total=0):
+            response = client.post('/api/forecast', json={'postal_code': '1000001', 'hours': 1})
+        
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        assert data['location_name'] == '東京'
+        assert data['hourly'] == [{'time': 1700000000, 'temperature': 22.5, 'precipitation_probability': 45.0}]
+    
+    @pytest.mark.parametrize('hours', [0, 49, '12', True])
+    def test_invalid_hours(self, client, hours):
+        """時間数が1から48の整数でなければ400"""
+        response = client.post('/api/forecast', json={'postal_code': '1000001', 'hours': hours})
+        
+        assert response.status_code == 400
+
+
+class TestAutocomplete:
+    """郵便番号の前方一致検索エンドポイントのテスト"""
+    
+    @pytest.fixture
+    def dataset_client(self, tmp_path):
+        path = tmp_path / 'postal.csv'
+        path.write_text(
+            '1000001,東京都千代田区千代田\n1000005,東京都千代田区丸の内\n1010001,東京都千代田区神田須田町\n',
+            encoding='utf-8'
+        )
+        app = create_app({'TESTING': True, 'OPENWEATHER_API_KEY': 'test_api_key', 'POSTAL_DATASET': str(path)})
+        return app.test_client()
+    
+    def test_returns_matches(self, dataset_client):
+        """前方一致する郵便番号と地名、全件数を返す"""
+        response = dataset_client.get('/api/postal-codes?prefix=100&limit=1')
+        
+        assert response.status_code == 200
+        assert response.get_json()['data'] == {
+            'prefix': '100',
+            'total': 2,
+            'results': [{'postal_code': '1000001', 'location_name': '東京都千代田区千代田'}]
+        }
+    
+    @pytest.mark.parametrize('query', ['prefix=10', 'prefix=1000001', 'prefix=10a', 'prefix=²²²', 'prefix=100&limit=51'])
+    def test_invalid_query(self, dataset_client, query):
+        """桁数・件数が範囲外、またはASCII以外の数字なら400"""
+        assert dataset_client.get(f'/api/postal-codes?{query}').status_code == 400
+    
+    def test_without_dataset(self, client):
+        """郵便番号データが設定されていなければ404"""
+        assert client.get('/api/postal-codes?prefix=100').status_code == 404
+    
+    @responses.activate
+    def test_aggregate(self, dataset_client):
+        """同じ座標の郵便番号は1地点としてまとめ、地域の統計を返す"""
+        from weather_zip_lookup.metrics import AGGREGATE_REQUESTS, REQUESTS
+        
+        add_upstream_mocks()
+        weather_requests = REQUESTS.labels(200).get()
+        aggregate_requests = AGGREGATE_REQUESTS.labels(200).get()
+        
+        response = dataset_client.post('/api/aggregate', json={'prefix': '100'})
+        
+        assert response.status_code == 200
+        # /api/weather のレイテンシには含めず、集計用のメトリクスに記録する
+        assert REQUESTS.labels(200).get() == weather_requests
+        assert AGGREGATE_REQUESTS.labels(200).get() == aggregate_requests + 1
+        data = response.get_json()['data']
+        assert (data['postal_codes'], data['locations'], data['failed']) == (2, 1, 0)
+        assert (data['min_temperature'], data['max_temperature'], data['mean_temperature']) == (22.5, 22.5, 22.5)
+        assert data['max_precipitation_probability'] == 45.0
+        assert 'aggregate;dur=' in response.headers['Server-Timing']
+    
+    @pytest.mark.parametrize('prefix', ['10', '10a', '²²²', '543'])
+    def test_aggregate_invalid_prefix(self, dataset_client, prefix):
+        """桁数が範囲外、ASCII以外の数字、または一致する郵便番号がなければ400"""
+        assert dataset_client.post('/api/aggregate', json={'prefix': prefix}).status_code == 400
+    
+    @responses.activate
+    def test_unknown_postal_code_rejected_before_upstream(self, tmp_path):
+        """VALIDATE_POSTAL_CODESが有効なら、郵便番号データにない郵便番号は上流APIを呼ばずに400"""
+        path = tmp_path / 'postal.csv'
+        path.write_text('1000001,東京都千代田区千代田\n', encoding='utf-8')
+        app = create_app({
+            'TESTING': True,
+            'OPENWEATHER_API_KEY': 'test_api_key',
+            'POSTAL_DATASET': str(path),
+            'VALIDATE_POSTAL_CODES': True
+        })
+        
+        response = app.test_client().post('/api/weather', json={'postal_code': '1000002'})
+        
+        assert response.status_code == 400
+        assert '存在しません' in response.get_json()['error']
+        assert len(responses.calls) == 0
+    
+    @responses.activate
+    def test_corrupt_dataset_skips_validation(self, tmp_path):
+        """郵便番号データを解析できなければ、存在を確認せずに天気を返す"""
+        path = tmp_path / 'postal.csv'
+        path.write_bytes(b'1000001,\x81\x20\x85\x00\n')  # UTF-8でもShift_JISでも読めない
+        app = create_app({
+            'TESTING': True,
+            'OPENWEATHER_API_KEY': 'test_api_key',
+            'POSTAL_DATASET': str(path),
+            'VALIDATE_POSTAL_CODES': True
+        })
+        add_upstream_mocks()
+        
+        response = app.test_client().post('/api/weather', json={'postal_code': '1000002'})
+        
+        assert response.status_code == 200
+        assert not (tmp_path / 'postal.csv.bitset').exists()
+    
+    @responses.activate
+    def test_dataset_without_postal_codes_skips_validation(self, tmp_path):
+        """郵便番号を1件も読み取れないデータ（区切り文字の誤り）なら、存在を確認せずに天気を返す"""
+        path = tmp_path / 'postal.csv'
+        path.write_text('1000001;東京都千代田区千代田\n', encoding='utf-8')
+        app = create_app({
+            'TESTING': True,
+            'OPENWEATHER_API_KEY': 'test_api_key',
+            'POSTAL_DATASET': str(path),
+            'VALIDATE_POSTAL_CODES': True
+        })
+        add_upstream_mocks()
+        
+        response = app.test_client().post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert response.status_code == 200
+        assert not (tmp_path / 'postal.csv.bitset').exists()
+    
+    def test_aggregate_without_dataset(self, client):
+        """郵便番号データが設定されていなければ404"""
+        assert client.post('/api/aggregate', json={'prefix': '100'}).status_code == 404
+
+
+class TestComponentCache:
+    """構成要素ごとのキャッシュの設定のテスト"""
+    
+    def test_component_ttls_from_config(self):
+        """PRECIPITATION_CACHE_TTL / ALERTS_CACHE_TTL を指定すると構成要素ごとにキャッシュする"""
+        from weather_zip_lookup.routes.main import get_weather_service
+        
+        app = create_app({
+            'TESTING': True,
+            'OPENWEATHER_API_KEY': 'test_api_key',
+            'WEATHER_CACHE_TTL': 300,
+            'PRECIPITATION_CACHE_TTL': 1800,
+            'ALERTS_CACHE_TTL': 60
+        })
+        with app.app_context():
+            service = get_weather_service()
+        
+        assert service.component_cache.ttls == {'temperature': 300, 'precipitation': 1800, 'alerts': 60}
+        # まとめた天気データは最も短い有効期限で取得し直す
+        assert service.weather_cache.ttl == 60
+        assert app.test_client().get('/metrics').get_data(as_text=True).count('cache="component"') > 0
+    
+    def test_replaced_service_is_closed(self, client):
+        """APIキーが変更されるとサービスを作り直し、それまでのサービスを閉じる"""
+        from weather_zip_lookup.routes.main import get_weather_service
+        
+        app = client.application
+        with app.app_context():
+            previous = get_weather_service()
+            assert get_weather_service() is previous
+            app.config['OPENWEATHER_API_KEY'] = 'rotated_api_key'
+            service = get_weather_service()
+        
+        assert service is not previous
+        assert service.api_key == 'rotated_api_key'
+        assert previous._closed
+        assert not service._closed
+    
+    def test_disabled_by_default(self, client):
+        """既定では構成要素ごとにはキャッシュしない"""
+        from weather_zip_lookup.routes.main import get_weather_service
+        
+        with client.application.app_context():
+            assert get_weather_service().component_cache is None
+    
+    def test_service_class_can_be_patched(self):
+        """WeatherServiceを差し替えても（E2Eテストのモックと同じ方法）キャッシュを作成して応答する"""
+        from unittest.mock import patch
+        from weather_zip_lookup.models import WeatherData
+        
+        weather_data = WeatherData(
+            postal_code="1000001",
+            temperature=22.5,
+            precipitation_probability=35.0,
+            alerts=[],
+            location_name="東京都千代田区"
+        )
+        with patch('weather_zip_lookup.routes.main.WeatherService') as mock_service:
+            mock_service.return_value.get_weather_by_postal_code.return_value = weather_data
+            app = create_app({
+                'TESTING': True,
+                'OPENWEATHER_API_KEY': 'test_api_key',
+                'ALERTS_CACHE_TTL': 3600
+            })
+            response = app.test_client().post('/api/weather', json={'postal_code': '1000001'})
+        
+        assert response.status_code == 200
+        assert response.get_json()['data']['temperature'] == 22.5
@@ -0,0 +1,70 @@
+"""空間インデックスのユニットテスト"""
+
+import pytest
+
+from weather_zip_lookup.services import SpatialIndex
+from weather_zip_lookup.services.spatial_index import encode_geohash, haversine_km
+
+
+# 東京駅・新宿駅・横浜駅・大阪駅
+TOKYO = (35.6812, 139.7671)
+SHINJUKU = (35.6896, 139.7006)
+YOKOHAMA = (35.4658, 139.6223)
+OSAKA = (34.7025, 135.4959)
+
+
+def test_encode_geohash():
+    """既知の座標を正しくgeohashに変換する"""
+    assert encode_geohash(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert encode_geohash(*TOKYO, 5) == 'xn76u'
+
+
+def test_haversine_km():
+    """東京駅と大阪駅の距離はおよそ400km"""
+    assert haversine_km(*TOKYO, *OSAKA) == pytest.approx(403, abs=5)
+    assert haversine_km(*TOKYO, *TOKYO) == 0
+
+
+class TestSpatialIndex:
+    """SpatialIndexのテスト"""
+    
+    @pytest.fixture
+    def index(self):
+        index = SpatialIndex.for_distance(10)
+        index.add('1000005', *TOKYO)
+        index.add('1600022', *SHINJUKU)
+        index.add('2200011', *YOKOHAMA)
+        index.add('5300001', *OSAKA)
+        return index
+    
+    def test_nearby_sorted_by_distance(self, index):
+        """距離以内の郵便番号を近い順に返す"""
+        results = index.nearby(*TOKYO, max_distance_km=10)
+        
+        assert [postal_code for _, postal_code in results] == ['1000005', '1600022']
+        assert results[1][0] == pytest.approx(6.1, abs=0.5)
+    
+    def test_nearby_searches_beyond_neighbor_cells(self, index):
+        """セルより大きな距離でも周囲のセルまで調べる"""
+        results = index.nearby(*TOKYO, max_distance_km=40, limit=3)
+        
+        assert [postal_code for _, postal_code in results] == ['1000005', '1600022', '2200011']
+    
+    def test_add_moves_and_remove(self, index):
+        """同じ郵便番号を追加すると座標を更新し、削除すると検索されない"""
+        index.add('1600022', *OSAKA)
+        assert [postal_code for _, postal_code in index.nearby(*TOKYO, 10)] == ['1000005']
+        
+        index.remove('1000005')
+        assert index.nearby(*TOKYO, 10) == []
+        assert '1000005' not in index
+        assert len(index) == 3
+    
+    def test_for_distance_precision(self):
+        """距離が大きいほど粗いセルを選ぶ"""
+        assert SpatialIndex.for_distance(1).precision > SpatialIndex.for_distance(50).precision
+    
+    def test_invalid_precision(self):
+        """精度が範囲外ならValueError"""
+        with pytest.raises(ValueError):
+            SpatialIndex(0)
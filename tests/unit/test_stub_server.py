@@ -0,0 +1,95 @@
+"""OpenWeatherMapスタブサーバーのユニットテスト"""
+
+import random
+
+import pytest
+import requests
+
+from benchmarks.stub_server import LatencyDistribution, StubServer, StubServerConfig
+from weather_zip_lookup.exceptions import APIError
+from weather_zip_lookup.services import WeatherService
+
+
+class TestLatencyDistribution:
+    """レイテンシ分布のテスト"""
+    
+    def test_parse_fixed(self):
+        """固定遅延をミリ秒で指定できる"""
+        distribution = LatencyDistribution.parse("fixed:20")
+        assert distribution.sample(random.Random(0)) == pytest.approx(0.02)
+    
+    def test_parse_uniform_range(self):
+        """一様分布のサンプルは範囲内に収まる"""
+        distribution = LatencyDistribution.parse("uniform:10,50")
+        rng = random.Random(0)
+        assert all(0.01 <= distribution.sample(rng) <= 0.05 for _ in range(100))
+    
+    def test_samples_are_never_negative(self):
+        """正規分布でも負の遅延にはならない"""
+        distribution = LatencyDistribution.parse("normal:0,10")
+        rng = random.Random(0)
+        assert all(distribution.sample(rng) >= 0 for _ in range(100))
+    
+    @pytest.mark.parametrize("spec", ["gamma:1", "uniform:10", "lognormal:1,2,3"])
+    def test_parse_invalid(self, spec):
+        """未知の分布やパラメータ数の誤りはエラー"""
+        with pytest.raises(ValueError):
+            LatencyDistribution.parse(spec)
+
+
+class TestStubServer:
+    """スタブサーバーとWeatherServiceの結合テスト"""
+    
+    @pytest.mark.upstream_budget(geocode=1, onecall=1, weather=1)
+    def test_weather_service_against_stub(self, stub_server):
+        """ベースURLを向けるとWeatherServiceがスタブから天気データを取得できる"""
+        service = WeatherService("test_api_key", base_url=stub_server.base_url)
+        
+        weather_data = service.get_weather_by_postal_code("1000001")
+        
+        assert weather_data.postal_code == "1000001"
+        assert weather_data.location_name == "地域100"
+        assert weather_data.alerts[0].alert_type == "大雨"
+        assert stub_server.stats()["calls"]["geocode"] == 1
+    
+    def test_unknown_postal_code_returns_404(self, stub_server):
+        """存在しない郵便番号は404になる"""
+        service = WeatherService("test_api_key", base_url=stub_server.base_url)
+        
+        with pytest.raises(APIError, match="郵便番号が見つかりません"):
+            service.get_weather_by_postal_code("0000001")
+    
+    def test_missing_api_key_returns_401(self, stub_server):
+        """appidがなければ401を返す"""
+        response = requests.get(f"{stub_server.base_url}/data/2.5/weather", params={"lat": 35, "lon": 139})
+        assert response.status_code == 401
+    
+    def test_error_injection(self):
+        """注入率1.0では常に429を返す"""
+        with StubServer(StubServerConfig(rate_429=1.0)) as server:
+            service = WeatherService("test_api_key", base_url=server.base_url)
+            with pytest.raises(APIError):
+                service.get_weather_by_postal_code("1000001")
+            assert server.stats()["statuses"] == {"429": 1}
+    
+    def test_payload_size(self):
+        """hourlyの件数とパディングでペイロードサイズを変えられる"""
+        with StubServer(StubServerConfig(hourly_entries=5, padding_bytes=1000)) as server:
+            response = requests.get(
+                f"{server.base_url}/data/3.0/onecall",
+                params={"lat": 35, "lon": 139, "appid": "key"}
+            )
+        body = response.json()
+        assert len(body["hourly"]) == 5
+        assert len(body["padding"]) == 1000
+    
+    def test_stats_endpoint_and_reset(self, stub_server):
+        """/__stats で呼び出し回数を取得し、/__reset でリセットできる"""
+        service = WeatherService("test_api_key", base_url=stub_server.base_url)
+        service.get_weather_by_postal_code("1000001")
+        
+        stats = requests.get(f"{stub_server.base_url}/__stats").json()
+        assert stats["calls"]["geocode"] == 1
+        
+        requests.post(f"{stub_server.base_url}/__reset")
+        assert stub_server.stats() == {"calls": {}, "statuses": {}}
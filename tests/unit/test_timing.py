@@ -0,0 +1,87 @@
+"""ステージごとの計測のユニットテスト"""
+
+from itertools import count
+
+import pytest
+
+from weather_zip_lookup.services import Timings
+from weather_zip_lookup.services.timing import NULL_TIMINGS, current_span, note_fallback
+
+
+def fake_clock(step=0.01):
+    """呼び出すたびにstep秒ずつ進む時計"""
+    ticks = count()
+    return lambda: next(ticks) * step
+
+
+class TestTimings:
+    """Timingsのテスト"""
+    
+    def test_span_records_duration(self):
+        """スパンの所要時間を記録する"""
+        timings = Timings(clock=fake_clock())
+        
+        with timings.span('geocode') as span:
+            span.cache = 'miss'
+            span.status = 200
+        
+        assert timings.spans[0].name == 'geocode'
+        assert timings.spans[0].duration == pytest.approx(0.01)
+        assert timings.total == pytest.approx(0.01)
+    
+    def test_span_marks_error_on_exception(self):
+        """例外が発生し、ステータスが未記録ならerrorとする"""
+        timings = Timings(clock=fake_clock())
+        
+        with pytest.raises(ValueError):
+            with timings.span('current'):
+                raise ValueError("boom")
+        
+        assert timings.spans[0].status == 'error'
+    
+    def test_current_span(self):
+        """スパン内ではcurrent_spanで参照でき、抜けると元に戻る"""
+        timings = Timings()
+        assert current_span() is None
+        
+        with timings.span('onecall') as span:
+            assert current_span() is span
+        
+        assert current_span() is None
+    
+    def test_server_timing_header(self):
+        """Server-Timingヘッダーの形式に変換する"""
+        timings = Timings(clock=fake_clock(0.0125))
+        with timings.span('geocode') as span:
+            span.cache = 'hit'
+        with timings.span('onecall') as span:
+            span.status = 429
+        with timings.span('serialize'):
+            pass
+        
+        assert timings.to_server_timing() == (
+            'geocode;dur=12.5;desc="cache=hit", '
+            'onecall;dur=12.5;desc="status=429", '
+            'serialize;dur=12.5'
+        )
+    
+    def test_note_fallback(self):
+        """現在のスパンにフォールバックを記録し、最初の理由を残す"""
+        timings = Timings(clock=fake_clock(0.0125))
+        note_fallback('ignored')  # 計測していない場合は何もしない
+        
+        with timings.span('alerts'):
+            note_fallback('alerts_failed')
+            note_fallback('other')
+        
+        assert timings.spans[0].fallback == 'alerts_failed'
+        assert timings.to_server_timing() == 'alerts;dur=12.5;desc="fallback=alerts_failed"'
+    
+    def test_null_timings_records_nothing(self):
+        """NULL_TIMINGSは何も記録せず、current_spanも設定しない"""
+        with NULL_TIMINGS.span('geocode') as span:
+            span.status = 200
+            assert current_span() is None
+        
+        assert not NULL_TIMINGS.spans
+        assert NULL_TIMINGS.to_server_timing() == ''
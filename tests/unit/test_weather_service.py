@@ -1,6 +1,9 @@
 """WeatherServiceのユニットテスト"""
 
+import threading
+
 import pytest
+import requests
 import responses
 from weather_zip_lookup.services import WeatherService
 from weather_zip_lookup.exceptions import (
@@ -34,6 +37,42 @@ class TestWeatherServiceInit:
         """APIキーの前後の空白を削除"""
         service = WeatherService("  test_api_key  ")
         assert service.api_key == "test_api_key"
+    
+    def test_init_with_base_url(self):
+        """ベースURLを指定するとエンドポイントのホストだけが置き換わる"""
+        service = WeatherService("test_api_key", base_url="http://127.0.0.1:8081/")
+        assert service.GEOCODING_API_URL == "http://127.0.0.1:8081/geo/1.0/zip"
+        assert service.CURRENT_WEATHER_API_URL == "http://127.0.0.1:8081/data/2.5/weather"
+        assert service.ONE_CALL_API_URL == "http://127.0.0.1:8081/data/3.0/onecall"
+        # クラス属性は変更されない
+        assert WeatherService.ONE_CALL_API_URL.startswith("https://api.openweathermap.org/")
+    
+    def test_close(self, monkeypatch):
+        """閉じると作成したセッションとバックグラウンドのスレッドを閉じ、渡されたセッションは閉じない"""
+        from unittest.mock import MagicMock
+        
+        service = WeatherService("test_api_key")
+        fetched = threading.Event()
+        fetch = MagicMock(side_effect=lambda *args: fetched.set())
+        monkeypatch.setattr(service, '_fetch_weather', fetch)
+        session = service._session
+        service._schedule_refresh('1000001', 35.6895, 139.6917, '東京')
+        executor = service._refresh_executor
+        assert fetched.wait(5)
+        service._session = MagicMock(wraps=session)
+        
+        service.close()
+        service._schedule_refresh('1000002', 35.6895, 139.6917, '東京')
+        
+        service._session.close.assert_called_once()
+        assert executor._shutdown
+        # 閉じた後は取得し直さない
+        assert [call.args[0] for call in fetch.call_args_list] == ['1000001']
+        assert service._refresh_executor is None
+        
+        shared = MagicMock()
+        WeatherService("test_api_key", session=shared).close()
+        shared.close.assert_not_called()
 
 
 class TestPostalCodeValidation:
@@ -115,6 +154,41 @@ class TestGeocodingAPI:
         with pytest.raises(APIError, match="指定された郵便番号が見つかりませんでした"):
             service._convert_postal_code_to_coordinates("9999999")
     
+    @responses.activate
+    def test_convert_postal_code_not_found_is_negatively_cached(self):
+        """404の郵便番号は有効期限の間は上流APIに問い合わせない"""
+        from weather_zip_lookup.services import TTLCache, Timings
+        
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'message': 'not found'},
+            status=404
+        )
+        now = [0.0]
+        negative_cache = TTLCache(maxsize=1, ttl=60, clock=lambda: now[0])
+        service = WeatherService("test_api_key", negative_cache=negative_cache)
+        
+        with pytest.raises(APIError, match="指定された郵便番号が見つかりませんでした"):
+            service._convert_postal_code_to_coordinates("9999999")
+        timings = Timings()
+        with pytest.raises(APIError, match="指定された郵便番号が見つかりませんでした"):
+            service.get_weather_by_postal_code("9999999", timings=timings)
+        
+        assert len(responses.calls) == 1
+        assert (negative_cache.hits, timings.spans[0].cache) == (1, 'negative')
+        
+        # 最大件数を超えると古いものから破棄する
+        with pytest.raises(APIError):
+            service._convert_postal_code_to_coordinates("9999998")
+        assert negative_cache.evictions == 1
+        
+        # 有効期限が切れたら再び問い合わせる
+        now[0] = 61.0
+        with pytest.raises(APIError):
+            service._convert_postal_code_to_coordinates("9999998")
+        assert len(responses.calls) == 3
+    
     @responses.activate
     def test_convert_postal_code_invalid_api_key(self):
         """無効なAPIキー（401エラー）"""
@@ -143,6 +217,27 @@ class TestGeocodingAPI:
         with pytest.raises(APIError, match="APIレート制限を超えました"):
             service._convert_postal_code_to_coordinates("1000001")
     
+    @responses.activate
+    def test_convert_postal_code_uses_cache(self):
+        """同じ郵便番号の2回目の変換はキャッシュから返す"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={
+                'lat': 35.6895,
+                'lon': 139.6917,
+                'name': '東京'
+            },
+            status=200
+        )
+        
+        service = WeatherService("test_api_key")
+        first = service._convert_postal_code_to_coordinates("1000001")
+        second = service._convert_postal_code_to_coordinates("1000001")
+        
+        assert first == second == (35.6895, 139.6917, '東京')
+        assert len(responses.calls) == 1
+    
     @responses.activate
     def test_convert_postal_code_server_error(self):
         """サーバーエラー（500エラー）"""
@@ -323,6 +418,21 @@ class TestAlertTypeMapping:
         """未知のイベントはタイトルケースで返す"""
         service = WeatherService("test_api_key")
         assert service._map_alert_type("unknown event") == "Unknown Event"
+    
+    def test_map_prefers_first_defined_key(self):
+        """複数のキーが一致する場合はマッピングで先に定義されたキーを優先"""
+        service = WeatherService("test_api_key")
+        # 'heat' は 'rain' より先に定義されている（出現位置ではなく定義順）
+        assert service._map_alert_type("rain and heat advisory") == "熱波"
+        assert service._map_alert_type("extreme temperature (heat)") == "熱波/寒波"
+    
+    def test_map_uses_subclass_mapping(self):
+        """サブクラスでマッピングを上書きすると新しいマッピングが使われる"""
+        class JMAWeatherService(WeatherService):
+            ALERT_TYPE_MAPPING = {'tsunami': '津波', **WeatherService.ALERT_TYPE_MAPPING}
+        
+        assert JMAWeatherService("test_api_key")._map_alert_type("tsunami warning") == "津波"
+        assert WeatherService("test_api_key")._map_alert_type("tsunami warning") == "Tsunami Warning"
 
 
 
@@ -330,6 +440,7 @@ class TestGetWeatherByPostalCode:
     """get_weather_by_postal_code統合テスト"""
     
     @responses.activate
+    @pytest.mark.upstream_budget(geocode=1, onecall=1, weather=1)
     def test_get_weather_complete_flow(self):
         """完全なフローのテスト"""
         # Geocoding APIのモック
@@ -356,23 +467,14 @@ class TestGetWeatherByPostalCode:
             status=200
         )
         
-        # One Call APIのモック（降水確率と警報用）
+        # One Call APIのモック（降水確率と警報の両方を1回で取得）
         responses.add(
             responses.GET,
             "https://api.openweathermap.org/data/3.0/onecall",
             json={
                 'hourly': [
                     {'pop': 0.45}
-                ]
-            },
-            status=200
-        )
-        
-        # One Call APIのモック（警報用、2回目の呼び出し）
-        responses.add(
-            responses.GET,
-            "https://api.openweathermap.org/data/3.0/onecall",
-            json={
+                ],
                 'alerts': [
                     {
                         'event': 'Rain warning',
@@ -393,9 +495,525 @@ class TestGetWeatherByPostalCode:
         assert weather_data.location_name == '東京'
         assert len(weather_data.alerts) == 1
         assert weather_data.alerts[0].alert_type == '大雨'
+        # One Call APIは1回だけ呼ばれる
+        onecall_calls = [call for call in responses.calls if '/data/3.0/onecall' in call.request.url]
+        assert len(onecall_calls) == 1
+    
+    @responses.activate
+    def test_get_weather_uses_weather_cache(self, upstream_budget):
+        """天気キャッシュがある場合、2回目は上流APIを呼ばない"""
+        from weather_zip_lookup.services import TTLCache
+        
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'hourly': [{'pop': 0.45}]},
+            status=200
+        )
+        
+        service = WeatherService("test_api_key", weather_cache=TTLCache(ttl=60))
+        with upstream_budget(geocode=1, onecall=1, weather=1):
+            first = service.get_weather_by_postal_code("1000001")
+        with upstream_budget(total=0):
+            second = service.get_weather_by_postal_code("1000001")
+        
+        assert second is first
+    
+    @responses.activate
+    def test_get_hourly_forecast_from_weather_cache(self, upstream_budget):
+        """予報は天気データと同じOne Call APIのレスポンスから返し、上流APIを追加で呼ばない"""
+        from weather_zip_lookup.services import TTLCache
+        
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'hourly': [{'dt': 1700000000 + hour * 3600, 'temp': 20.0 + hour, 'pop': 0.1} for hour in range(48)]},
+            status=200
+        )
+        
+        service = WeatherService("test_api_key", weather_cache=TTLCache(ttl=60))
+        service.get_weather_by_postal_code("1000001")
+        with upstream_budget(total=0):
+            forecast = service.get_hourly_forecast("1000001", hours=12)
+        
+        assert len(forecast) == 12
+        assert list(forecast.temperatures[:2]) == [20.0, 21.0]
+        assert len(service.get_hourly_forecast("1000001")) == 48
+    
+    @responses.activate
+    def test_get_weather_refetches_only_stale_components(self, upstream_budget):
+        """期限切れの構成要素を返す上流APIだけを呼び、残りは構成要素のキャッシュから組み立てる"""
+        from weather_zip_lookup.services import ComponentTTLCache, TTLCache, Timings
+        
+        now = [0.0]
+        clock = lambda: now[0]
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={
+                'hourly': [{'dt': 1700000000, 'temp': 20.0, 'pop': 0.45}],
+                'alerts': [{'event': 'Rain warning', 'description': '大雨警報', 'tags': ['Severe']}]
+            },
+            status=200
+        )
+        
+        service = WeatherService(
+            "test_api_key",
+            weather_cache=TTLCache(ttl=300, clock=clock),
+            component_cache=ComponentTTLCache(
+                {'temperature': 300, 'precipitation': 1800, 'alerts': 3600},
+                clock=clock
+            )
+        )
+        with upstream_budget(geocode=1, onecall=1, weather=1):
+            first = service.get_weather_by_postal_code("1000001")
+        
+        # 気温だけが期限切れ
+        now[0] = 600
+        timings = Timings()
+        with upstream_budget(weather=1):
+            second = service.get_weather_by_postal_code("1000001", timings=timings)
+        spans = {span.name: span for span in timings.spans}
+        assert (spans['onecall'].cache, spans['current'].cache) == ('hit', 'miss')
+        assert second is not first
+        assert second.precipitation_probability == 45.0
+        assert second.alerts == first.alerts
+        assert second.forecast is first.forecast
+        
+        # 降水確率も期限切れになると、One Call APIで降水確率と警報をまとめて取得し直す
+        now[0] = 2000
+        with upstream_budget(onecall=1, weather=1):
+            service.get_weather_by_postal_code("1000001")
+        now[0] = 2100
+        with upstream_budget(total=0):
+            service.get_weather_by_postal_code("1000001")
+    
+    @responses.activate
+    def test_get_weather_does_not_keep_failed_onecall_components(self, upstream_budget):
+        """One Call APIが失敗した場合、降水確率と警報は構成要素のキャッシュに保存しない"""
+        from weather_zip_lookup.services import ComponentTTLCache
+        
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'message': 'unavailable'},
+            status=503
+        )
+        
+        service = WeatherService(
+            "test_api_key",
+            component_cache=ComponentTTLCache({'temperature': 300, 'precipitation': 1800, 'alerts': 3600})
+        )
+        weather_data = service.get_weather_by_postal_code("1000001")
+        assert weather_data.precipitation_probability == 0.0
+        
+        with upstream_budget(onecall=1):
+            service.get_weather_by_postal_code("1000001")
+    
+    @responses.activate
+    def test_get_weather_keeps_cached_components_when_onecall_fails(self, upstream_budget):
+        """One Call APIが失敗しても有効期限内の警報は返し、補った天気データはキャッシュに保存しない"""
+        from weather_zip_lookup.services import ComponentTTLCache, TTLCache
+        
+        now = [0.0]
+        clock = lambda: now[0]
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 20.0}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={
+                'hourly': [{'dt': 1700000000, 'temp': 20.0, 'pop': 0.45}],
+                'alerts': [{'event': 'Rain warning', 'description': '大雨警報', 'tags': ['Severe']}]
+            },
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'message': 'unavailable'},
+            status=500
+        )
+        
+        service = WeatherService(
+            "test_api_key",
+            weather_cache=TTLCache(ttl=10, clock=clock),
+            component_cache=ComponentTTLCache(
+                {'temperature': 100, 'precipitation': 10, 'alerts': 100},
+                clock=clock
+            )
+        )
+        first = service.get_weather_by_postal_code("1000001")
+        
+        # 降水確率だけが期限切れになった後にOne Call APIが失敗する
+        now[0] = 20
+        with upstream_budget(onecall=1):
+            second = service.get_weather_by_postal_code("1000001")
+        assert second.alerts == first.alerts
+        assert second.temperature == 20.0
+        assert second.precipitation_probability == 0.0
+        assert service.weather_cache.get("1000001") is None
+        
+        # 次の問い合わせでは降水確率をもう一度取得する
+        with upstream_budget(onecall=1):
+            service.get_weather_by_postal_code("1000001")
+    
+    def test_create_component_cache(self):
+        """有効期限がすべて同じ場合は構成要素のキャッシュを作らない"""
+        from weather_zip_lookup.services import ComponentTTLCache, create_component_cache
+        
+        assert create_component_cache(300) == (None, 300)
+        assert create_component_cache(300, precipitation_ttl=300, alerts_ttl=0) == (None, 300)
+        cache, weather_ttl = create_component_cache(300, alerts_ttl=3600)
+        assert cache.ttls == {'temperature': 300, 'precipitation': 300, 'alerts': 3600}
+        assert weather_ttl == 300
+        # まとめた天気データは最も短い有効期限で取得し直す
+        assert create_component_cache(300, precipitation_ttl=60)[1] == 60
+        with pytest.raises(ValueError):
+            WeatherService("test_api_key", component_cache=ComponentTTLCache({'temperature': 300}))
+    
+    @responses.activate
+    def test_get_weather_answers_from_nearby_observation(self, monkeypatch):
+        """キャッシュにない郵便番号は近くの観測値で答え、正確な値はバックグラウンドで取得する"""
+        from weather_zip_lookup.services import TTLCache, Timings
+        
+        coordinates = {
+            '1000005': (35.6812, 139.7671, '東京'),
+            '1600022': (35.6896, 139.7006, '新宿'),
+            '5300001': (34.7025, 135.4959, '大阪'),
+        }
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'hourly': [{'pop': 0.45}]},
+            status=200
+        )
+        
+        service = WeatherService("test_api_key", weather_cache=TTLCache(ttl=60), nearby_distance_km=10)
+        monkeypatch.setattr(service, '_convert_postal_code_to_coordinates', coordinates.__getitem__)
+        service.get_weather_by_postal_code('1000005')
+        calls = len(responses.calls)
+        
+        timings = Timings()
+        nearby = service.get_weather_by_postal_code('1600022', timings=timings)
+        
+        assert (nearby.postal_code, nearby.location_name, nearby.temperature) == ('1600022', '新宿', 22.5)
+        assert timings.spans[-1].name == 'nearby'
+        assert (timings.spans[-1].cache, timings.spans[-1].fallback) == ('hit', 'nearest=1000005')
+        
+        # バックグラウンドでの取得が終わると、正確な値がキャッシュされる
+        service._refresh_executor.shutdown(wait=True)
+        assert len(responses.calls) == calls + 2
+        assert service.weather_cache.get('1600022') is not nearby
+        assert service.weather_cache.get('1600022').location_name == '新宿'
+        
+        # 距離以内に観測値がなければ上流APIから取得する
+        far = Timings()
+        service.get_weather_by_postal_code('5300001', timings=far)
+        assert far.spans[-1].name == 'alerts'
+        assert [span.cache for span in far.spans if span.name == 'nearby'] == ['miss']
+    
+    def test_nearby_index_drops_evicted_postal_codes(self):
+        """天気データのキャッシュから破棄・期限切れになった郵便番号は空間インデックスからも削除する"""
+        from weather_zip_lookup.services import TTLCache
+        
+        now = [0.0]
+        service = WeatherService(
+            "test_api_key",
+            weather_cache=TTLCache(maxsize=1, ttl=60, clock=lambda: now[0]),
+            nearby_distance_km=10
+        )
+        weather_data = WeatherData(
+            postal_code='1000005',
+            temperature=22.5,
+            precipitation_probability=45.0,
+            alerts=[],
+            location_name='東京'
+        )
+        for postal_code, lat, lon in (('1000005', 35.6812, 139.7671), ('1600022', 35.6896, 139.7006)):
+            service.weather_cache.set(postal_code, weather_data)
+            service.spatial_index.add(postal_code, lat, lon)
+        assert list(service.spatial_index.nearby(35.6812, 139.7671, 10)) == [
+            (pytest.approx(6.0, abs=0.5), '1600022')
+        ]
+        
+        now[0] = 60
+        assert service._find_nearby_weather('1000001', 35.6812, 139.7671, '東京', None) is None
+        assert len(service.spatial_index) == 0
+    
+    def test_get_weather_by_prefix_fetches_once_per_cell(self, monkeypatch):
+        """同じセルにある郵便番号は代表の1件だけ天気を取得し、地点ごとの値から統計を計算する"""
+        from weather_zip_lookup.services import PostalIndex, Timings
+        
+        coordinates = {
+            '1000001': (35.6812, 139.7671, '東京'),
+            '1000002': (35.6813, 139.7672, '東京'),
+            '1000003': (34.7025, 135.4959, '大阪'),
+            '1000004': (43.0687, 141.3508, '札幌'),
+        }
+        temperatures = {'1000001': 20.0, '1000003': 26.0, '1000004': 11.0}
+        precipitation = {'1000001': 40.0, '1000003': 10.0, '1000004': 90.0}
+        fetched = []
+        
+        def lookup(postal_code):
+            fetched.append(postal_code)
+            if postal_code == '1000004':
+                raise APIError("APIエラー")
+            lat, lon, name = coordinates[postal_code]
+            return WeatherData(
+                postal_code=postal_code,
+                location_name=name,
+                temperature=temperatures[postal_code],
+                precipitation_probability=precipitation[postal_code],
+                alerts=[WeatherAlert('大雨', '大雨警報', 'Severe')]
+            )
+        
+        service = WeatherService("test_api_key")
+        monkeypatch.setattr(service, '_convert_postal_code_to_coordinates', coordinates.__getitem__)
+        monkeypatch.setattr(service, 'get_weather_by_postal_code', lookup)
+        index = PostalIndex((code, name) for code, (_, _, name) in coordinates.items())
+        timings = Timings()
+        
+        aggregate = service.get_weather_by_prefix('100', index, timings=timings)
+        
+        assert sorted(fetched) == ['1000001', '1000003', '1000004']
+        assert (aggregate.postal_codes, aggregate.locations, aggregate.failed) == (4, 2, 1)
+        assert (aggregate.min_temperature, aggregate.max_temperature, aggregate.mean_temperature) == (20.0, 26.0, 23.0)
+        assert aggregate.max_precipitation_probability == 40.0
+        assert len(aggregate.alerts) == 1
+        assert [span.name for span in timings.spans] == ['geocode', 'weather', 'aggregate']
+    
+    def test_get_weather_by_prefix_invalid_prefix(self):
+        """一致する郵便番号がない、または前方一致の条件が不正な場合はエラー"""
+        from weather_zip_lookup.services import PostalIndex
+        
+        service = WeatherService("test_api_key")
+        index = PostalIndex([('1000001', '東京')])
+        with pytest.raises(InvalidPostalCodeError):
+            service.get_weather_by_prefix('543', index)
+        with pytest.raises(InvalidPostalCodeError):
+            service.get_weather_by_prefix('1x0', index)
+    
+    @responses.activate
+    def test_get_weather_records_timings(self):
+        """ステージごとの所要時間、キャッシュのヒット/ミス、ステータスを記録する"""
+        from weather_zip_lookup.services import Timings
+        
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/3.0/onecall",
+            json={'message': 'unavailable'},
+            status=503
+        )
+        
+        service = WeatherService("test_api_key")
+        first = Timings()
+        service.get_weather_by_postal_code("1000001", timings=first)
+        second = Timings()
+        service.get_weather_by_postal_code("1000001", timings=second)
+        
+        spans = {span.name: span for span in first.spans}
+        assert [span.name for span in first.spans] == ['geocode', 'onecall', 'current', 'alerts']
+        assert (spans['geocode'].cache, spans['geocode'].status) == ('miss', 200)
+        assert spans['onecall'].status == 503
+        assert spans['onecall'].fallback == 'onecall_failed'
+        assert spans['current'].status == 200
+        assert (second.spans[0].cache, second.spans[0].status) == ('hit', None)
+    
+    @responses.activate
+    def test_get_weather_rejects_unknown_postal_code_without_network(self):
+        """ビットセットにない郵便番号は上流APIに問い合わせずにエラー"""
+        from weather_zip_lookup.services import PostalBitset
+        
+        service = WeatherService("test_api_key", postal_bitset=PostalBitset.from_postal_codes(['1000001']))
+        with pytest.raises(InvalidPostalCodeError, match="存在しません"):
+            service.get_weather_by_postal_code("1000002")
+        assert len(responses.calls) == 0
+    
+    @responses.activate
+    def test_upstream_budget_detects_redundant_calls(self, upstream_budget):
+        """上限を超える呼び出しや、上限を指定していないエンドポイントへの呼び出しを検出する"""
+        responses.add(
+            responses.GET,
+            "http://api.openweathermap.org/geo/1.0/zip",
+            json={'lat': 35.6895, 'lon': 139.6917, 'name': '東京'},
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            "https://api.openweathermap.org/data/2.5/weather",
+            json={'main': {'temp': 22.5}},
+            status=200
+        )
+        service = WeatherService("test_api_key")
+        
+        with pytest.raises(AssertionError, match="weather: 2回（上限 1回）"):
+            with upstream_budget(geocode=1, onecall=1, weather=1):
+                service._fetch_current_weather(35.6895, 139.6917, onecall_data={})
+                service._fetch_current_weather(35.6895, 139.6917, onecall_data={})
+        with pytest.raises(AssertionError, match="geocode: 1回（上限 0回）"):
+            with upstream_budget(weather=1):
+                service._convert_postal_code_to_coordinates("1000001")
+        with upstream_budget(total=1) as budget:
+            service._convert_postal_code_to_coordinates("1000002")
+        assert budget.calls == {'geocode': 1}
     
     def test_get_weather_invalid_postal_code(self):
         """無効な郵便番号でエラー"""
         service = WeatherService("test_api_key")
         with pytest.raises(InvalidPostalCodeError):
             service.get_weather_by_postal_code("invalid")
+
+
+class TestPrewarm:
+    """上流APIのホストへの接続の事前確立のテスト"""
+    
+    @pytest.mark.upstream_budget(geocode=1, onecall=1, weather=1)
+    def test_prewarmed_connection_is_reused(self, stub_server):
+        """事前に確立した接続を最初の取得で再利用し、HTTPリクエストは送らない"""
+        from weather_zip_lookup.metrics import UPSTREAM_PREWARMS
+        
+        service = WeatherService("test_api_key", base_url=stub_server.base_url)
+        host = stub_server.base_url.split("://", 1)[1]
+        succeeded = UPSTREAM_PREWARMS.labels(host, "ok").get()
+        
+        results = service.prewarm()
+        
+        assert list(results) == [stub_server.base_url]
+        assert results[stub_server.base_url] >= 0
+        assert UPSTREAM_PREWARMS.labels(host, "ok").get() == succeeded + 1
+        assert stub_server.stats()["calls"] == {}
+        pool = service._connection_pool(stub_server.base_url)
+        assert pool.num_connections == 1
+        
+        service.get_weather_by_postal_code("1000001")
+        assert pool.num_connections == 1
+    
+    def test_prewarm_without_tls_context_api(self, stub_server, monkeypatch):
+        """requests 2.32.2より前（get_connection_with_tls_contextがない場合）も接続できる"""
+        monkeypatch.delattr(requests.adapters.HTTPAdapter, "get_connection_with_tls_context")
+        service = WeatherService("test_api_key", base_url=stub_server.base_url)
+        
+        assert service.prewarm()[stub_server.base_url] is not None
+        assert service._connection_pool(stub_server.base_url).num_connections == 1
+    
+    def test_unexpected_error_is_recorded_as_failure(self, stub_server, monkeypatch):
+        """想定外の例外でも、プロセスを止めずに失敗として記録する"""
+        service = WeatherService("test_api_key", base_url=stub_server.base_url)
+        
+        def fail(origin):
+            raise AttributeError("_get_conn")
+        monkeypatch.setattr(service, "_connect_pool", fail)
+        
+        assert service.prewarm() == {stub_server.base_url: None}
+    
+    def test_prewarm_failure_is_recorded(self):
+        """接続できないホストはNoneとして返し、エラーを数える"""
+        import socket
+        from weather_zip_lookup.metrics import UPSTREAM_PREWARMS
+        
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        base_url = f"http://127.0.0.1:{port}"
+        failed = UPSTREAM_PREWARMS.labels(f"127.0.0.1:{port}", "error").get()
+        
+        service = WeatherService("test_api_key", base_url=base_url)
+        
+        assert service.prewarm() == {base_url: None}
+        assert UPSTREAM_PREWARMS.labels(f"127.0.0.1:{port}", "error").get() == failed + 1
+    
+    def test_create_app_prewarms_in_background(self, stub_server):
+        """PREWARM_CONNECTIONSが有効なら、起動時に共有の接続プールを温める"""
+        import time
+        from weather_zip_lookup import create_app
+        
+        app = create_app({
+            "TESTING": True,
+            "OPENWEATHER_API_KEY": "test_api_key",
+            "OPENWEATHER_BASE_URL": stub_server.base_url,
+            "PREWARM_CONNECTIONS": True
+        })
+        
+        service = app.extensions["weather_service"][1]
+        pool = service._connection_pool(stub_server.base_url)
+        deadline = time.monotonic() + 5
+        while pool.num_connections == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.num_connections == 1
@@ -4,6 +4,13 @@ import os
 from flask import Flask
 
 
+# 設定ファイルのキーとFlask設定キーの対応
+_FILE_CONFIG_KEYS = {
+    'OPENWEATHER_API_KEY': 'api_key',
+    'DEFAULT_POSTAL_CODE': 'default_postal_code',
+}
+
+
 def create_app(config=None):
     """アプリケーションファクトリ
     
@@ -20,6 +27,36 @@ def create_app(config=None):
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev'),
         OPENWEATHER_API_KEY=None,
         DEFAULT_POSTAL_CODE='',
+        # 上流APIのベースURL（ローカルのスタブサーバーなどに向ける場合に設定）
+        OPENWEATHER_BASE_URL=os.environ.get('OPENWEATHER_BASE_URL') or None,
+        # /metrics エンドポイントを公開するかどうか
+        METRICS_ENABLED=os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no'),
+        # リクエスト単位のプロファイリング（X-Profile ヘッダーにシークレットを指定したリクエストだけを計測）
+        PROFILING_ENABLED=os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes'),
+        PROFILING_SECRET=os.environ.get('PROFILING_SECRET'),
+        # プロファイルの書き込み先。未設定の場合はJSONレスポンスにサマリーを含める
+        PROFILING_DIR=os.environ.get('PROFILING_DIR') or None,
+        # 郵便番号の前方一致検索（/api/postal-codes）に使うローカルの郵便番号データ（KEN_ALL.CSVなど）
+        POSTAL_DATASET=os.environ.get('POSTAL_DATASET') or None,
+        # POSTAL_DATASET にない郵便番号を、上流APIに問い合わせる前に400にする（ビットセットで判定）
+        VALIDATE_POSTAL_CODES=os.environ.get('VALIDATE_POSTAL_CODES', '').lower() in ('1', 'true', 'yes'),
+        # 天気データのキャッシュの有効期限（秒）。/api/forecast もこのキャッシュから返す。0の場合はキャッシュしない
+        WEATHER_CACHE_TTL=float(os.environ.get('WEATHER_CACHE_TTL', 300) or 0),
+        # 降水確率（予報を含む）と警報のキャッシュの有効期限（秒）。0の場合は WEATHER_CACHE_TTL と同じ
+        PRECIPITATION_CACHE_TTL=float(os.environ.get('PRECIPITATION_CACHE_TTL', 0) or 0),
+        ALERTS_CACHE_TTL=float(os.environ.get('ALERTS_CACHE_TTL', 0) or 0),
+        # ジオコーディングAPIが404を返した郵便番号を覚えておく期間（秒）。0の場合は覚えない
+        NEGATIVE_CACHE_TTL=float(os.environ.get('NEGATIVE_CACHE_TTL', 600) or 0),
+        # 天気データのキャッシュにない郵便番号を、この距離（km）以内のキャッシュ済みの観測値で答える。0の場合は答えない
+        NEARBY_DISTANCE_KM=float(os.environ.get('NEARBY_DISTANCE_KM', 0) or 0),
+        # フライトレコーダーで保持する件数（直近・遅い順のそれぞれ）。0の場合は記録しない
+        FLIGHT_RECORDER_SIZE=int(os.environ.get('FLIGHT_RECORDER_SIZE', 50) or 0),
+        # /debug/ エンドポイントのトークン（X-Debug-Token ヘッダー）。未設定の場合はローカルホストからのみ許可
+        DEBUG_TOKEN=os.environ.get('DEBUG_TOKEN') or None,
+        # 起動時に上流APIのホストへの接続（DNS解決・TCP/TLS）をバックグラウンドで確立しておく
+        PREWARM_CONNECTIONS=os.environ.get('PREWARM_CONNECTIONS', '').lower() in ('1', 'true', 'yes'),
+        # 設定ファイルの監視間隔（秒）。0の場合は監視しない
+        CONFIG_WATCH_INTERVAL=float(os.environ.get('CONFIG_WATCH_INTERVAL', 0) or 0),
     )
     
     # 環境変数から設定を読み込む
@@ -30,28 +67,75 @@ def create_app(config=None):
         app.config['DEFAULT_POSTAL_CODE'] = os.environ.get('DEFAULT_POSTAL_CODE')
     
     # ローカル設定ファイルから読み込む（環境変数がない場合）
-    if not app.config['OPENWEATHER_API_KEY'] or not app.config['DEFAULT_POSTAL_CODE']:
+    config_manager = None
+    file_sourced_keys = set()
+    if not app.config['OPENWEATHER_API_KEY'] or not app.config['DEFAULT_POSTAL_CODE'] or not app.config['POSTAL_DATASET']:
         try:
             from .config import ConfigManager
             config_manager = ConfigManager()
             
             if not app.config['OPENWEATHER_API_KEY']:
                 app.config['OPENWEATHER_API_KEY'] = config_manager.get_api_key()
+                file_sourced_keys.add('OPENWEATHER_API_KEY')
             
             if not app.config['DEFAULT_POSTAL_CODE']:
                 app.config['DEFAULT_POSTAL_CODE'] = config_manager.get_default_postal_code() or ''
+                file_sourced_keys.add('DEFAULT_POSTAL_CODE')
+            
+            if not app.config['POSTAL_DATASET']:
+                app.config['POSTAL_DATASET'] = config_manager.get_postal_dataset()
         except Exception:
             pass  # 設定ファイルがない場合は無視
     
     # カスタム設定を適用
     if config:
         app.config.from_mapping(config)
+        file_sourced_keys -= set(config)
+    
+    # 設定ファイルの変更を再起動なしで反映する
+    if config_manager is not None and file_sourced_keys and app.config['CONFIG_WATCH_INTERVAL'] > 0:
+        _watch_config_file(app, config_manager, file_sourced_keys)
     
     # ルートを登録
-    from .routes import main_bp
+    from .routes import main_bp, metrics_bp, debug_bp
     app.register_blueprint(main_bp)
+    if app.config['METRICS_ENABLED']:
+        app.register_blueprint(metrics_bp)
+    if app.config['FLIGHT_RECORDER_SIZE'] > 0:
+        from .services import FlightRecorder
+        app.extensions['flight_recorder'] = FlightRecorder(app.config['FLIGHT_RECORDER_SIZE'])
+        app.register_blueprint(debug_bp)
+    
+    # 最初のリクエストがDNS解決とTCP/TLS接続を待たないよう、共有の接続プールを温めておく
+    if app.config['PREWARM_CONNECTIONS'] and app.config['OPENWEATHER_API_KEY']:
+        from .routes.main import get_weather_service
+        with app.app_context():
+            get_weather_service().prewarm_in_background()
+    
+    # 有効な場合だけプロファイリングのフックを登録する（無効時は通常のリクエストにコストがかからない）
+    from .profiling import init_app as init_profiling
+    init_profiling(app)
     
     return app
 
 
+def _watch_config_file(app, config_manager, keys):
+    """設定ファイルを監視し、変更をアプリケーション設定に反映する
+    
+    Args:
+        app: Flaskアプリケーション
+        config_manager: 設定ファイルを読み込んだConfigManager
+        keys: 設定ファイル由来のFlask設定キー
+    """
+    def on_change(file_config):
+        for key in keys:
+            value = file_config.get(_FILE_CONFIG_KEYS[key])
+            if key == 'DEFAULT_POSTAL_CODE':
+                value = value or ''
+            app.config[key] = value
+    
+    config_manager.start_watching(app.config['CONFIG_WATCH_INTERVAL'], on_change)
+    app.extensions['config_manager'] = config_manager
+
+
 __version__ = '1.0.0'
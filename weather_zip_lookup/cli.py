@@ -5,18 +5,66 @@ CLIインターフェースモジュール
 """
 
 import argparse
+import json
+import os
+import sqlite3
 import sys
-from typing import Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO
 
-from .config import ConfigManager
+from . import daemon
+from .config import ConfigManager, POSTAL_DATASET_ENV
 from .exceptions import (
+    WeatherScriptError,
     InvalidPostalCodeError,
     APIError,
     NetworkError,
     ConfigError,
-    MissingAPIKeyError
+    MissingAPIKeyError,
+    DaemonUnavailableError,
+    CacheMissError
 )
-from .services import WeatherService, OutputFormatter
+from .models import WeatherData
+from .profiling import PROFILE_MODES, RequestProfiler
+from .services import (
+    WeatherService, OutputFormatter, IncrementalRenderer, DiskCache, Timings, PostalIndex, PostalBitset
+)
+from .services.timing import NULL_TIMINGS
+
+
+# 例外と終了コードの対応（一括取得モードの集計で使用）
+ERROR_EXIT_CODES = (
+    (InvalidPostalCodeError, 3),
+    (MissingAPIKeyError, 5),
+    (NetworkError, 1),
+    (APIError, 2),
+    (ConfigError, 4),
+    (CacheMissError, 6),
+)
+
+# 一括取得モードのデフォルト並列数
+DEFAULT_WORKERS = 4
+
+# 監視モードのデフォルト更新間隔（秒）
+DEFAULT_WATCH_INTERVAL = 60.0
+
+# 永続キャッシュのデフォルト設定（設定ファイルの geocode_cache_ttl / weather_cache_ttl で上書き可能）
+CACHE_FILE_NAME = 'cache.sqlite3'
+# キャッシュの保存先ディレクトリを上書きする環境変数
+CACHE_DIR_ENV = 'WEATHER_ZIP_LOOKUP_CACHE_DIR'
+DEFAULT_GEOCODE_CACHE_TTL = 30 * 24 * 60 * 60
+DEFAULT_WEATHER_CACHE_TTL = 300
+# オフラインモードのために期限切れのエントリを残しておく期間（秒）
+CACHE_RETENTION = 7 * 24 * 60 * 60
+
+
+class PersistentCaches(NamedTuple):
+    """CLIで使う永続キャッシュの組"""
+    geocode: DiskCache
+    weather: DiskCache
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -34,17 +82,340 @@ def parse_arguments() -> argparse.Namespace:
 使用例:
   %(prog)s 1000001          # 指定した郵便番号の天気を取得
   %(prog)s                  # デフォルトの郵便番号の天気を取得
+  %(prog)s 1000001 5430001  # 複数の郵便番号を並列に取得
+  %(prog)s -f codes.txt --format jsonl   # ファイルから一括取得（JSON Lines出力）
+  cat codes.txt | %(prog)s -             # 標準入力から一括取得
+  %(prog)s --watch --interval 300 1000001 5430001   # 5分ごとに更新して表示
+  %(prog)s --daemon &       # 常駐プロセスを起動（以降の実行はデーモン経由で高速化）
+  %(prog)s --offline 1000001          # ネットワークを使わずキャッシュから表示
+  %(prog)s --max-age 60 1000001       # 60秒以内のキャッシュがあればそれを使う
+  %(prog)s --timings 1000001          # どのステージに時間がかかったかを表示
+  %(prog)s --profile cpu 1000001      # cProfileで計測して結果を表示
+  %(prog)s --flight-recorder          # デーモンが記録した遅い取得処理を表示
+  %(prog)s --aggregate 100            # 郵便番号が100で始まる地域の天気をまとめて表示
   %(prog)s -h               # ヘルプを表示
         '''
     )
     
     parser.add_argument(
-        'postal_code',
-        nargs='?',
-        help='7桁の日本の郵便番号（例: 1000001）。省略した場合は設定ファイルのデフォルト値を使用します。'
+        'postal_codes',
+        nargs='*',
+        metavar='postal_code',
+        help='7桁の日本の郵便番号（例: 1000001）。複数指定可能で、"-"は標準入力から読み込みます。'
+             '省略した場合は設定ファイルのデフォルト値を使用します。'
+    )
+    
+    parser.add_argument(
+        '-f', '--file',
+        metavar='PATH',
+        help='郵便番号を1行に1つ記載したファイル（"-"で標準入力）'
+    )
+    
+    parser.add_argument(
+        '-w', '--workers',
+        type=_positive_int,
+        default=DEFAULT_WORKERS,
+        help=f'一括取得時の並列数（デフォルト: {DEFAULT_WORKERS}）'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=['text', 'table', 'jsonl'],
+        default='text',
+        dest='output_format',
+        help='一括取得時の出力形式（text: 通常表示、table: 1件1行の表形式、jsonl: JSON Lines）'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='プロセスを起動したまま定期的に再取得し、変化した行だけを再描画します'
+    )
+    
+    parser.add_argument(
+        '--interval',
+        type=_positive_float,
+        default=DEFAULT_WATCH_INTERVAL,
+        help=f'監視モードの更新間隔（秒、デフォルト: {DEFAULT_WATCH_INTERVAL:g}）'
+    )
+    
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='接続プールとキャッシュを保持する常駐プロセスとして起動します（Unix系OSのみ）'
+    )
+    
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='常駐プロセスを使わずにこのプロセス内で取得します'
+    )
+    
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='ネットワークを使わず、永続キャッシュのデータだけで応答します'
+    )
+    
+    parser.add_argument(
+        '--max-age',
+        type=_positive_float,
+        metavar='SECONDS',
+        help='キャッシュを使う場合の最大経過秒数（--offlineと併用すると期限切れのデータも許容できます）'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='永続キャッシュを使用しません'
+    )
+    
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='ステージごとの所要時間（キャッシュのヒット/ミス、上流APIのステータス）を標準エラー出力に表示します'
     )
     
-    return parser.parse_args()
+    parser.add_argument(
+        '--profile',
+        choices=PROFILE_MODES,
+        metavar='{cpu,memory,both}',
+        help='実行全体をプロファイルします（cpu: cProfile、memory: tracemalloc、both: 両方）'
+    )
+    
+    parser.add_argument(
+        '--profile-dir',
+        metavar='DIR',
+        help='プロファイル結果を書き込むディレクトリ（省略時は標準エラー出力にサマリーを表示）'
+    )
+    
+    parser.add_argument(
+        '--flight-recorder',
+        action='store_true',
+        help='起動中のデーモンが記録した直近の取得処理と遅かった取得処理をJSONで表示します'
+    )
+    
+    parser.add_argument(
+        '--aggregate',
+        metavar='PREFIX',
+        help='郵便番号の先頭の数字で指定した地域の天気（気温の範囲と平均、最大降水確率、警報）をまとめて表示します'
+             '（郵便番号データの設定が必要です）'
+    )
+    
+    args = parser.parse_args()
+    
+    # 単一の郵便番号を扱う従来のフローとの互換性のため
+    args.postal_code = args.postal_codes[0] if args.postal_codes else None
+    
+    return args
+
+
+def _positive_int(value: str) -> int:
+    """
+    argparse用の正の整数バリデーター
+    
+    Args:
+        value: コマンドライン引数の文字列
+        
+    Returns:
+        正の整数
+        
+    Raises:
+        argparse.ArgumentTypeError: 正の整数でない場合
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"整数を指定してください: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"1以上の値を指定してください: {value}")
+    return number
+
+
+def _positive_float(value: str) -> float:
+    """
+    argparse用の正の数値バリデーター
+    
+    Args:
+        value: コマンドライン引数の文字列
+        
+    Returns:
+        正の浮動小数点数
+        
+    Raises:
+        argparse.ArgumentTypeError: 正の数値でない場合
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"数値を指定してください: {value}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"0より大きい値を指定してください: {value}")
+    return number
+
+
+def is_bulk_request(args: argparse.Namespace) -> bool:
+    """
+    一括取得モードで実行するかどうかを判定
+    
+    Args:
+        args: 解析された引数
+        
+    Returns:
+        複数の郵便番号、ファイル、標準入力のいずれかが指定された場合はTrue
+    """
+    return bool(args.file) or len(args.postal_codes) > 1 or '-' in args.postal_codes
+
+
+def iter_postal_codes(args: argparse.Namespace, stdin: TextIO = None) -> Iterator[str]:
+    """
+    引数・ファイル・標準入力から郵便番号を順に読み出す
+    
+    空行と"#"で始まる行は無視します。ファイルと標準入力は逐次読み込むため、
+    大量の入力でもすべてをメモリに載せることはありません。
+    
+    Args:
+        args: 解析された引数
+        stdin: 標準入力として使うストリーム（省略時はsys.stdin）
+        
+    Yields:
+        郵便番号文字列
+    """
+    stdin = stdin if stdin is not None else sys.stdin
+    
+    def read_lines(stream: Iterable[str]) -> Iterator[str]:
+        for line in stream:
+            code = line.strip()
+            if code and not code.startswith('#'):
+                yield code
+    
+    for code in args.postal_codes:
+        if code == '-':
+            yield from read_lines(stdin)
+        else:
+            yield code
+    
+    if args.file:
+        if args.file == '-':
+            yield from read_lines(stdin)
+        else:
+            try:
+                with open(args.file, 'r', encoding='utf-8') as f:
+                    yield from read_lines(f)
+            except OSError as e:
+                raise ConfigError(f"郵便番号ファイルの読み取りに失敗しました: {e}")
+
+
+def exit_code_for_error(error: Exception) -> int:
+    """
+    例外に対応する終了コードを取得
+    
+    Args:
+        error: 発生した例外
+        
+    Returns:
+        終了コード（対応がない場合は1）
+    """
+    for error_type, exit_code in ERROR_EXIT_CODES:
+        if isinstance(error, error_type):
+            return exit_code
+    return 1
+
+
+def run_bulk(
+    postal_codes: Iterable[str],
+    weather_service: WeatherService,
+    workers: int = DEFAULT_WORKERS,
+    output_format: str = 'text',
+    out: TextIO = None,
+    err: TextIO = None,
+    max_age: Optional[float] = None
+) -> int:
+    """
+    複数の郵便番号の天気を並列に取得し、完了した順に出力
+    
+    未完了のリクエスト数は並列数の数倍に制限されるため、入力が大量でも
+    メモリ使用量は一定に保たれます。
+    
+    Args:
+        postal_codes: 郵便番号のイテラブル
+        weather_service: 共有する天気サービス（接続プールを再利用）
+        workers: 並列数
+        output_format: 'text'（OutputFormatter）、'table'（表形式）または 'jsonl'（JSON Lines）
+        out: 結果の出力先（省略時はsys.stdout）
+        err: エラーと集計の出力先（省略時はsys.stderr）
+        max_age: キャッシュを使う場合の最大経過秒数
+        
+    Returns:
+        終了コード（すべて成功: 0、失敗がある場合は入力順で最初の失敗の終了コード）
+    """
+    out = out if out is not None else sys.stdout
+    err = err if err is not None else sys.stderr
+    formatter = OutputFormatter()
+    max_pending = workers * 4
+    if output_format == 'table':
+        format_row = formatter.table_row_formatter(formatter.should_colorize(out))
+        out.write(formatter.TABLE_HEADER + '\n')
+    lookup = weather_service.get_weather_by_postal_code
+    if max_age is not None:
+        lookup = partial(lookup, max_age=max_age)
+    
+    total = 0
+    failures = []  # (入力順, 郵便番号, 終了コード, メッセージ)
+    
+    def emit(index: int, postal_code: str, future) -> None:
+        try:
+            weather_data = future.result()
+        except Exception as e:
+            exit_code = exit_code_for_error(e)
+            failures.append((index, postal_code, exit_code, str(e)))
+            if output_format == 'jsonl':
+                out.write(json.dumps(
+                    {'postal_code': postal_code, 'success': False, 'error': str(e), 'exit_code': exit_code},
+                    ensure_ascii=False
+                ) + '\n')
+            else:
+                err.write(f"エラー [{postal_code}]: {e}\n")
+                err.flush()
+        else:
+            if output_format == 'jsonl':
+                out.write(json.dumps(
+                    {'success': True, 'data': weather_data.to_dict()},
+                    ensure_ascii=False
+                ) + '\n')
+            elif output_format == 'table':
+                out.write(format_row(weather_data))
+            else:
+                out.write(formatter.format_weather_output(weather_data) + '\n')
+        out.flush()
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        
+        def drain(return_when) -> None:
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                index, postal_code = pending.pop(future)
+                emit(index, postal_code, future)
+        
+        for postal_code in postal_codes:
+            future = executor.submit(lookup, postal_code)
+            pending[future] = (total, postal_code)
+            total += 1
+            if len(pending) >= max_pending:
+                drain(FIRST_COMPLETED)
+        
+        while pending:
+            drain(FIRST_COMPLETED)
+    
+    # 集計を表示
+    err.write(f"処理結果: {total}件中 {total - len(failures)}件成功、{len(failures)}件失敗\n")
+    failures.sort()
+    for _, postal_code, exit_code, message in failures:
+        err.write(f"  {postal_code}: 終了コード {exit_code} ({message})\n")
+    err.flush()
+    
+    return failures[0][2] if failures else 0
 
 
 def main() -> int:
@@ -54,13 +425,91 @@ def main() -> int:
     Returns:
         終了コード（0: 成功、1以上: エラー）
     """
+    timings = None
+    profiler = None
     try:
         # コマンドライン引数を解析
         args = parse_arguments()
         
+        if args.profile:
+            profiler = RequestProfiler(args.profile)
+            profiler.start()
+        
         # 設定マネージャーを初期化
         config_manager = ConfigManager()
         
+        # デーモンモード
+        if args.daemon:
+            return run_daemon(config_manager)
+        
+        # デーモンのフライトレコーダーを表示
+        if args.flight_recorder:
+            return dump_flight_recorder(config_manager)
+        
+        # 永続キャッシュを開く（使えない場合はキャッシュなしで続行）
+        caches = None if args.no_cache else open_persistent_caches(config_manager)
+        
+        # 地域の天気の集計
+        if args.aggregate is not None:
+            dataset = config_manager.get_postal_dataset()
+            if not dataset:
+                print("エラー: 郵便番号データが設定されていません。")
+                print(f"環境変数 {POSTAL_DATASET_ENV} か設定ファイルの postal_dataset でCSVのパスを指定してください。")
+                return 4
+            weather_service = _create_weather_service(
+                config_manager, pool_size=args.workers, **_cache_kwargs(caches)
+            )
+            if weather_service is None:
+                return 5
+            return run_aggregate(
+                args.aggregate,
+                PostalIndex.from_csv(dataset),
+                weather_service,
+                workers=args.workers,
+                output_format=args.output_format
+            )
+        
+        # 監視モード（毎回再取得するため、天気データはキャッシュしない）
+        if args.watch:
+            postal_codes = list(iter_postal_codes(args))
+            if not postal_codes:
+                default_postal_code = config_manager.get_default_postal_code()
+                if not default_postal_code:
+                    print("エラー: 監視する郵便番号が指定されていません。")
+                    print(f"設定ファイルの場所: {config_manager.get_config_path()}")
+                    return 3
+                postal_codes = [default_postal_code]
+            
+            weather_service = _create_weather_service(
+                config_manager, pool_size=args.workers, **_cache_kwargs(caches, weather=False)
+            )
+            if weather_service is None:
+                return 5
+            return run_watch(
+                postal_codes,
+                weather_service,
+                interval=args.interval,
+                workers=args.workers
+            )
+        
+        # 一括取得モード
+        if is_bulk_request(args):
+            if args.offline:
+                weather_service = OfflineLookup(caches)
+            else:
+                weather_service = _create_weather_service(
+                    config_manager, pool_size=args.workers, **_cache_kwargs(caches)
+                )
+                if weather_service is None:
+                    return 5
+            return run_bulk(
+                iter_postal_codes(args),
+                weather_service,
+                workers=args.workers,
+                output_format=args.output_format,
+                max_age=args.max_age
+            )
+        
         # 郵便番号を取得（引数 > 設定ファイル）
         postal_code = args.postal_code
         if not postal_code:
@@ -72,30 +521,48 @@ def main() -> int:
                 print(f"設定ファイルの場所: {config_manager.get_config_path()}")
                 return 3
         
-        # APIキーを取得
-        api_key = config_manager.get_api_key()
-        if not api_key:
-            print("エラー: APIキーが設定されていません。")
-            print("OpenWeatherMapからAPIキーを取得し、設定ファイルに保存してください。")
-            print(f"設定ファイルの場所: {config_manager.get_config_path()}")
-            print("\n設定ファイルの例:")
-            print('{')
-            print('  "default_postal_code": "1000001",')
-            print('  "api_key": "your_api_key_here"')
-            print('}')
-            return 5
-        
-        # 天気サービスを初期化
-        weather_service = WeatherService(api_key)
-        
-        # 天気データを取得
-        weather_data = weather_service.get_weather_by_postal_code(postal_code)
+        if args.timings:
+            timings = Timings()
+        
+        if args.offline:
+            # ネットワークを使わずキャッシュだけで応答
+            weather_data = OfflineLookup(caches).get_weather_by_postal_code(postal_code, max_age=args.max_age)
+        else:
+            # 永続キャッシュ → 起動中のデーモン → このプロセス内で取得 の順に試す
+            weather_data = None
+            if caches is not None:
+                with _span(timings, 'disk_cache') as span:
+                    weather_data = caches.weather.get(postal_code, max_age=args.max_age)
+                    span.cache = 'miss' if weather_data is None else 'hit'
+            
+            if weather_data is None and not args.no_daemon:
+                with _span(timings, 'daemon') as span:
+                    answer = _lookup_via_daemon(config_manager, postal_code, max_age=args.max_age)
+                    span.cache = 'miss' if answer is None else 'hit'
+                if answer is not None:
+                    weather_data, age = answer
+                    if caches is not None:
+                        # デーモンが取得した時刻のまま保存し、期限を延ばさない
+                        caches.weather.set(postal_code, weather_data, age=age)
+            
+            if weather_data is None:
+                # APIキーを取得して天気サービスを初期化
+                weather_service = _create_weather_service(config_manager, **_cache_kwargs(caches))
+                if weather_service is None:
+                    return 5
+                
+                # 天気データを取得
+                lookup_kwargs = {'max_age': args.max_age} if args.max_age is not None else {}
+                if timings is not None:
+                    lookup_kwargs['timings'] = timings
+                weather_data = weather_service.get_weather_by_postal_code(postal_code, **lookup_kwargs)
         
         # 出力フォーマッターを初期化
         formatter = OutputFormatter()
         
         # フォーマットされた出力を表示
-        output = formatter.format_weather_output(weather_data)
+        with _span(timings, 'format'):
+            output = formatter.format_weather_output(weather_data)
         print(output)
         
         return 0
@@ -115,9 +582,363 @@ def main() -> int:
     except ConfigError as e:
         print(f"エラー: {e}")
         return 4
+    except CacheMissError as e:
+        print(f"エラー: {e}")
+        return 6
     except Exception as e:
         print(f"予期しないエラーが発生しました: {e}")
         return 1
+    finally:
+        # エラーで終了した場合も、どこまで進んだかを確認できるよう表示する
+        if timings is not None and timings.spans:
+            print(OutputFormatter().format_timings(timings), file=sys.stderr)
+        if profiler is not None:
+            profiler.stop()
+            _report_profile(profiler, args.profile_dir)
+
+
+def _report_profile(profiler: RequestProfiler, directory: Optional[str]) -> None:
+    """
+    プロファイル結果をファイルに書き込むか、標準エラー出力に表示
+    
+    Args:
+        profiler: 計測を終えたプロファイラー
+        directory: 書き込み先のディレクトリ（Noneの場合は標準エラー出力）
+    """
+    if directory:
+        for path in profiler.write(directory, 'cli'):
+            print(f"プロファイル: {path}", file=sys.stderr)
+        return
+    
+    summary = profiler.summary()
+    print(f"プロファイル（{summary['elapsed_ms']:.1f} ms）:", file=sys.stderr)
+    for key in ('cpu', 'memory'):
+        if summary.get(key):
+            print(summary[key], file=sys.stderr)
+
+
+def _span(timings: Optional[Timings], name: str):
+    """計測中であればスパンを開き、そうでなければ何も記録しないスパンを返す"""
+    return (timings if timings is not None else NULL_TIMINGS).span(name)
+
+
+def run_watch(
+    postal_codes: list[str],
+    weather_service: WeatherService,
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    workers: int = DEFAULT_WORKERS,
+    out: TextIO = None,
+    max_polls: Optional[int] = None,
+    sleep=time.sleep
+) -> int:
+    """
+    郵便番号の天気を定期的に再取得し、変化した行だけを再描画
+    
+    同じWeatherServiceとスレッドプールを使い続けるため、接続プールと
+    キャッシュはポーリング間で再利用されます。
+    
+    Args:
+        postal_codes: 監視する郵便番号のリスト
+        weather_service: 共有する天気サービス
+        interval: 更新間隔（秒）
+        workers: 並列数
+        out: 出力先（省略時はsys.stdout）
+        max_polls: 最大ポーリング回数（省略時はCtrl+Cまで継続）
+        sleep: 待機に使う関数（テスト用に差し替え可能）
+        
+    Returns:
+        終了コード
+    """
+    out = out if out is not None else sys.stdout
+    formatter = OutputFormatter()
+    renderer = IncrementalRenderer(out)
+    postal_codes = list(dict.fromkeys(postal_codes))
+    header = f"監視中: {len(postal_codes)}件（{interval:g}秒間隔、Ctrl+Cで終了）"
+    
+    def lookup_line(postal_code: str) -> str:
+        try:
+            weather_data = weather_service.get_weather_by_postal_code(postal_code)
+        except WeatherScriptError as e:
+            return formatter.format_error_line(postal_code, str(e))
+        except Exception as e:
+            return formatter.format_error_line(postal_code, f"予期しないエラーが発生しました: {e}")
+        return formatter.format_summary_line(weather_data)
+    
+    polls = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(postal_codes)))) as executor:
+        try:
+            while True:
+                started = time.monotonic()
+                lines = list(executor.map(lookup_line, postal_codes))
+                renderer.render([header, *lines, f"最終更新: {time.strftime('%H:%M:%S')}"])
+                
+                polls += 1
+                if max_polls is not None and polls >= max_polls:
+                    break
+                sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
+    
+    return 0
+
+
+def run_daemon(config_manager: ConfigManager) -> int:
+    """
+    常駐プロセスとして起動し、Ctrl+Cまたはシグナルで停止するまで問い合わせに応答
+    
+    Args:
+        config_manager: 設定マネージャー
+        
+    Returns:
+        終了コード
+    """
+    if not daemon.is_supported():
+        print("エラー: このプラットフォームではデーモンモードを利用できません。")
+        return 1
+    
+    weather_daemon = daemon.WeatherDaemon(
+        daemon.create_daemon_service(config_manager, postal_bitset=load_postal_bitset(config_manager)),
+        daemon.get_socket_path(config_manager)
+    )
+    try:
+        weather_daemon.bind()
+    except DaemonUnavailableError as e:
+        print(f"エラー: {e}")
+        return 1
+    
+    print(f"デーモンを起動しました: {weather_daemon.socket_path}")
+    if config_manager.load_config().get('prewarm_connections', False):
+        # 最初の問い合わせがDNS解決とTCP/TLS接続を待たないよう、接続プールを温めておく
+        weather_daemon.weather_service.prewarm_in_background()
+    try:
+        weather_daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def dump_flight_recorder(config_manager: ConfigManager, out: TextIO = None) -> int:
+    """
+    起動中のデーモンのフライトレコーダーの内容をJSONで出力
+    
+    Args:
+        config_manager: 設定マネージャー
+        out: 出力先（省略時はsys.stdout）
+        
+    Returns:
+        終了コード
+    """
+    out = out if out is not None else sys.stdout
+    client = daemon.DaemonClient(daemon.get_socket_path(config_manager))
+    try:
+        snapshot = client.dump_flight_recorder()
+    except DaemonUnavailableError as e:
+        print(f"エラー: {e}")
+        return 1
+    print(json.dumps(snapshot, ensure_ascii=False, indent=2), file=out)
+    return 0
+
+
+def run_aggregate(
+    prefix: str,
+    postal_index: PostalIndex,
+    weather_service: WeatherService,
+    workers: int = DEFAULT_WORKERS,
+    output_format: str = 'text',
+    out: TextIO = None
+) -> int:
+    """
+    郵便番号の先頭の数字で指定した地域の天気をまとめて出力
+    
+    Args:
+        prefix: 郵便番号の先頭の数字
+        postal_index: 郵便番号のインデックス
+        weather_service: 天気サービス
+        workers: 並列数
+        output_format: 出力形式（jsonlの場合は1行のJSON、それ以外は通常表示）
+        out: 出力先（省略時はsys.stdout）
+        
+    Returns:
+        終了コード
+        
+    Raises:
+        InvalidPostalCodeError: 前方一致の条件が不正、または該当する郵便番号がない場合
+    """
+    out = out if out is not None else sys.stdout
+    aggregate = weather_service.get_weather_by_prefix(
+        prefix.strip().replace('-', ''), postal_index, workers=workers
+    )
+    if output_format == 'jsonl':
+        print(json.dumps(aggregate.to_dict(), ensure_ascii=False), file=out)
+    else:
+        print(OutputFormatter().format_aggregate_output(aggregate), file=out)
+    return 0
+
+
+def _lookup_via_daemon(
+    config_manager: ConfigManager,
+    postal_code: str,
+    max_age: Optional[float] = None
+) -> Optional[tuple[WeatherData, float]]:
+    """
+    起動中のデーモンに天気データを問い合わせる
+    
+    Args:
+        config_manager: 設定マネージャー
+        postal_code: 郵便番号
+        max_age: デーモンのキャッシュを使う場合の最大経過秒数（省略時はキャッシュのTTL）
+        
+    Returns:
+        (WeatherData, 取得からの経過秒数)、デーモンが起動していない場合はNone
+        
+    Raises:
+        InvalidPostalCodeError, APIError, NetworkError など: デーモン側で発生したエラー
+    """
+    client = daemon.DaemonClient(daemon.get_socket_path(config_manager))
+    try:
+        return client.get_weather_with_age(postal_code, max_age=max_age)
+    except DaemonUnavailableError:
+        return None
+
+
+def open_persistent_caches(config_manager: ConfigManager) -> Optional[PersistentCaches]:
+    """
+    設定ファイルと同じディレクトリにある永続キャッシュを開く
+    
+    保存先は環境変数 WEATHER_ZIP_LOOKUP_CACHE_DIR で変更できます。有効期限は設定ファイルの geocode_cache_ttl / weather_cache_ttl（秒）で変更できます。
+    
+    Args:
+        config_manager: 設定マネージャー
+        
+    Returns:
+        PersistentCaches、キャッシュを開けない場合はNone
+    """
+    try:
+        config = config_manager.load_config()
+        cache_dir = os.environ.get(CACHE_DIR_ENV) or config_manager.get_config_path().parent
+        cache_path = Path(cache_dir) / CACHE_FILE_NAME
+        geocode_ttl = float(config.get('geocode_cache_ttl', DEFAULT_GEOCODE_CACHE_TTL))
+        weather_ttl = float(config.get('weather_cache_ttl', DEFAULT_WEATHER_CACHE_TTL))
+        
+        return PersistentCaches(
+            geocode=DiskCache(
+                cache_path, 'geocode', geocode_ttl,
+                encode=list,
+                decode=tuple,
+                retention=max(geocode_ttl, CACHE_RETENTION)
+            ),
+            weather=DiskCache(
+                cache_path, 'weather', weather_ttl,
+                encode=WeatherData.to_dict,
+                decode=WeatherData.from_dict,
+                retention=max(weather_ttl, CACHE_RETENTION)
+            )
+        )
+    except (ConfigError, OSError, sqlite3.Error, ValueError):
+        return None
+
+
+def _cache_kwargs(caches: Optional[PersistentCaches], weather: bool = True) -> dict:
+    """
+    永続キャッシュをWeatherServiceの引数に変換
+    
+    Args:
+        caches: 永続キャッシュ（Noneの場合はインメモリのデフォルトを使用）
+        weather: 天気データもキャッシュするかどうか
+        
+    Returns:
+        WeatherServiceに渡すキーワード引数
+    """
+    if caches is None:
+        return {}
+    kwargs = {'geocode_cache': caches.geocode}
+    if weather:
+        kwargs['weather_cache'] = caches.weather
+    return kwargs
+
+
+class OfflineLookup:
+    """永続キャッシュだけで天気データを返す、WeatherService互換のオブジェクト"""
+    
+    def __init__(self, caches: Optional[PersistentCaches]):
+        """
+        Args:
+            caches: 永続キャッシュ（Noneの場合は常にキャッシュミス）
+        """
+        self._caches = caches
+    
+    def get_weather_by_postal_code(self, postal_code: str, max_age: Optional[float] = None) -> WeatherData:
+        """
+        キャッシュから天気データを取得
+        
+        Args:
+            postal_code: 郵便番号
+            max_age: 許容する最大経過秒数（省略時は期限切れのデータも返す）
+            
+        Returns:
+            キャッシュされたWeatherData
+            
+        Raises:
+            CacheMissError: キャッシュにデータがない場合
+        """
+        weather_data = None
+        if self._caches is not None:
+            limit = max_age if max_age is not None else float('inf')
+            weather_data = self._caches.weather.get(postal_code, max_age=limit)
+        if weather_data is None:
+            raise CacheMissError(f"オフラインモード: 郵便番号 {postal_code} のキャッシュがありません。")
+        return weather_data
+
+
+def load_postal_bitset(config_manager: ConfigManager) -> Optional[PostalBitset]:
+    """
+    存在しない郵便番号を拒否するためのビットセットを読み込む
+    
+    設定ファイルの validate_postal_codes（または環境変数 VALIDATE_POSTAL_CODES）が有効で、
+    郵便番号データが設定されている場合だけ読み込みます。
+    
+    Args:
+        config_manager: 設定マネージャー
+        
+    Returns:
+        PostalBitset、無効な場合や郵便番号データを読み込めない場合はNone（警告を表示）
+    """
+    dataset = config_manager.get_postal_dataset()
+    if not dataset or not config_manager.get_validate_postal_codes():
+        return None
+    try:
+        return PostalBitset.for_dataset(dataset)
+    except (OSError, ValueError) as e:  # ValueErrorはUnicodeDecodeErrorを含む
+        print(f"警告: 郵便番号データを読み込めないため、郵便番号の存在を確認しません: {e}", file=sys.stderr)
+        return None
+
+
+def _create_weather_service(config_manager: ConfigManager, **kwargs) -> Optional[WeatherService]:
+    """
+    設定ファイルのAPIキーで天気サービスを初期化
+    
+    Args:
+        config_manager: 設定マネージャー
+        **kwargs: WeatherServiceに渡す追加の引数
+        
+    Returns:
+        WeatherService、APIキーが設定されていない場合はエラーを表示してNone
+    """
+    api_key = config_manager.get_api_key()
+    if not api_key:
+        print("エラー: APIキーが設定されていません。")
+        print("OpenWeatherMapからAPIキーを取得し、設定ファイルに保存してください。")
+        print(f"設定ファイルの場所: {config_manager.get_config_path()}")
+        print("\n設定ファイルの例:")
+        print('{')
+        print('  "default_postal_code": "1000001",')
+        print('  "api_key": "your_api_key_here"')
+        print('}')
+        return None
+    
+    kwargs.setdefault('base_url', config_manager.get_base_url())
+    kwargs.setdefault('postal_bitset', load_postal_bitset(config_manager))
+    return WeatherService(api_key, **kwargs)
 
 
 if __name__ == '__main__':
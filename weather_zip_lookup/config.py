@@ -1,19 +1,43 @@
 """設定ファイル管理モジュール"""
 
 import json
+import os
 import platform
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from .exceptions import ConfigError
 
 
+# 上流APIのベースURLを上書きする環境変数（ローカルのスタブサーバーなどに向ける）
+BASE_URL_ENV = 'OPENWEATHER_BASE_URL'
+
+# ローカルの郵便番号データ（KEN_ALL.CSVなど）のパスを指定する環境変数
+POSTAL_DATASET_ENV = 'POSTAL_DATASET'
+
+# 郵便番号データにない郵便番号を上流APIに問い合わせる前に拒否するかどうかを指定する環境変数
+VALIDATE_POSTAL_CODES_ENV = 'VALIDATE_POSTAL_CODES'
+
 class ConfigManager:
-    """設定ファイルを管理するクラス"""
+    """設定ファイルを管理するクラス
+    
+    読み込んだ設定はファイルの stat 情報（mtime/サイズ）と共にキャッシュされ、
+    ファイルが変更されない限り再パースしません。
+    """
     
     def __init__(self):
         """設定ファイルのパスを初期化"""
         self._config_path = self.get_config_path()
+        
+        # 設定キャッシュ（stat署名が一致する間は再利用）
+        self._cache_lock = threading.Lock()
+        self._cached_config: Optional[dict] = None
+        self._cached_signature: Optional[tuple] = None
+        
+        # ファイル監視スレッド
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
     
     def get_config_path(self) -> Path:
         """
@@ -41,15 +65,67 @@ class ConfigManager:
         """
         設定ファイルを読み込む
         
+        前回読み込み時からファイルの mtime/サイズが変わっていない場合は
+        キャッシュ済みの設定を返します。監視スレッドの動作中は stat も行いません。
+        
         Returns:
             設定データを含む辞書
             
         Raises:
             ConfigError: 設定ファイルの読み取りに失敗した場合
         """
-        if not self._config_path.exists():
-            return {}
+        return dict(self._get_cached_config())
+    
+    def _get_cached_config(self) -> dict:
+        """
+        キャッシュ済みの設定を取得（必要な場合のみ再読み込み）
         
+        Returns:
+            キャッシュされた設定辞書（呼び出し側で変更しないこと）
+            
+        Raises:
+            ConfigError: 設定ファイルの読み取りに失敗した場合
+        """
+        cached = self._cached_config
+        if cached is not None and self._watch_thread is not None:
+            # 監視スレッドがキャッシュを最新に保つため、ディスクI/Oは不要
+            return cached
+        
+        signature = self._stat_signature()
+        with self._cache_lock:
+            if self._cached_config is not None and signature == self._cached_signature:
+                return self._cached_config
+            
+            config = self._read_config_file() if signature is not None else {}
+            self._cached_config = config
+            self._cached_signature = signature
+            return config
+    
+    def _stat_signature(self) -> Optional[tuple]:
+        """
+        設定ファイルの変更検出用の署名を取得
+        
+        Returns:
+            (mtime_ns, サイズ, inode) のタプル、ファイルが存在しない場合はNone
+        """
+        try:
+            stat = os.stat(self._config_path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise ConfigError(f"設定ファイルの読み取りに失敗しました: {e}")
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    def _read_config_file(self) -> dict:
+        """
+        設定ファイルを読み込んでパース
+        
+        Returns:
+            設定データを含む辞書
+            
+        Raises:
+            ConfigError: 設定ファイルの読み取りに失敗した場合
+        """
         try:
             with open(self._config_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -61,9 +137,89 @@ class ConfigManager:
                     )
                 
                 return data
+        except FileNotFoundError:
+            return {}
         except (json.JSONDecodeError, IOError) as e:
             raise ConfigError(f"設定ファイルの読み取りに失敗しました: {e}")
     
+    def invalidate_cache(self) -> None:
+        """キャッシュを破棄し、次回アクセス時にファイルを再読み込みさせる"""
+        with self._cache_lock:
+            self._cached_config = None
+            self._cached_signature = None
+    
+    def start_watching(
+        self,
+        interval: float = 2.0,
+        on_change: Optional[Callable[[dict], None]] = None
+    ) -> None:
+        """
+        設定ファイルの監視を開始（長時間動作するWebプロセス向け）
+        
+        バックグラウンドスレッドが interval 秒ごとに stat を確認し、変更があれば
+        キャッシュを更新して on_change を呼び出します。監視中の load_config() は
+        ディスクにアクセスしません。
+        
+        Args:
+            interval: 監視間隔（秒）
+            on_change: 設定が変更されたときに新しい設定辞書で呼ばれるコールバック
+        """
+        if self._watch_thread is not None:
+            return
+        
+        # 監視開始前にキャッシュを温めておく（読み取りエラーは監視側で再試行）
+        try:
+            self._get_cached_config()
+        except ConfigError:
+            pass
+        
+        self._watch_stop.clear()
+        thread = threading.Thread(
+            target=self._watch_loop,
+            args=(interval, on_change),
+            name='config-watcher',
+            daemon=True
+        )
+        self._watch_thread = thread
+        thread.start()
+    
+    def stop_watching(self) -> None:
+        """設定ファイルの監視を停止"""
+        thread = self._watch_thread
+        if thread is None:
+            return
+        self._watch_stop.set()
+        thread.join()
+        self._watch_thread = None
+    
+    def _watch_loop(self, interval: float, on_change: Optional[Callable[[dict], None]]) -> None:
+        """
+        監視スレッドのメインループ
+        
+        Args:
+            interval: 監視間隔（秒）
+            on_change: 変更時のコールバック
+        """
+        while not self._watch_stop.wait(interval):
+            try:
+                signature = self._stat_signature()
+                if self._cached_config is not None and signature == self._cached_signature:
+                    continue
+                config = self._read_config_file() if signature is not None else {}
+            except ConfigError:
+                # 書き込み途中などで読めない場合は直前の設定を維持して次回再試行
+                continue
+            
+            with self._cache_lock:
+                self._cached_config = config
+                self._cached_signature = signature
+            
+            if on_change is not None:
+                try:
+                    on_change(dict(config))
+                except Exception:
+                    pass  # コールバックの失敗で監視を止めない
+    
     def save_config(self, config: dict) -> None:
         """
         設定ファイルに保存
@@ -82,6 +238,9 @@ class ConfigManager:
                 json.dump(config, f, ensure_ascii=False, indent=2)
         except IOError as e:
             raise ConfigError(f"設定ファイルの書き込みに失敗しました: {e}")
+        finally:
+            # mtimeの分解能によっては変更を検出できないため、明示的に破棄
+            self.invalidate_cache()
     
     def get_default_postal_code(self) -> Optional[str]:
         """
@@ -90,8 +249,7 @@ class ConfigManager:
         Returns:
             郵便番号文字列、設定されていない場合はNone
         """
-        config = self.load_config()
-        return config.get("default_postal_code")
+        return self._get_cached_config().get("default_postal_code")
     
     def get_api_key(self) -> Optional[str]:
         """
@@ -100,5 +258,41 @@ class ConfigManager:
         Returns:
             APIキー文字列、設定されていない場合はNone
         """
-        config = self.load_config()
-        return config.get("api_key")
+        return self._get_cached_config().get("api_key")
+    
+    def get_base_url(self) -> Optional[str]:
+        """
+        上流APIのベースURLを取得
+        
+        環境変数 OPENWEATHER_BASE_URL が設定されていればそれを優先します。
+        
+        Returns:
+            ベースURL文字列、設定されていない場合はNone（OpenWeatherMapを使用）
+        """
+        return os.environ.get(BASE_URL_ENV) or self._get_cached_config().get("base_url")
+    
+    def get_postal_dataset(self) -> Optional[str]:
+        """
+        ローカルの郵便番号データのパスを取得
+        
+        環境変数 POSTAL_DATASET が設定されていればそれを優先します。
+        
+        Returns:
+            ファイルパス文字列、設定されていない場合はNone
+        """
+        return os.environ.get(POSTAL_DATASET_ENV) or self._get_cached_config().get("postal_dataset")
+    
+    def get_validate_postal_codes(self) -> bool:
+        """
+        郵便番号データにない郵便番号を上流APIに問い合わせる前に拒否するかどうかを取得
+        
+        環境変数 VALIDATE_POSTAL_CODES が設定されていればそれを優先します。
+        郵便番号データ（get_postal_dataset）が設定されていない場合は使われません。
+        
+        Returns:
+            拒否する場合はTrue（デフォルト: False）
+        """
+        value = os.environ.get(VALIDATE_POSTAL_CODES_ENV)
+        if value:
+            return value.lower() in ('1', 'true', 'yes')
+        return bool(self._get_cached_config().get("validate_postal_codes", False))
@@ -0,0 +1,369 @@
+"""
+常駐プロセス（デーモン）とクライアントの実装
+
+シェルのプロンプトやステータスバーのようにCLIを頻繁に実行する用途向けに、
+接続プール・キャッシュ・レートリミッターを保持したWeatherServiceを
+バックグラウンドで動かし、Unixドメインソケット経由で天気データを返します。
+"""
+
+import json
+import os
+import socket
+import socketserver
+import time
+from pathlib import Path
+from typing import Optional
+
+from .config import ConfigManager
+from .exceptions import (
+    WeatherScriptError,
+    InvalidPostalCodeError,
+    APIError,
+    NetworkError,
+    ConfigError,
+    MissingAPIKeyError,
+    DaemonUnavailableError
+)
+from .models import WeatherData
+from .services import WeatherService, TTLCache, RateLimiter, Timings, FlightRecorder, PostalBitset, create_component_cache
+
+
+# ソケットパスを上書きする環境変数
+SOCKET_PATH_ENV = 'WEATHER_ZIP_LOOKUP_SOCKET'
+
+# デーモンのデフォルト設定（設定ファイルで上書き可能）
+DEFAULT_WEATHER_CACHE_TTL = 300
+DEFAULT_WEATHER_CACHE_SIZE = 10000
+DEFAULT_RATE_LIMIT_PER_MINUTE = 60
+DEFAULT_NEGATIVE_CACHE_TTL = 600
+DEFAULT_NEGATIVE_CACHE_SIZE = 10000
+
+# クライアントのタイムアウト（秒）
+CONNECT_TIMEOUT = 1.0
+RESPONSE_TIMEOUT = 35.0
+
+# プロトコル上で転送する例外
+_ERROR_TYPES = {
+    error_type.__name__: error_type
+    for error_type in (InvalidPostalCodeError, APIError, NetworkError, ConfigError, MissingAPIKeyError)
+}
+
+
+def is_supported() -> bool:
+    """
+    このプラットフォームでデーモンを利用できるかどうか
+    
+    Returns:
+        Unixドメインソケットが利用できる場合はTrue
+    """
+    return hasattr(socket, 'AF_UNIX')
+
+
+def get_socket_path(config_manager: Optional[ConfigManager] = None) -> str:
+    """
+    デーモンのソケットパスを取得
+    
+    環境変数 WEATHER_ZIP_LOOKUP_SOCKET が設定されていればそれを、
+    なければ設定ファイルと同じディレクトリの daemon.sock を使用します。
+    
+    Args:
+        config_manager: 設定マネージャー（省略時は新規作成）
+        
+    Returns:
+        ソケットファイルのパス
+    """
+    if os.environ.get(SOCKET_PATH_ENV):
+        return os.environ[SOCKET_PATH_ENV]
+    config_manager = config_manager if config_manager is not None else ConfigManager()
+    return str(config_manager.get_config_path().parent / 'daemon.sock')
+
+
+def create_daemon_service(
+    config_manager: ConfigManager,
+    postal_bitset: Optional[PostalBitset] = None
+) -> WeatherService:
+    """
+    デーモン用に、キャッシュとレートリミッターを備えたWeatherServiceを作成
+    
+    Args:
+        config_manager: 設定マネージャー
+        postal_bitset: 存在する郵便番号のビットセット（省略時は存在を確認しない）
+        
+    Returns:
+        WeatherService
+        
+    Raises:
+        MissingAPIKeyError: APIキーが設定されていない場合
+        ConfigError: 設定ファイルの読み取りに失敗した場合
+    """
+    config = config_manager.load_config()
+    negative_ttl = float(config.get('negative_cache_ttl', DEFAULT_NEGATIVE_CACHE_TTL))
+    rate_limit = int(config.get('rate_limit_per_minute', DEFAULT_RATE_LIMIT_PER_MINUTE))
+    weather_ttl = float(config.get('weather_cache_ttl', DEFAULT_WEATHER_CACHE_TTL))
+    component_cache, weather_ttl = create_component_cache(
+        weather_ttl,
+        precipitation_ttl=float(config.get('precipitation_cache_ttl', 0)),
+        alerts_ttl=float(config.get('alerts_cache_ttl', 0)),
+        maxsize=DEFAULT_WEATHER_CACHE_SIZE * len(WeatherService.COMPONENTS)
+    )
+    return WeatherService(
+        config.get('api_key') or '',
+        weather_cache=TTLCache(
+            maxsize=DEFAULT_WEATHER_CACHE_SIZE,
+            ttl=weather_ttl
+        ),
+        rate_limiter=RateLimiter.per_minute(rate_limit) if rate_limit > 0 else None,
+        base_url=config_manager.get_base_url(),
+        nearby_distance_km=float(config.get('nearby_distance_km', 0)),
+        postal_bitset=postal_bitset,
+        negative_cache=TTLCache(
+            maxsize=DEFAULT_NEGATIVE_CACHE_SIZE,
+            ttl=negative_ttl
+        ) if negative_ttl > 0 else None,
+        component_cache=component_cache
+    )
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """1行1リクエストのJSONプロトコルを処理するハンドラー"""
+    
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.daemon.handle_request(request)
+            except ValueError:
+                response = {'ok': False, 'error': 'ProtocolError', 'message': '無効なリクエストです'}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """スレッドごとに接続を処理するUnixソケットサーバー"""
+    daemon_threads = True
+
+
+class WeatherDaemon:
+    """ウォームなWeatherServiceを保持して問い合わせに応答する常駐プロセス"""
+    
+    def __init__(
+        self,
+        weather_service: WeatherService,
+        socket_path: str,
+        flight_recorder: Optional[FlightRecorder] = None
+    ):
+        """
+        Args:
+            weather_service: 共有する天気サービス
+            socket_path: 待ち受けるソケットファイルのパス
+            flight_recorder: 取得処理を記録するレコーダー（省略時は新しく作成）
+        """
+        self.weather_service = weather_service
+        self.socket_path = socket_path
+        self.flight_recorder = flight_recorder if flight_recorder is not None else FlightRecorder()
+        self._server: Optional[_UnixServer] = None
+    
+    def handle_request(self, request: object) -> dict:
+        """
+        リクエストを処理してレスポンスを返す
+        
+        Args:
+            request: {'op': 'weather', 'postal_code': ..., 'max_age': ...}、{'op': 'flight_recorder'} または {'op': 'ping'}
+                （max_ageは省略可能で、キャッシュを使う場合の最大経過秒数）。オブジェクトでない場合はProtocolError
+            
+        Returns:
+            レスポンス辞書（天気データの場合は 'age' にキャッシュに保存してからの経過秒数を含む）
+        """
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'ProtocolError', 'message': '無効なリクエストです'}
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'flight_recorder':
+            return {'ok': True, 'data': self.flight_recorder.snapshot()}
+        if op != 'weather':
+            return {'ok': False, 'error': 'ProtocolError', 'message': f'不明な操作です: {op}'}
+        
+        postal_code = request.get('postal_code')
+        if not isinstance(postal_code, str):
+            return {'ok': False, 'error': 'ProtocolError', 'message': f'postal_codeが不正です: {postal_code}'}
+        max_age = request.get('max_age')
+        if max_age is not None and (isinstance(max_age, bool) or not isinstance(max_age, (int, float))):
+            return {'ok': False, 'error': 'ProtocolError', 'message': f'max_ageが不正です: {max_age}'}
+        lookup_kwargs = {'max_age': max_age} if max_age is not None else {}
+        timings = Timings()
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            weather_data = self.weather_service.get_weather_by_postal_code(
+                postal_code, timings=timings, **lookup_kwargs
+            )
+        except WeatherScriptError as e:
+            outcome = type(e).__name__
+            return {'ok': False, 'error': type(e).__name__, 'message': str(e)}
+        except Exception as e:
+            outcome = 'Exception'
+            return {'ok': False, 'error': 'Exception', 'message': f'予期しないエラーが発生しました: {e}'}
+        finally:
+            self.flight_recorder.record(
+                postal_code, timings, outcome, duration=time.perf_counter() - started
+            )
+        
+        # キャッシュから答えた場合、クライアントが元の取得時刻のまま保存できるように経過秒数を返す
+        weather_cache = self.weather_service.weather_cache
+        age = weather_cache.age(postal_code) if weather_cache is not None else None
+        return {'ok': True, 'data': weather_data.to_dict(), 'age': age or 0.0}
+    
+    def bind(self) -> None:
+        """
+        ソケットを作成して待ち受けを開始
+        
+        Raises:
+            DaemonUnavailableError: 既に別のデーモンが動作している場合
+        """
+        path = Path(self.socket_path)
+        if path.exists():
+            if DaemonClient(self.socket_path).ping():
+                raise DaemonUnavailableError(f"デーモンは既に起動しています: {self.socket_path}")
+            path.unlink()  # 前回の異常終了で残ったソケット
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # 他のユーザーから接続されないように所有者のみアクセス可能にする
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+    
+    def serve_forever(self) -> None:
+        """停止されるまでリクエストを処理"""
+        if self._server is None:
+            self.bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+    
+    def shutdown(self) -> None:
+        """待ち受けを停止（別スレッドから呼び出す）"""
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class DaemonClient:
+    """デーモンに天気データを問い合わせるクライアント"""
+    
+    def __init__(self, socket_path: str):
+        """
+        Args:
+            socket_path: デーモンのソケットファイルのパス
+        """
+        self.socket_path = socket_path
+    
+    def _request(self, request: dict) -> dict:
+        """
+        デーモンにリクエストを送信してレスポンスを受け取る
+        
+        Args:
+            request: リクエスト辞書
+            
+        Returns:
+            レスポンス辞書
+            
+        Raises:
+            DaemonUnavailableError: デーモンに接続できない、または応答がない場合
+        """
+        if not is_supported():
+            raise DaemonUnavailableError("このプラットフォームではデーモンを利用できません")
+        
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(CONNECT_TIMEOUT)
+                sock.connect(self.socket_path)
+                sock.settimeout(RESPONSE_TIMEOUT)
+                sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                with sock.makefile('rb') as reader:
+                    line = reader.readline()
+        except (OSError, ValueError) as e:
+            raise DaemonUnavailableError(f"デーモンに接続できません: {e}")
+        
+        if not line:
+            raise DaemonUnavailableError("デーモンから応答がありません")
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise DaemonUnavailableError(f"デーモンの応答が無効です: {e}")
+    
+    def ping(self) -> bool:
+        """
+        デーモンが応答するかどうかを確認
+        
+        Returns:
+            応答した場合はTrue
+        """
+        try:
+            return self._request({'op': 'ping'}).get('ok', False)
+        except DaemonUnavailableError:
+            return False
+    
+    def dump_flight_recorder(self) -> dict:
+        """
+        デーモンのフライトレコーダーの内容を取得
+        
+        Returns:
+            'recent'（新しい順）と 'slowest'（遅い順）の記録を含む辞書
+            
+        Raises:
+            DaemonUnavailableError: デーモンに接続できない、または応答が無効な場合
+        """
+        response = self._request({'op': 'flight_recorder'})
+        if not response.get('ok'):
+            raise DaemonUnavailableError(f"フライトレコーダーを取得できません: {response.get('message', '')}")
+        return response['data']
+    
+    def get_weather_by_postal_code(self, postal_code: str, max_age: Optional[float] = None) -> WeatherData:
+        """
+        デーモン経由で郵便番号から天気データを取得
+        
+        Args:
+            postal_code: 7桁の日本の郵便番号
+            max_age: デーモンのキャッシュを使う場合の最大経過秒数（省略時はキャッシュのTTL）
+            
+        Returns:
+            WeatherDataオブジェクト
+            
+        Raises:
+            DaemonUnavailableError: デーモンに接続できない場合
+            InvalidPostalCodeError, APIError, NetworkError など: デーモン側で発生したエラー
+        """
+        return self.get_weather_with_age(postal_code, max_age=max_age)[0]
+    
+    def get_weather_with_age(self, postal_code: str, max_age: Optional[float] = None) -> tuple[WeatherData, float]:
+        """
+        デーモン経由で郵便番号から天気データと、その取得からの経過秒数を取得
+        
+        Args:
+            postal_code: 7桁の日本の郵便番号
+            max_age: デーモンのキャッシュを使う場合の最大経過秒数（省略時はキャッシュのTTL）
+            
+        Returns:
+            (WeatherData, デーモンのキャッシュに保存してからの経過秒数)
+            
+        Raises:
+            DaemonUnavailableError: デーモンに接続できない場合
+            InvalidPostalCodeError, APIError, NetworkError など: デーモン側で発生したエラー
+        """
+        request = {'op': 'weather', 'postal_code': postal_code}
+        if max_age is not None:
+            request['max_age'] = max_age
+        response = self._request(request)
+        if response.get('ok'):
+            return WeatherData.from_dict(response['data']), float(response.get('age') or 0.0)
+        
+        error_type = _ERROR_TYPES.get(response.get('error'), WeatherScriptError)
+        raise error_type(response.get('message', ''))
@@ -29,3 +29,13 @@ class ConfigError(WeatherScriptError):
 class MissingAPIKeyError(WeatherScriptError):
     """APIキー欠落エラー"""
     pass
+
+
+class DaemonUnavailableError(WeatherScriptError):
+    """常駐プロセス（デーモン）に接続できないエラー"""
+    pass
+
+
+class CacheMissError(WeatherScriptError):
+    """オフラインモードでキャッシュにデータがないエラー"""
+    pass
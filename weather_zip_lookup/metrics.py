@@ -0,0 +1,479 @@
+"""
+Prometheus形式のメトリクス
+
+計測対象のコードから呼ばれるホットパスでは、ラベルごとの子メトリクスを事前に
+取得しておき（labels() の結果を保持する）、更新時はメトリクスごとの競合しない
+ロックを1回取るだけにしています。文字列の組み立てはスクレイプ時にだけ行います。
+キャッシュの件数やヒット率はキャッシュ自身の統計情報をスクレイプ時に読み取ります。
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional
+
+
+# Prometheusのテキスト形式のContent-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# レイテンシ用のデフォルトのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """ラベル付きメトリクスの共通処理"""
+    
+    TYPE = ''
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        """
+        Args:
+            name: メトリクス名
+            documentation: HELP行に出力する説明
+            labelnames: ラベル名
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict = {}
+        self._children_lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values):
+        """
+        ラベルの値に対応する子メトリクスを取得
+        
+        ホットパスでは結果を保持して再利用してください。
+        
+        Args:
+            *values: ラベルの値（labelnamesと同じ順序）
+        
+        Returns:
+            子メトリクス
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} のラベル数が一致しません: {values}")
+            with self._children_lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+    
+    def _unlabeled(self):
+        return self._children[()]
+    
+    def render(self) -> Iterator[str]:
+        """テキスト形式の行を生成"""
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.TYPE}'
+        for values, child in sorted(self._children.items(), key=lambda item: tuple(map(str, item[0]))):
+            yield from self._render_child(values, child)
+    
+    def _render_child(self, values: tuple, child) -> Iterator[str]:
+        yield f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}'
+
+
+class _ValueChild:
+    """単一の値を持つ子メトリクス"""
+    
+    __slots__ = ('_value', '_lock')
+    
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+    
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+    
+    def set(self, value: float) -> None:
+        self._value = value
+    
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+    
+    TYPE = 'counter'
+    
+    def _new_child(self) -> _ValueChild:
+        return _ValueChild()
+    
+    def inc(self, amount: float = 1) -> None:
+        """ラベルなしのカウンターを増やす"""
+        self._unlabeled().inc(amount)
+
+
+class Gauge(_Metric):
+    """増減する値"""
+    
+    TYPE = 'gauge'
+    
+    def _new_child(self) -> _ValueChild:
+        return _ValueChild()
+    
+    def inc(self, amount: float = 1) -> None:
+        """ラベルなしのゲージを増やす"""
+        self._unlabeled().inc(amount)
+    
+    def dec(self, amount: float = 1) -> None:
+        """ラベルなしのゲージを減らす"""
+        self._unlabeled().dec(amount)
+    
+    def set(self, value: float) -> None:
+        """ラベルなしのゲージに値を設定"""
+        self._unlabeled().set(value)
+
+
+class _HistogramChild:
+    """バケットごとの件数と合計を持つ子メトリクス"""
+    
+    __slots__ = ('_upper_bounds', '_counts', '_sum', '_lock')
+    
+    def __init__(self, upper_bounds: tuple):
+        self._upper_bounds = upper_bounds
+        # 最後の要素は +Inf バケット（累積はスクレイプ時に計算する）
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+    
+    def snapshot(self) -> tuple[list, float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    """値の分布（レイテンシなど）"""
+    
+    TYPE = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            name: メトリクス名
+            documentation: HELP行に出力する説明
+            labelnames: ラベル名
+            buckets: バケットの上限値（昇順）
+        """
+        self._upper_bounds = tuple(sorted(float(bucket) for bucket in buckets if bucket != math.inf))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._upper_bounds)
+    
+    def observe(self, value: float) -> None:
+        """ラベルなしのヒストグラムに値を記録"""
+        self._unlabeled().observe(value)
+    
+    def _render_child(self, values: tuple, child: _HistogramChild) -> Iterator[str]:
+        counts, total = child.snapshot()
+        cumulative = 0
+        for upper_bound, count in zip((*self._upper_bounds, math.inf), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(upper_bound)}"')
+            yield f'{self.name}_bucket{labels} {cumulative}'
+        labels = _format_labels(self.labelnames, values)
+        yield f'{self.name}_sum{labels} {_format_value(total)}'
+        yield f'{self.name}_count{labels} {cumulative}'
+
+
+class MetricsRegistry:
+    """メトリクスの登録とテキスト形式への変換"""
+    
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        メトリクスを登録
+        
+        Args:
+            metric: 登録するメトリクス
+        
+        Returns:
+            登録したメトリクス
+        
+        Raises:
+            ValueError: 同じ名前のメトリクスが登録済みの場合
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"メトリクス {metric.name} は登録済みです")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        """名前で登録済みのメトリクスを取得"""
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """
+        登録済みのメトリクスをPrometheusのテキスト形式に変換
+        
+        Returns:
+            テキスト形式の文字列
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def render_cache_metrics(caches: dict) -> str:
+    """
+    キャッシュの統計情報をPrometheusのテキスト形式に変換
+    
+    キャッシュ側が保持している hits/misses/evictions と件数をスクレイプ時に読み取るため、
+    キャッシュのホットパスには計測のコストがかかりません。
+    
+    Args:
+        caches: キャッシュ名 → キャッシュ（TTLCache/DiskCache）
+    
+    Returns:
+        テキスト形式の文字列（キャッシュがない場合は空文字列）
+    """
+    caches = {name: cache for name, cache in caches.items() if cache is not None}
+    if not caches:
+        return ''
+    
+    families = (
+        ('weather_zip_lookup_cache_hits_total', 'counter', 'キャッシュのヒット数', lambda cache: cache.hits),
+        ('weather_zip_lookup_cache_misses_total', 'counter', 'キャッシュのミス数', lambda cache: cache.misses),
+        ('weather_zip_lookup_cache_evictions_total', 'counter', 'キャッシュから破棄したエントリ数', lambda cache: cache.evictions),
+        ('weather_zip_lookup_cache_entries', 'gauge', 'キャッシュのエントリ数', len),
+        ('weather_zip_lookup_cache_hit_ratio', 'gauge', 'キャッシュのヒット率（起動以降）',
+         lambda cache: cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0),
+    )
+    lines = []
+    for name, metric_type, documentation, read in families:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for cache_name, cache in sorted(caches.items()):
+            lines.append(f'{name}{_format_labels(("cache",), (cache_name,))} {_format_value(read(cache))}')
+    return '\n'.join(lines) + '\n'
+
+
+# アプリケーション全体で共有するレジストリとメトリクス
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.register(Counter(
+    'weather_zip_lookup_requests_total',
+    '/api/weather へのリクエスト数',
+    ('status',)
+))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'weather_zip_lookup_request_duration_seconds',
+    '/api/weather の処理時間（秒）'
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'weather_zip_lookup_requests_in_flight',
+    '処理中の /api/weather へのリクエスト数'
+))
+FORECAST_REQUESTS = REGISTRY.register(Counter(
+    'weather_zip_lookup_forecast_requests_total',
+    '/api/forecast へのリクエスト数',
+    ('status',)
+))
+FORECAST_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'weather_zip_lookup_forecast_request_duration_seconds',
+    '/api/forecast の処理時間（秒）'
+))
+FORECAST_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'weather_zip_lookup_forecast_requests_in_flight',
+    '処理中の /api/forecast へのリクエスト数'
+))
+AGGREGATE_REQUESTS = REGISTRY.register(Counter(
+    'weather_zip_lookup_aggregate_requests_total',
+    '/api/aggregate へのリクエスト数',
+    ('status',)
+))
+AGGREGATE_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'weather_zip_lookup_aggregate_request_duration_seconds',
+    '/api/aggregate の処理時間（秒、多数の上流API呼び出しを含む）',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+))
+AGGREGATE_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'weather_zip_lookup_aggregate_requests_in_flight',
+    '処理中の /api/aggregate へのリクエスト数'
+))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    'weather_zip_lookup_upstream_requests_total',
+    'OpenWeatherMap APIへのリクエスト数（statusはHTTPステータス、失敗時はerror/timeout）',
+    ('endpoint', 'status')
+))
+UPSTREAM_DURATION = REGISTRY.register(Histogram(
+    'weather_zip_lookup_upstream_request_duration_seconds',
+    'OpenWeatherMap APIの応答時間（秒）',
+    ('endpoint',)
+))
+UPSTREAM_IN_FLIGHT = REGISTRY.register(Gauge(
+    'weather_zip_lookup_upstream_requests_in_flight',
+    '応答待ちのOpenWeatherMap APIへのリクエスト数',
+    ('endpoint',)
+))
+UPSTREAM_RATE_LIMITED = REGISTRY.register(Counter(
+    'weather_zip_lookup_upstream_rate_limited_total',
+    'OpenWeatherMap APIが429を返した回数',
+    ('endpoint',)
+))
+UPSTREAM_TIMEOUTS = REGISTRY.register(Counter(
+    'weather_zip_lookup_upstream_timeouts_total',
+    'OpenWeatherMap APIへのリクエストがタイムアウトした回数',
+    ('endpoint',)
+))
+UPSTREAM_PREWARMS = REGISTRY.register(Counter(
+    'weather_zip_lookup_upstream_prewarm_total',
+    '上流APIのホストへの接続を事前に確立した回数（resultはok/error）',
+    ('host', 'result')
+))
+UPSTREAM_PREWARM_DURATION = REGISTRY.register(Gauge(
+    'weather_zip_lookup_upstream_prewarm_duration_seconds',
+    '上流APIのホストへの接続（DNS解決・TCP/TLS）を事前に確立するのにかかった時間（秒、直近の値）',
+    ('host',)
+))
+
+
+class RequestMetrics:
+    """1つのAPIエンドポイントへのリクエストについて、事前に取得した子メトリクスの組"""
+    
+    __slots__ = ('_requests', 'duration', 'in_flight', '_statuses')
+    
+    def __init__(self, requests: Counter, duration: Histogram, in_flight: Gauge):
+        """
+        Args:
+            requests: ステータスごとのリクエスト数（statusラベル付き）
+            duration: 処理時間
+            in_flight: 処理中のリクエスト数
+        """
+        self._requests = requests
+        self.duration = duration.labels()
+        self.in_flight = in_flight.labels()
+        self._statuses: dict = {}
+    
+    def requests(self, status) -> _ValueChild:
+        """
+        ステータスごとのリクエスト数のカウンターを取得
+        
+        Args:
+            status: HTTPステータス
+        
+        Returns:
+            カウンターの子メトリクス
+        """
+        child = self._statuses.get(status)
+        if child is None:
+            child = self._statuses[status] = self._requests.labels(status)
+        return child
+
+
+# エンドポイントごとのリクエストのメトリクス（同じヒストグラムに別のエンドポイントの処理時間を混ぜない）
+WEATHER_REQUEST_METRICS = RequestMetrics(REQUESTS, REQUEST_DURATION, REQUESTS_IN_FLIGHT)
+FORECAST_REQUEST_METRICS = RequestMetrics(FORECAST_REQUESTS, FORECAST_REQUEST_DURATION, FORECAST_REQUESTS_IN_FLIGHT)
+AGGREGATE_REQUEST_METRICS = RequestMetrics(
+    AGGREGATE_REQUESTS, AGGREGATE_REQUEST_DURATION, AGGREGATE_REQUESTS_IN_FLIGHT
+)
+
+
+class UpstreamMetrics:
+    """1つの上流エンドポイントについて、事前に取得した子メトリクスの組"""
+    
+    __slots__ = ('endpoint', 'duration', 'in_flight', 'rate_limited', 'timeouts', '_statuses')
+    
+    def __init__(self, endpoint: str):
+        """
+        Args:
+            endpoint: エンドポイント名（geocode/weather/onecall）
+        """
+        self.endpoint = endpoint
+        self.duration = UPSTREAM_DURATION.labels(endpoint)
+        self.in_flight = UPSTREAM_IN_FLIGHT.labels(endpoint)
+        self.rate_limited = UPSTREAM_RATE_LIMITED.labels(endpoint)
+        self.timeouts = UPSTREAM_TIMEOUTS.labels(endpoint)
+        self._statuses: dict = {}
+    
+    def requests(self, status) -> _ValueChild:
+        """
+        ステータスごとのリクエスト数のカウンターを取得
+        
+        Args:
+            status: HTTPステータス、または 'timeout' / 'error'
+        
+        Returns:
+            カウンターの子メトリクス
+        """
+        child = self._statuses.get(status)
+        if child is None:
+            child = self._statuses[status] = UPSTREAM_REQUESTS.labels(self.endpoint, status)
+        return child
+
+
+_upstream_metrics: dict[str, UpstreamMetrics] = {}
+
+
+def upstream_metrics(endpoint: str) -> UpstreamMetrics:
+    """
+    上流エンドポイントのメトリクスを取得（エンドポイントごとに1つを共有）
+    
+    Args:
+        endpoint: エンドポイント名
+    
+    Returns:
+        UpstreamMetrics
+    """
+    metrics = _upstream_metrics.get(endpoint)
+    if metrics is None:
+        metrics = _upstream_metrics.setdefault(endpoint, UpstreamMetrics(endpoint))
+    return metrics
+
+
+def upstream_request_counts() -> dict[str, int]:
+    """
+    上流エンドポイントごとのリクエスト数（ステータスを問わない起動以降の合計）
+    
+    テストで1つのシナリオが上流APIを何回呼んだかを差分で求めるために使います。
+    
+    Returns:
+        エンドポイント名 → リクエスト数
+    """
+    counts: dict[str, int] = {}
+    for (endpoint, _), child in list(UPSTREAM_REQUESTS._children.items()):
+        counts[endpoint] = counts.get(endpoint, 0) + int(child.get())
+    return counts
+
@@ -1,17 +1,142 @@
 """データモデルの定義"""
 
-from dataclasses import dataclass
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, NamedTuple, Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WeatherAlert:
-    """気象警報を表すデータクラス"""
+    """気象警報を表すデータクラス（不変のため複数のデータ間で共有可能）"""
     alert_type: str  # 熱波、寒波、強風、雪、濃霧、大雨、雷
     description: str
     severity: str  # 重要度レベル
 
 
-@dataclass
+class HourlyPoint(NamedTuple):
+    """1時間ごとの予報の1点"""
+    time: int  # UNIX時刻
+    temperature: float  # 摂氏
+    precipitation_probability: float  # パーセンテージ (0-100)
+
+
+class HourlyForecast:
+    """
+    1時間ごとの予報（気温・降水確率）を型付き配列で保持するコンテナ
+    
+    One Call APIの hourly 配列（48時間分）から必要な値だけを取り出して保持します。
+    辞書のリストに比べてメモリ使用量が小さいため、天気データのキャッシュにそのまま保持できます。
+    """
+    
+    __slots__ = ('_times', '_temperatures', '_precipitation')
+    
+    def __init__(
+        self,
+        times: Iterable[int] = (),
+        temperatures: Iterable[float] = (),
+        precipitation_probabilities: Iterable[float] = ()
+    ):
+        """
+        Args:
+            times: 各時刻（UNIX時刻）
+            temperatures: 各時刻の気温（摂氏）
+            precipitation_probabilities: 各時刻の降水確率（パーセンテージ）
+        
+        Raises:
+            ValueError: 配列の長さが揃っていない場合
+        """
+        self._times = array('I', times)
+        self._temperatures = array('f', temperatures)
+        self._precipitation = array('f', precipitation_probabilities)
+        if not len(self._times) == len(self._temperatures) == len(self._precipitation):
+            raise ValueError("時刻・気温・降水確率の件数が一致しません")
+    
+    @classmethod
+    def from_onecall(cls, hourly: Iterable[dict]) -> 'HourlyForecast':
+        """
+        One Call APIの hourly 配列から予報を構築
+        
+        時刻または気温がない要素は読み飛ばします。降水確率がない場合は0とします。
+        
+        Args:
+            hourly: One Call APIのレスポンスの hourly 配列
+        
+        Returns:
+            HourlyForecastオブジェクト
+        """
+        forecast = cls()
+        for entry in hourly:
+            time = entry.get('dt')
+            temperature = entry.get('temp')
+            if time is None or temperature is None:
+                continue
+            forecast._times.append(time)
+            forecast._temperatures.append(temperature)
+            forecast._precipitation.append(entry.get('pop', 0.0) * 100)
+        return forecast
+    
+    @property
+    def times(self) -> array:
+        """時刻の配列（UNIX時刻）"""
+        return self._times
+    
+    @property
+    def temperatures(self) -> array:
+        """気温の配列（摂氏）"""
+        return self._temperatures
+    
+    @property
+    def precipitation_probabilities(self) -> array:
+        """降水確率の配列（パーセンテージ）"""
+        return self._precipitation
+    
+    def head(self, hours: int) -> 'HourlyForecast':
+        """
+        先頭から指定した時間数だけの予報を取得
+        
+        Args:
+            hours: 時間数
+        
+        Returns:
+            新しいHourlyForecast（配列はコピーされる）
+        """
+        forecast = HourlyForecast()
+        forecast._times = self._times[:hours]
+        forecast._temperatures = self._temperatures[:hours]
+        forecast._precipitation = self._precipitation[:hours]
+        return forecast
+    
+    def to_list(self) -> list[dict]:
+        """
+        JSONシリアライズ可能なリストに変換
+        
+        単精度で保持している値は小数点以下2桁に丸めます。
+        
+        Returns:
+            1時間1要素の辞書のリスト
+        """
+        return [
+            {
+                'time': time,
+                'temperature': round(temperature, 2),
+                'precipitation_probability': round(precipitation, 2)
+            }
+            for time, temperature, precipitation in zip(self._times, self._temperatures, self._precipitation)
+        ]
+    
+    def __len__(self) -> int:
+        return len(self._times)
+    
+    def __iter__(self) -> Iterator[HourlyPoint]:
+        for values in zip(self._times, self._temperatures, self._precipitation):
+            yield HourlyPoint(*values)
+    
+    def __repr__(self) -> str:
+        return f"HourlyForecast({len(self)} hours)"
+
+
+@dataclass(slots=True)
 class WeatherData:
     """天気データを表すデータクラス"""
     postal_code: str
@@ -19,3 +144,301 @@ class WeatherData:
     precipitation_probability: float  # パーセンテージ (0-100)
     alerts: list[WeatherAlert]
     location_name: str
+    # 1時間ごとの予報（One Call APIから取得できた場合のみ。to_dict()には含めない）
+    forecast: Optional[HourlyForecast] = field(default=None, compare=False, repr=False)
+    
+    def to_dict(self) -> dict:
+        """
+        JSONシリアライズ可能な辞書に変換
+        
+        Returns:
+            Web APIのレスポンスと同じ形式の辞書
+        """
+        return {
+            'postal_code': self.postal_code,
+            'location_name': self.location_name,
+            'temperature': self.temperature,
+            'precipitation_probability': self.precipitation_probability,
+            'alerts': [
+                {
+                    'alert_type': alert.alert_type,
+                    'description': alert.description,
+                    'severity': alert.severity
+                }
+                for alert in self.alerts
+            ]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'WeatherData':
+        """
+        to_dict()で変換した辞書からWeatherDataを復元
+        
+        Args:
+            data: to_dict()と同じ形式の辞書
+            
+        Returns:
+            WeatherDataオブジェクト
+        """
+        return cls(
+            postal_code=data['postal_code'],
+            temperature=data['temperature'],
+            precipitation_probability=data['precipitation_probability'],
+            alerts=[WeatherAlert(**alert) for alert in data.get('alerts', [])],
+            location_name=data['location_name']
+        )
+
+
+class WeatherBatch:
+    """
+    大量の天気データを列ごとの配列で保持するコンテナ
+    
+    郵便番号・気温・降水確率は型付き配列に、地名は重複を除いた一覧への
+    インデックスとして格納します。警報は警報のあるレコードだけを別に保持します。
+    反復すると各行を参照する軽量なビュー（WeatherRecordView）を返します。
+    """
+    
+    __slots__ = (
+        '_postal_codes',
+        '_temperatures',
+        '_precipitation',
+        '_location_ids',
+        '_locations',
+        '_location_index',
+        '_alerts',
+    )
+    
+    def __init__(self, records: Iterable[WeatherData] = ()):
+        """
+        Args:
+            records: 初期データとして追加する天気データ
+        """
+        self._postal_codes = array('I')  # 7桁の郵便番号を整数として格納
+        self._temperatures = array('d')
+        self._precipitation = array('d')
+        self._location_ids = array('I')
+        self._locations: list[str] = []
+        self._location_index: dict[str, int] = {}
+        self._alerts: dict[int, tuple[WeatherAlert, ...]] = {}
+        self.extend(records)
+    
+    def append(self, weather_data: WeatherData) -> None:
+        """
+        天気データを追加
+        
+        Args:
+            weather_data: 追加する天気データ（郵便番号は7桁の数字であること）
+            
+        Raises:
+            ValueError: 郵便番号が数字でない場合
+        """
+        location_id = self._location_index.get(weather_data.location_name)
+        if location_id is None:
+            location_id = len(self._locations)
+            self._locations.append(weather_data.location_name)
+            self._location_index[weather_data.location_name] = location_id
+        
+        index = len(self._postal_codes)
+        self._postal_codes.append(int(weather_data.postal_code))
+        self._temperatures.append(weather_data.temperature)
+        self._precipitation.append(weather_data.precipitation_probability)
+        self._location_ids.append(location_id)
+        if weather_data.alerts:
+            self._alerts[index] = tuple(weather_data.alerts)
+    
+    def extend(self, records: Iterable[WeatherData]) -> None:
+        """
+        複数の天気データを追加
+        
+        Args:
+            records: 追加する天気データ
+        """
+        for weather_data in records:
+            self.append(weather_data)
+    
+    @property
+    def temperatures(self) -> array:
+        """気温の配列（摂氏）"""
+        return self._temperatures
+    
+    @property
+    def precipitation_probabilities(self) -> array:
+        """降水確率の配列（パーセンテージ）"""
+        return self._precipitation
+    
+    @property
+    def locations(self) -> list[str]:
+        """重複を除いた地名の一覧"""
+        return self._locations
+    
+    def alert_union(self) -> list[WeatherAlert]:
+        """
+        全レコードの警報を重複を除いてまとめる
+        
+        Returns:
+            最初に現れた順の警報のリスト
+        """
+        return list(dict.fromkeys(alert for alerts in self._alerts.values() for alert in alerts))
+    
+    def alerts_at(self, index: int) -> tuple[WeatherAlert, ...]:
+        """
+        指定した行の警報を取得
+        
+        Args:
+            index: 行番号
+            
+        Returns:
+            警報のタプル（警報がなければ空）
+        """
+        return self._alerts.get(index, ())
+    
+    def __len__(self) -> int:
+        return len(self._postal_codes)
+    
+    def __getitem__(self, index: int) -> 'WeatherRecordView':
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("WeatherBatchのインデックスが範囲外です")
+        return WeatherRecordView(self, index)
+    
+    def __iter__(self) -> Iterator['WeatherRecordView']:
+        for index in range(len(self)):
+            yield WeatherRecordView(self, index)
+
+
+class WeatherRecordView:
+    """WeatherBatchの1行を参照する軽量なビュー（WeatherDataと同じ属性を持つ）"""
+    
+    __slots__ = ('_batch', '_index')
+    
+    def __init__(self, batch: WeatherBatch, index: int):
+        """
+        Args:
+            batch: 参照元のバッチ
+            index: 行番号
+        """
+        self._batch = batch
+        self._index = index
+    
+    @property
+    def postal_code(self) -> str:
+        return f"{self._batch._postal_codes[self._index]:07d}"
+    
+    @property
+    def temperature(self) -> float:
+        return self._batch._temperatures[self._index]
+    
+    @property
+    def precipitation_probability(self) -> float:
+        return self._batch._precipitation[self._index]
+    
+    @property
+    def location_name(self) -> str:
+        return self._batch._locations[self._batch._location_ids[self._index]]
+    
+    @property
+    def alerts(self) -> list[WeatherAlert]:
+        return list(self._batch.alerts_at(self._index))
+    
+    def to_weather_data(self) -> WeatherData:
+        """
+        独立したWeatherDataに変換
+        
+        Returns:
+            WeatherDataオブジェクト
+        """
+        return WeatherData(
+            postal_code=self.postal_code,
+            temperature=self.temperature,
+            precipitation_probability=self.precipitation_probability,
+            alerts=self.alerts,
+            location_name=self.location_name
+        )
+    
+    def to_dict(self) -> dict:
+        """
+        JSONシリアライズ可能な辞書に変換
+        
+        Returns:
+            WeatherData.to_dict()と同じ形式の辞書
+        """
+        return self.to_weather_data().to_dict()
+    
+    def __repr__(self) -> str:
+        return f"WeatherRecordView({self._index}, postal_code={self.postal_code!r})"
+
+
+@dataclass(slots=True)
+class AggregateWeather:
+    """郵便番号の前方一致でまとめた地域の天気"""
+    prefix: str
+    postal_codes: int  # 対象の郵便番号の数
+    locations: int  # 天気を取得した地点（座標のセル）の数
+    failed: int  # 取得できなかった郵便番号の数
+    min_temperature: float  # 摂氏
+    max_temperature: float  # 摂氏
+    mean_temperature: float  # 地点ごとの気温の平均（摂氏）
+    max_precipitation_probability: float  # パーセンテージ (0-100)
+    alerts: list[WeatherAlert]
+    
+    @classmethod
+    def from_batch(cls, prefix: str, batch: WeatherBatch, postal_codes: int, failed: int = 0) -> 'AggregateWeather':
+        """
+        地点ごとの天気データから統計を計算
+        
+        Pythonのループでレコードごとに集計せず、型付き配列全体に対する組み込み関数
+        （Cで実装されたmin/max/fsum）で計算します。
+        
+        Args:
+            prefix: 郵便番号の前方一致の条件
+            batch: 地点ごとの天気データ
+            postal_codes: 対象の郵便番号の数
+            failed: 取得できなかった郵便番号の数
+            
+        Returns:
+            AggregateWeatherオブジェクト
+            
+        Raises:
+            ValueError: 天気データが空の場合
+        """
+        if not len(batch):
+            raise ValueError("集計する天気データがありません")
+        temperatures = batch.temperatures
+        return cls(
+            prefix=prefix,
+            postal_codes=postal_codes,
+            locations=len(batch),
+            failed=failed,
+            min_temperature=min(temperatures),
+            max_temperature=max(temperatures),
+            mean_temperature=math.fsum(temperatures) / len(temperatures),
+            max_precipitation_probability=max(batch.precipitation_probabilities),
+            alerts=batch.alert_union()
+        )
+    
+    def to_dict(self) -> dict:
+        """
+        JSONシリアライズ可能な辞書に変換
+        
+        Returns:
+            Web APIのレスポンスと同じ形式の辞書
+        """
+        return {
+            'prefix': self.prefix,
+            'postal_codes': self.postal_codes,
+            'locations': self.locations,
+            'failed': self.failed,
+            'min_temperature': self.min_temperature,
+            'max_temperature': self.max_temperature,
+            'mean_temperature': round(self.mean_temperature, 2),
+            'max_precipitation_probability': self.max_precipitation_probability,
+            'alerts': [
+                {
+                    'alert_type': alert.alert_type,
+                    'description': alert.description,
+                    'severity': alert.severity
+                }
+                for alert in self.alerts
+            ]
+        }
@@ -0,0 +1,252 @@
+"""
+リクエスト単位のオンデマンドプロファイリング
+
+本番環境で1回のリクエスト（またはCLIの1回の実行）だけをcProfile/tracemallocで計測します。
+Webでは PROFILING_ENABLED と PROFILING_SECRET を設定した場合にだけフックを登録し、
+X-Profile ヘッダーにシークレットを指定したリクエストだけを計測します。
+無効な場合はフック自体を登録しないため、通常のリクエストにはコストがかかりません。
+"""
+
+import cProfile
+import hmac
+import io
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+
+
+# シークレットを指定するヘッダーと、計測対象を選ぶヘッダー
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODE_HEADER = 'X-Profile-Mode'
+# 計測結果を書き込んだファイル、または計測できなかった理由を返すヘッダー
+PROFILE_RESULT_HEADER = 'X-Profile-Result'
+
+# 計測対象（cpu: cProfile、memory: tracemalloc、both: 両方）
+PROFILE_MODES = ('cpu', 'memory', 'both')
+
+# サマリーに含める上位の件数
+DEFAULT_TOP = 30
+
+# プロファイルするエンドポイント
+PROFILED_ENDPOINTS = frozenset({'main.get_weather'})
+
+# cProfileとtracemallocはプロセス全体で1つしか動かせないため、同時に計測するのは1件だけ
+_active_lock = threading.Lock()
+
+
+class RequestProfiler:
+    """cProfile/tracemallocで1回の処理を計測する"""
+    
+    def __init__(self, mode: str = 'cpu', top: int = DEFAULT_TOP):
+        """
+        Args:
+            mode: 計測対象（cpu/memory/both）
+            top: サマリーに含める上位の件数
+        
+        Raises:
+            ValueError: 計測対象が不正な場合
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"プロファイルの対象が不正です: {mode}（{', '.join(PROFILE_MODES)}）")
+        self.mode = mode
+        self.top = top
+        self.elapsed = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._started = 0.0
+    
+    @property
+    def cpu(self) -> bool:
+        return self.mode in ('cpu', 'both')
+    
+    @property
+    def memory(self) -> bool:
+        return self.mode in ('memory', 'both')
+    
+    def start(self) -> None:
+        """計測を開始"""
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter()
+    
+    def stop(self) -> None:
+        """計測を終了"""
+        self.elapsed = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+    
+    def __enter__(self) -> 'RequestProfiler':
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+    
+    def cpu_stats(self) -> str:
+        """
+        累積時間順に並べたcProfileの統計
+        
+        Returns:
+            pstatsの出力（CPUを計測していない場合は空文字列）
+        """
+        if self._profile is None:
+            return ''
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        return stream.getvalue()
+    
+    def memory_stats(self) -> str:
+        """
+        計測中に増えたメモリ割り当ての上位
+        
+        Returns:
+            割り当て元ごとの増加量（メモリを計測していない場合は空文字列）
+        """
+        if self._snapshot is None or self._baseline is None:
+            return ''
+        differences = self._snapshot.compare_to(self._baseline, 'lineno')
+        return '\n'.join(str(difference) for difference in differences[:self.top])
+    
+    def summary(self) -> dict:
+        """
+        インラインで返すサマリー
+        
+        Returns:
+            経過時間と、計測した対象ごとの統計を含む辞書
+        """
+        summary = {'mode': self.mode, 'elapsed_ms': round(self.elapsed * 1000, 3)}
+        if self.cpu:
+            summary['cpu'] = self.cpu_stats()
+        if self.memory:
+            summary['memory'] = self.memory_stats()
+        return summary
+    
+    def write(self, directory, label: str) -> list[Path]:
+        """
+        計測結果をファイルに書き込む
+        
+        cProfileはpstats形式（.prof）と並べ替え済みのテキスト（.txt）、
+        tracemallocはスナップショット（.tracemalloc）と増加量のテキストを書き込みます。
+        
+        Args:
+            directory: 書き込み先のディレクトリ（なければ作成）
+            label: ファイル名に含めるラベル
+        
+        Returns:
+            書き込んだファイルのパス
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        safe_label = re.sub(r'[^0-9A-Za-z_.-]+', '_', label).strip('_') or 'profile'
+        stem = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns() % 1_000_000:06d}-{safe_label}"
+        
+        paths = []
+        if self._profile is not None:
+            self._profile.dump_stats(f"{stem}.prof")
+            Path(f"{stem}.cpu.txt").write_text(self.cpu_stats(), encoding='utf-8')
+            paths += [Path(f"{stem}.prof"), Path(f"{stem}.cpu.txt")]
+        if self._snapshot is not None:
+            self._snapshot.dump(f"{stem}.tracemalloc")
+            Path(f"{stem}.memory.txt").write_text(self.memory_stats(), encoding='utf-8')
+            paths += [Path(f"{stem}.tracemalloc"), Path(f"{stem}.memory.txt")]
+        return paths
+
+
+def init_app(app) -> bool:
+    """
+    プロファイリングのフックを登録
+    
+    PROFILING_ENABLED が真で PROFILING_SECRET が設定されている場合だけ登録します。
+    
+    Args:
+        app: Flaskアプリケーション
+    
+    Returns:
+        フックを登録した場合はTrue
+    """
+    secret = app.config.get('PROFILING_SECRET') or ''
+    if not app.config.get('PROFILING_ENABLED') or not secret:
+        return False
+    
+    # CLIの起動を遅くしないよう、Flaskはここでインポートする
+    from flask import g, request
+    
+    @app.before_request
+    def start_profiling():
+        provided = request.headers.get(PROFILE_HEADER)
+        if provided is None or request.endpoint not in PROFILED_ENDPOINTS:
+            return None
+        if not hmac.compare_digest(provided.encode('utf-8'), secret.encode('utf-8')):
+            return None
+        
+        mode = request.headers.get(PROFILE_MODE_HEADER, 'cpu').lower()
+        if mode not in PROFILE_MODES:
+            g.profile_result = f'invalid mode: {mode}'
+            return None
+        if not _active_lock.acquire(blocking=False):
+            g.profile_result = 'busy'
+            return None
+        
+        profiler = RequestProfiler(mode, top=app.config.get('PROFILING_TOP', DEFAULT_TOP))
+        try:
+            profiler.start()
+        except Exception:
+            _active_lock.release()
+            raise
+        g.profiler = profiler
+        return None
+    
+    @app.after_request
+    def finish_profiling(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            result = g.pop('profile_result', None)
+            if result is not None:
+                response.headers[PROFILE_RESULT_HEADER] = result
+            return response
+        
+        try:
+            profiler.stop()
+        finally:
+            _active_lock.release()
+        
+        directory = app.config.get('PROFILING_DIR')
+        if directory:
+            paths = profiler.write(directory, request.path)
+            response.headers[PROFILE_RESULT_HEADER] = ', '.join(path.name for path in paths)
+        elif response.is_json and response.content_encoding is None:
+            # ディレクトリが設定されていなければ、JSONレスポンスにサマリーを含める（圧縮済みの場合を除く）
+            body = response.get_json()
+            body['profile'] = profiler.summary()
+            response.set_data(app.json.dumps(body))
+            response.headers[PROFILE_RESULT_HEADER] = 'inline'
+        return response
+    
+    @app.teardown_request
+    def abandon_profiling(exc):
+        # after_requestが呼ばれずに終了した場合も計測を止める
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            try:
+                profiler.stop()
+            finally:
+                _active_lock.release()
+    
+    return True
@@ -1,5 +1,7 @@
 """ルート定義"""
 
 from .main import bp as main_bp
+from .metrics import bp as metrics_bp
+from .debug import bp as debug_bp
 
-__all__ = ['main_bp']
+__all__ = ['main_bp', 'metrics_bp', 'debug_bp']
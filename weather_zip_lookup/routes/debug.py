@@ -0,0 +1,44 @@
+"""デバッグルート - フライトレコーダーの内容を公開"""
+
+import hmac
+
+from flask import Blueprint, abort, current_app, jsonify, request
+
+bp = Blueprint('debug', __name__, url_prefix='/debug')
+
+# トークンを指定するヘッダー
+DEBUG_TOKEN_HEADER = 'X-Debug-Token'
+
+# トークンが設定されていない場合に許可する接続元
+_LOOPBACK_ADDRESSES = frozenset({'127.0.0.1', '::1'})
+
+
+def require_debug_access() -> None:
+    """
+    DEBUG_TOKENが設定されていればトークンを、なければローカルホストからの接続を要求する
+    
+    Raises:
+        Forbidden: 許可されていない場合（403）
+    """
+    token = current_app.config.get('DEBUG_TOKEN')
+    if token:
+        provided = request.headers.get(DEBUG_TOKEN_HEADER, '')
+        if not hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8')):
+            abort(403)
+    elif request.remote_addr not in _LOOPBACK_ADDRESSES:
+        abort(403)
+
+
+@bp.route('/flight-recorder', methods=['GET'])
+def flight_recorder():
+    """直近の取得処理と遅かった取得処理の記録を返すエンドポイント"""
+    require_debug_access()
+    return jsonify(current_app.extensions['flight_recorder'].snapshot())
+
+
+@bp.route('/flight-recorder', methods=['DELETE'])
+def clear_flight_recorder():
+    """フライトレコーダーの記録を削除するエンドポイント"""
+    require_debug_access()
+    current_app.extensions['flight_recorder'].clear()
+    return '', 204
@@ -1,7 +1,27 @@
 """メインルート - Webアプリケーションのエンドポイント"""
 
-from flask import Blueprint, render_template, request, jsonify, current_app
-from weather_zip_lookup.services import WeatherService
+import gzip
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from flask import Blueprint, Response, render_template, request, jsonify, current_app, g
+from weather_zip_lookup.metrics import (
+    AGGREGATE_REQUEST_METRICS,
+    FORECAST_REQUEST_METRICS,
+    WEATHER_REQUEST_METRICS,
+    RequestMetrics,
+)
+from weather_zip_lookup.models import WeatherData
+from weather_zip_lookup.services import (
+    WeatherService,
+    Timings,
+    TTLCache,
+    PostalIndex,
+    PostalBitset,
+    create_component_cache,
+)
+from weather_zip_lookup.services.weather_service import COMPONENTS
 from weather_zip_lookup.exceptions import (
     InvalidPostalCodeError,
     APIError,
@@ -11,6 +31,212 @@ from weather_zip_lookup.exceptions import (
 
 bp = Blueprint('main', __name__)
 
+# 天気データのキャッシュの最大件数
+WEATHER_CACHE_SIZE = 10000
+
+# 見つからなかった郵便番号のキャッシュの最大件数
+NEGATIVE_CACHE_SIZE = 10000
+
+# エンコード済みの /api/weather のレスポンスのキャッシュの最大件数と、gzipの圧縮レベル
+RESPONSE_CACHE_SIZE = 10000
+GZIP_COMPRESS_LEVEL = 6
+
+# エンコード済みのレスポンスのヘッダー（リクエストのたびにヘッダーを組み立てない）
+_VARY_HEADERS = (('Vary', 'Accept-Encoding'),)
+_GZIP_HEADERS = (('Vary', 'Accept-Encoding'), ('Content-Encoding', 'gzip'))
+
+# 予報で返す最大時間数（One Call APIのhourly配列の長さ）
+MAX_FORECAST_HOURS = 48
+
+# 郵便番号の前方一致検索で受け付ける桁数と、返す件数
+MIN_PREFIX_DIGITS = 3
+MAX_PREFIX_DIGITS = 6
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# 郵便番号データの読み込みを1回にするためのロック
+_postal_index_lock = threading.Lock()
+
+# 共有するWeatherServiceとキャッシュの作成を1回にするためのロック
+_weather_service_lock = threading.Lock()
+
+
+def get_weather_service() -> WeatherService:
+    """
+    アプリケーションで共有するWeatherServiceを取得
+    
+    接続プール・ジオコーディングのキャッシュ・天気データのキャッシュをリクエスト間で再利用します。
+    天気データのキャッシュは /api/forecast が上流APIを呼ばずに予報を返すためにも使います。
+    見つからなかった郵便番号も NEGATIVE_CACHE_TTL の間は覚えておき、上流APIに問い合わせません。
+    VALIDATE_POSTAL_CODES が有効な場合は、郵便番号データから作ったビットセットで存在しない郵便番号を拒否します。
+    天気データのキャッシュが有効な場合は、エンコード済みのレスポンスのキャッシュも一緒に作り直します。
+    PRECIPITATION_CACHE_TTL / ALERTS_CACHE_TTL が WEATHER_CACHE_TTL と異なる場合は、気温・降水確率・警報を
+    別々の有効期限でキャッシュし、期限切れの構成要素を返す上流APIだけを呼びます。
+    APIキーやベースURLが変更された場合（設定ファイルの監視など）は作り直し、それまでのサービスを閉じます。
+    
+    Returns:
+        WeatherService
+        
+    Raises:
+        MissingAPIKeyError: APIキーが設定されていない場合
+    """
+    key = (current_app.config.get('OPENWEATHER_API_KEY'), current_app.config.get('OPENWEATHER_BASE_URL'))
+    entry = current_app.extensions.get('weather_service')
+    if entry is None or entry[0] != key:
+        with _weather_service_lock:
+            entry = current_app.extensions.get('weather_service')
+            if entry is None or entry[0] != key:
+                api_key, base_url = key
+                ttl = current_app.config.get('WEATHER_CACHE_TTL') or 0
+                component_cache = None
+                if ttl > 0:
+                    component_cache, ttl = create_component_cache(
+                        ttl,
+                        precipitation_ttl=current_app.config.get('PRECIPITATION_CACHE_TTL'),
+                        alerts_ttl=current_app.config.get('ALERTS_CACHE_TTL'),
+                        maxsize=WEATHER_CACHE_SIZE * len(COMPONENTS)
+                    )
+                weather_cache = TTLCache(maxsize=WEATHER_CACHE_SIZE, ttl=ttl) if ttl > 0 else None
+                negative_ttl = current_app.config.get('NEGATIVE_CACHE_TTL') or 0
+                negative_cache = TTLCache(maxsize=NEGATIVE_CACHE_SIZE, ttl=negative_ttl) if negative_ttl > 0 else None
+                entry = (key, WeatherService(
+                    api_key,
+                    weather_cache=weather_cache,
+                    base_url=base_url,
+                    nearby_distance_km=current_app.config.get('NEARBY_DISTANCE_KM'),
+                    postal_bitset=get_postal_bitset(),
+                    negative_cache=negative_cache,
+                    component_cache=component_cache
+                ))
+                # エンコード済みのレスポンスは天気データのキャッシュのエントリと組にして使う
+                current_app.extensions['weather_cache'] = weather_cache
+                current_app.extensions['response_cache'] = (
+                    TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=ttl) if weather_cache is not None else None
+                )
+                previous = current_app.extensions.get('weather_service')
+                current_app.extensions['weather_service'] = entry
+                if previous is not None:
+                    # 差し替えたサービスの接続プールとバックグラウンドのスレッドを解放する
+                    previous[1].close()
+    return entry[1]
+
+
+class EncodedWeather(NamedTuple):
+    """エンコード済みの /api/weather のレスポンス"""
+    stored_at: float  # エンコード元の天気データを天気データのキャッシュに保存した時刻
+    body: bytes
+    gzipped: Optional[bytes] = None  # gzip圧縮した本文（gzipを受け付けるクライアントに初めて返す時に作成）
+    compressible: bool = True  # 圧縮しても小さくならない場合はFalse
+
+
+def encode_weather_response(weather_data: WeatherData) -> bytes:
+    """
+    /api/weather のレスポンスの本文をJSONにエンコード
+    
+    Args:
+        weather_data: 天気データ
+        
+    Returns:
+        レスポンスの本文
+    """
+    return current_app.json.response({'success': True, 'data': weather_data.to_dict()}).get_data()
+
+
+def weather_response(postal_code: str, weather_data: WeatherData, timings: Timings) -> Response:
+    """
+    天気データのレスポンスを、エンコード済みのキャッシュがあればそのまま返す
+    
+    エンコード済みのレスポンスは、天気データのキャッシュのエントリの保存時刻と組にして保持し、
+    同じエントリの間は再シリアライズせずにバイト列を書き込みます。gzipの圧縮版は、gzipを受け付ける
+    クライアントに初めて返す時に作成します。レスポンスのキャッシュが無効な場合や、天気データが
+    キャッシュにない場合（近くの観測値で答えた場合など）は、これまで通り毎回jsonifyします。
+    
+    Args:
+        postal_code: 郵便番号
+        weather_data: 天気データ
+        timings: 所要時間の記録先（serializeのcacheにヒット/ミスを記録）
+        
+    Returns:
+        Response
+    """
+    with timings.span('serialize') as span:
+        app = current_app._get_current_object()
+        cache = app.extensions.get('response_cache')
+        # get_weather_service でレスポンスのキャッシュと同時に作成した天気データのキャッシュ
+        stored = app.extensions['weather_cache'].entry(postal_code) if cache is not None else None
+        if stored is None:
+            return jsonify({'success': True, 'data': weather_data.to_dict()})
+        
+        stored_at, cached_weather = stored
+        encoded = cache.get(postal_code)
+        if encoded is not None and encoded.stored_at == stored_at:
+            span.cache = 'hit'
+        elif cached_weather == weather_data:
+            span.cache = 'miss'
+            encoded = EncodedWeather(stored_at, encode_weather_response(weather_data))
+            cache.set(postal_code, encoded)
+        else:
+            # 取得した後に天気データのキャッシュが更新された場合は、どちらの天気データか区別できないため保持しない
+            return jsonify({'success': True, 'data': weather_data.to_dict()})
+        
+        if encoded.compressible and request.accept_encodings['gzip']:
+            if encoded.gzipped is None:
+                gzipped = gzip.compress(encoded.body, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+                if len(gzipped) < len(encoded.body):
+                    encoded = encoded._replace(gzipped=gzipped)
+                else:
+                    encoded = encoded._replace(compressible=False)
+                cache.set(postal_code, encoded)
+            if encoded.gzipped is not None:
+                return app.response_class(encoded.gzipped, mimetype=app.json.mimetype, headers=_GZIP_HEADERS)
+        return app.response_class(encoded.body, mimetype=app.json.mimetype, headers=_VARY_HEADERS)
+
+
+def get_postal_bitset() -> Optional[PostalBitset]:
+    """
+    存在しない郵便番号を拒否するためのビットセットを取得
+    
+    POSTAL_DATASET の隣に保存したビットセットをメモリマップで開きます（なければ構築して保存）。
+    郵便番号データを読み込めない、または解析できない場合（文字コードの誤りなど）は警告を記録し、
+    存在の確認をせずに続行します。
+    
+    Returns:
+        PostalBitset、VALIDATE_POSTAL_CODES が無効または郵便番号データが設定されていない場合はNone
+    """
+    path = current_app.config.get('POSTAL_DATASET')
+    if not path or not current_app.config.get('VALIDATE_POSTAL_CODES'):
+        return None
+    try:
+        return PostalBitset.for_dataset(path)
+    except (OSError, ValueError) as e:  # ValueErrorはUnicodeDecodeErrorを含む
+        current_app.logger.warning('郵便番号データを読み込めないため、郵便番号の存在を確認しません: %s', e)
+        return None
+
+
+def get_postal_index() -> Optional[PostalIndex]:
+    """
+    アプリケーションで共有する郵便番号のインデックスを取得
+    
+    初回の呼び出しで POSTAL_DATASET のCSVを読み込み、以降はメモリ上のインデックスを使います。
+    
+    Returns:
+        PostalIndex、郵便番号データが設定されていない場合はNone
+        
+    Raises:
+        OSError: 郵便番号データを読み込めない場合
+    """
+    path = current_app.config.get('POSTAL_DATASET')
+    if not path:
+        return None
+    entry = current_app.extensions.get('postal_index')
+    if entry is None or entry[0] != path:
+        with _postal_index_lock:
+            entry = current_app.extensions.get('postal_index')
+            if entry is None or entry[0] != path:
+                entry = (path, PostalIndex.from_csv(path))
+                current_app.extensions['postal_index'] = entry
+    return entry[1]
+
 
 @bp.route('/')
 def index():
@@ -19,9 +245,59 @@ def index():
     return render_template('index.html', default_postal_code=default_postal_code)
 
 
+@bp.after_request
+def finish_weather_request(response):
+    """ステージごとの所要時間をServer-Timingヘッダーとして返し、リクエストのメトリクスとフライトレコーダーに記録する"""
+    timings = g.pop('timings', None)
+    if timings is not None and timings.spans:
+        response.headers['Server-Timing'] = timings.to_server_timing()
+    
+    started = g.pop('request_started', None)
+    metrics = g.get('request_metrics')
+    if started is not None and metrics is not None:
+        duration = time.perf_counter() - started
+        metrics.duration.observe(duration)
+        metrics.requests(response.status_code).inc()
+        
+        postal_code = g.pop('postal_code', None)
+        recorder = current_app.extensions.get('flight_recorder')
+        if postal_code is not None and recorder is not None and timings is not None:
+            recorder.record(postal_code, timings, response.status_code, duration=duration)
+    return response
+
+
+@bp.teardown_request
+def release_in_flight(exc):
+    """例外で終了した場合も処理中のリクエスト数を戻す"""
+    metrics = g.pop('request_metrics', None)
+    if metrics is not None:
+        metrics.in_flight.dec()
+
+
+def start_request(metrics: RequestMetrics) -> Timings:
+    """
+    APIエンドポイントの処理の開始を記録
+    
+    終了時に finish_weather_request が処理時間とステータスを、release_in_flight が
+    処理中のリクエスト数を、指定したエンドポイントのメトリクスに記録します。
+    
+    Args:
+        metrics: エンドポイントのメトリクス
+        
+    Returns:
+        ステージごとの所要時間の記録先（Server-Timingヘッダーとフライトレコーダーに使う）
+    """
+    g.request_started = time.perf_counter()
+    g.request_metrics = metrics
+    metrics.in_flight.inc()
+    g.timings = timings = Timings()
+    return timings
+
+
 @bp.route('/api/weather', methods=['POST'])
 def get_weather():
     """天気情報を取得するAPIエンドポイント"""
+    timings = start_request(WEATHER_REQUEST_METRICS)
     try:
         # 郵便番号を取得
         postal_code = request.json.get('postal_code', '').strip()
@@ -33,6 +309,8 @@ def get_weather():
                     'error': '郵便番号が指定されていません'
                 }), 400
         
+        g.postal_code = postal_code
+        
         # APIキーを取得
         api_key = current_app.config.get('OPENWEATHER_API_KEY')
         if not api_key:
@@ -41,31 +319,146 @@ def get_weather():
             }), 500
         
         # 天気データを取得
-        weather_service = WeatherService(api_key)
-        weather_data = weather_service.get_weather_by_postal_code(postal_code)
+        weather_service = get_weather_service()
+        weather_data = weather_service.get_weather_by_postal_code(postal_code, timings=timings)
+        
+        # レスポンスを構築（エンコード済みのキャッシュがあれば再利用）
+        return weather_response(postal_code, weather_data, timings)
+        
+    except InvalidPostalCodeError as e:
+        return jsonify({'error': str(e)}), 400
+    except (APIError, NetworkError, MissingAPIKeyError) as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': f'予期しないエラーが発生しました: {str(e)}'}), 500
+
+
+@bp.route('/api/forecast', methods=['POST'])
+def get_forecast():
+    """1時間ごとの予報を取得するAPIエンドポイント（天気データと同じキャッシュから返す）"""
+    timings = start_request(FORECAST_REQUEST_METRICS)
+    try:
+        # 郵便番号を取得
+        postal_code = request.json.get('postal_code', '').strip()
+        
+        if not postal_code:
+            postal_code = current_app.config.get('DEFAULT_POSTAL_CODE')
+            if not postal_code:
+                return jsonify({
+                    'error': '郵便番号が指定されていません'
+                }), 400
+        
+        # 時間数を取得
+        hours = request.json.get('hours', MAX_FORECAST_HOURS)
+        if isinstance(hours, bool) or not isinstance(hours, int) or not 1 <= hours <= MAX_FORECAST_HOURS:
+            return jsonify({
+                'error': f'時間数は1から{MAX_FORECAST_HOURS}の整数で指定してください'
+            }), 400
+        
+        g.postal_code = postal_code
+        
+        # APIキーを取得
+        api_key = current_app.config.get('OPENWEATHER_API_KEY')
+        if not api_key:
+            return jsonify({
+                'error': 'APIキーが設定されていません'
+            }), 500
+        
+        # 天気データ（予報を含む）を取得
+        weather_service = get_weather_service()
+        weather_data = weather_service.get_weather_by_postal_code(postal_code, timings=timings)
+        forecast = weather_data.forecast
         
         # レスポンスを構築
+        with timings.span('serialize'):
+            return jsonify({
+                'success': True,
+                'data': {
+                    'postal_code': weather_data.postal_code,
+                    'location_name': weather_data.location_name,
+                    'hourly': forecast.head(hours).to_list() if forecast is not None else []
+                }
+            })
+    
+    except InvalidPostalCodeError as e:
+        return jsonify({'error': str(e)}), 400
+    except (APIError, NetworkError, MissingAPIKeyError) as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': f'予期しないエラーが発生しました: {str(e)}'}), 500
+
+
+@bp.route('/api/postal-codes', methods=['GET'])
+def autocomplete_postal_codes():
+    """郵便番号の先頭の数字から、一致する郵便番号と地名を返すAPIエンドポイント"""
+    prefix = request.args.get('prefix', '').strip().replace('-', '')
+    if not (MIN_PREFIX_DIGITS <= len(prefix) <= MAX_PREFIX_DIGITS and prefix.isascii() and prefix.isdigit()):
+        return jsonify({
+            'error': f'郵便番号の先頭{MIN_PREFIX_DIGITS}〜{MAX_PREFIX_DIGITS}桁を数字で指定してください'
+        }), 400
+    
+    limit = request.args.get('limit', DEFAULT_AUTOCOMPLETE_LIMIT, type=int)
+    if not 1 <= limit <= MAX_AUTOCOMPLETE_LIMIT:
         return jsonify({
-            'success': True,
-            'data': {
-                'postal_code': weather_data.postal_code,
-                'location_name': weather_data.location_name,
-                'temperature': weather_data.temperature,
-                'precipitation_probability': weather_data.precipitation_probability,
-                'alerts': [
-                    {
-                        'alert_type': alert.alert_type,
-                        'description': alert.description,
-                        'severity': alert.severity
-                    }
-                    for alert in weather_data.alerts
-                ]
-            }
-        })
+            'error': f'件数は1から{MAX_AUTOCOMPLETE_LIMIT}の整数で指定してください'
+        }), 400
+    
+    try:
+        postal_index = get_postal_index()
+    except OSError as e:
+        return jsonify({'error': f'郵便番号データを読み込めません: {e}'}), 500
+    if postal_index is None:
+        return jsonify({'error': '郵便番号データが設定されていません'}), 404
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'prefix': prefix,
+            'total': postal_index.count(prefix),
+            'results': [
+                {'postal_code': postal_code, 'location_name': location_name}
+                for postal_code, location_name in postal_index.search(prefix, limit)
+            ]
+        }
+    })
+
+
+@bp.route('/api/aggregate', methods=['POST'])
+def get_aggregate_weather():
+    """郵便番号の先頭の数字でまとめた地域の天気（気温の最小・最大・平均、最大降水確率、警報）を返すAPIエンドポイント"""
+    timings = start_request(AGGREGATE_REQUEST_METRICS)
+    try:
+        prefix = str(request.json.get('prefix', '')).strip().replace('-', '')
+        if not (MIN_PREFIX_DIGITS <= len(prefix) <= MAX_PREFIX_DIGITS and prefix.isascii() and prefix.isdigit()):
+            return jsonify({
+                'error': f'郵便番号の先頭{MIN_PREFIX_DIGITS}〜{MAX_PREFIX_DIGITS}桁を数字で指定してください'
+            }), 400
+        
+        postal_index = get_postal_index()
+        if postal_index is None:
+            return jsonify({'error': '郵便番号データが設定されていません'}), 404
+        
+        # APIキーを取得
+        api_key = current_app.config.get('OPENWEATHER_API_KEY')
+        if not api_key:
+            return jsonify({
+                'error': 'APIキーが設定されていません'
+            }), 500
+        
+        weather_service = get_weather_service()
+        aggregate = weather_service.get_weather_by_prefix(prefix, postal_index, timings=timings)
+        
+        with timings.span('serialize'):
+            return jsonify({
+                'success': True,
+                'data': aggregate.to_dict()
+            })
         
     except InvalidPostalCodeError as e:
         return jsonify({'error': str(e)}), 400
     except (APIError, NetworkError, MissingAPIKeyError) as e:
         return jsonify({'error': str(e)}), 500
+    except OSError as e:
+        return jsonify({'error': f'郵便番号データを読み込めません: {e}'}), 500
     except Exception as e:
         return jsonify({'error': f'予期しないエラーが発生しました: {str(e)}'}), 500
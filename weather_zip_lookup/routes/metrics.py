@@ -0,0 +1,26 @@
+"""メトリクスルート - Prometheus形式のメトリクスを公開"""
+
+from flask import Blueprint, Response, current_app
+
+from weather_zip_lookup.metrics import CONTENT_TYPE, REGISTRY, render_cache_metrics
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus形式のメトリクスを返すエンドポイント"""
+    caches = {}
+    entry = current_app.extensions.get('weather_service')
+    if entry is not None:
+        weather_service = entry[1]
+        caches = {
+            'geocode': weather_service.geocode_cache,
+            'weather': weather_service.weather_cache,
+            'negative': weather_service.negative_cache,
+            'component': weather_service.component_cache,
+            'response': current_app.extensions.get('response_cache'),
+        }
+    
+    body = REGISTRY.render() + render_cache_metrics(caches)
+    return Response(body, content_type=CONTENT_TYPE)
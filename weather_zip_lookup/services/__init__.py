@@ -1,6 +1,30 @@
 """サービス層 - ビジネスロジックを含む"""
 
-from .weather_service import WeatherService
-from .formatter import OutputFormatter
+from .weather_service import WeatherService, create_component_cache
+from .formatter import OutputFormatter, IncrementalRenderer
+from .cache import ComponentTTLCache, TTLCache
+from .disk_cache import DiskCache
+from .rate_limiter import RateLimiter
+from .timing import Timings, TimingSpan
+from .flight_recorder import FlightRecorder, FlightRecord
+from .spatial_index import SpatialIndex
+from .postal_index import PostalIndex
+from .postal_bitset import PostalBitset
 
-__all__ = ['WeatherService', 'OutputFormatter']
+__all__ = [
+    'WeatherService',
+    'create_component_cache',
+    'OutputFormatter',
+    'IncrementalRenderer',
+    'TTLCache',
+    'ComponentTTLCache',
+    'DiskCache',
+    'RateLimiter',
+    'Timings',
+    'TimingSpan',
+    'FlightRecorder',
+    'FlightRecord',
+    'SpatialIndex',
+    'PostalIndex',
+    'PostalBitset',
+]
@@ -0,0 +1,112 @@
+"""警報イベント名のマッチング"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+
+class AlertTypeMatcher:
+    """
+    警報イベント名を日本語の警報タイプに変換するマッチャー
+    
+    マッピングのキーからAho-Corasickオートマトンを構築し、イベント名を
+    1回走査するだけで部分一致するキーを見つけます。複数のキーが一致する
+    場合は、マッピングで先に定義されたキーを優先します（線形探索と同じ結果）。
+    結果はイベント名ごとにサイズ上限付きでメモ化されます。
+    """
+    
+    # 一致しなかったことを表す優先順位
+    _NO_MATCH = float('inf')
+    
+    def __init__(self, mapping: dict[str, str], cache_size: int = 1024):
+        """
+        Args:
+            mapping: 部分一致させるキー（小文字）→ 警報タイプ の辞書（定義順が優先順位）
+            cache_size: メモ化するイベント名の最大数
+        """
+        self.mapping = mapping
+        self._values = list(mapping.values())
+        self._goto, self._fail, self._best = self._build(list(mapping))
+        self.map_event = lru_cache(maxsize=cache_size)(self._map_event)
+    
+    @classmethod
+    def _build(cls, keys: list[str]) -> tuple[list[dict], list[int], list[float]]:
+        """
+        Aho-Corasickオートマトンを構築
+        
+        Args:
+            keys: 優先順位順のキー
+            
+        Returns:
+            (遷移表, 失敗リンク, 各状態で一致する最も優先度の高いキーの番号) のタプル
+        """
+        goto: list[dict] = [{}]
+        best: list[float] = [cls._NO_MATCH]
+        
+        for priority, key in enumerate(keys):
+            node = 0
+            for char in key:
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    best.append(cls._NO_MATCH)
+                node = next_node
+            best[node] = min(best[node], priority)
+        
+        # 幅優先で失敗リンクを張り、接尾辞で一致するキーの優先順位も伝播させる
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fallback = goto[state].get(char, 0)
+                fail[child] = fallback if fallback != child else 0
+                best[child] = min(best[child], best[fail[child]])
+        
+        return goto, fail, best
+    
+    def match(self, event: str) -> Optional[str]:
+        """
+        イベント名に部分一致する警報タイプを取得（メモ化なし）
+        
+        Args:
+            event: 警報イベント名（英語、小文字）
+            
+        Returns:
+            日本語の警報タイプ、一致しない場合はNone
+        """
+        goto, fail, best = self._goto, self._fail, self._best
+        node = 0
+        result = best[0]
+        
+        for char in event:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if best[node] < result:
+                result = best[node]
+                if result == 0:
+                    break  # 最優先のキーが見つかった
+        
+        if result == self._NO_MATCH:
+            return None
+        return self._values[result]
+    
+    def _map_event(self, event: str) -> str:
+        """
+        イベント名を警報タイプに変換（一致しない場合はタイトルケース）
+        
+        Args:
+            event: 警報イベント名（英語、小文字）
+            
+        Returns:
+            日本語の警報タイプ、またはタイトルケースにしたイベント名
+        """
+        alert_type = self.match(event)
+        return alert_type if alert_type is not None else event.title()
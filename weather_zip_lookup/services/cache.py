@@ -0,0 +1,194 @@
+"""インメモリキャッシュの実装"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """有効期限と最大件数を持つスレッドセーフなLRUキャッシュ"""
+    
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[Hashable], None]] = None
+    ):
+        """
+        Args:
+            maxsize: 保持する最大件数（超えた場合は最も古く使われたものから破棄）
+            ttl: エントリの有効期限（秒）
+            clock: 現在時刻を返す関数（テスト用に差し替え可能）
+            on_evict: 期限切れまたは最大件数の超過でエントリを破棄した時にキーを渡して呼ぶ関数
+                （キャッシュのロックの外で呼ぶ。後から設定することもできる）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # key -> (保存時刻, 値)
+        
+        # 統計情報
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable, default: Any = None, max_age: Optional[float] = None) -> Any:
+        """
+        キャッシュから値を取得
+        
+        Args:
+            key: キー
+            default: 見つからない場合に返す値
+            max_age: TTLの代わりに使う最大経過秒数
+            
+        Returns:
+            キャッシュされた値、期限切れまたは存在しない場合はdefault
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            stored_at, value = entry
+            age = now - stored_at
+            if max_age is None and age >= self.ttl:
+                del self._entries[key]
+                self.misses += 1
+            elif max_age is not None and age > max_age:
+                self.misses += 1
+                return default
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        
+        # 期限切れで破棄した
+        if self.on_evict is not None:
+            self.on_evict(key)
+        return default
+    
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """
+        キャッシュに値を保存
+        
+        Args:
+            key: キー
+            value: 保存する値
+            age: 保存時点での経過秒数（別のキャッシュから取得した値を、元の取得時刻のまま保存する場合に指定）
+        """
+        now = self._clock() - age
+        evicted = []
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+        if evicted and self.on_evict is not None:
+            for evicted_key in evicted:
+                self.on_evict(evicted_key)
+    
+    def entry(self, key: Hashable) -> Optional[tuple[float, Any]]:
+        """
+        エントリの保存時刻と値（期限切れも含む。ヒット/ミスの統計には数えない）
+        
+        Args:
+            key: キー
+            
+        Returns:
+            (保存時刻, 値)、存在しない場合はNone
+        """
+        with self._lock:
+            return self._entries.get(key)
+    
+    def age(self, key: Hashable) -> Optional[float]:
+        """
+        エントリを保存してからの経過秒数（ヒット/ミスの統計には数えない）
+        
+        Args:
+            key: キー
+            
+        Returns:
+            経過秒数、存在しない場合はNone
+        """
+        now = self._clock()
+        entry = self.entry(key)
+        return None if entry is None else now - entry[0]
+    
+    def delete(self, key: Hashable) -> None:
+        """
+        キャッシュからエントリを削除
+        
+        Args:
+            key: キー
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """すべてのエントリを削除"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ComponentTTLCache(TTLCache):
+    """
+    構成要素ごとに有効期限が異なるTTLCache
+    
+    キーと構成要素の組でエントリを保持し、取得時は構成要素の有効期限を使います。
+    変化の速さが違う値（気温と警報など）を、遅いほうに合わせて取得し直さずに済ませるために使います。
+    """
+    
+    def __init__(
+        self,
+        ttls: dict[str, float],
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            ttls: 構成要素ごとの有効期限（秒）
+            maxsize: 保持する最大件数（構成要素ごとに1件と数える）
+            clock: 現在時刻を返す関数（テスト用に差し替え可能）
+        
+        Raises:
+            ValueError: 有効期限が指定されていない場合
+        """
+        if not ttls:
+            raise ValueError("構成要素の有効期限を1つ以上指定してください")
+        super().__init__(maxsize=maxsize, ttl=max(ttls.values()), clock=clock)
+        self.ttls = dict(ttls)
+    
+    def get_component(self, key: Hashable, component: str, default: Any = None) -> Any:
+        """
+        構成要素の値を取得
+        
+        Args:
+            key: キー
+            component: 構成要素の名前
+            default: 見つからない・期限切れの場合に返す値
+        
+        Returns:
+            キャッシュされた値、構成要素の有効期限を過ぎているか存在しない場合はdefault
+        """
+        return self.get((key, component), default, max_age=self.ttls[component])
+    
+    def set_component(self, key: Hashable, component: str, value: Any) -> None:
+        """
+        構成要素の値を保存
+        
+        Args:
+            key: キー
+            component: 構成要素の名前
+            value: 保存する値
+        """
+        self.set((key, component), value)
@@ -0,0 +1,188 @@
+"""SQLiteを使った永続キャッシュの実装"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
+
+
+class DiskCache:
+    """
+    プロセスをまたいで保持される永続キャッシュ
+    
+    TTLCacheと同じインターフェースを持ち、WeatherServiceのキャッシュとして
+    そのまま差し替えられます。値はJSONとして保存するため、encode/decode で
+    JSONシリアライズ可能な形式との変換を指定します。
+    """
+    
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " namespace TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " stored_at REAL NOT NULL,"
+        " value TEXT NOT NULL,"
+        " PRIMARY KEY (namespace, key))"
+    )
+    
+    def __init__(
+        self,
+        path: Path,
+        namespace: str,
+        ttl: float,
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value,
+        retention: Optional[float] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: SQLiteデータベースファイルのパス
+            namespace: キャッシュの種類を区別する名前（同じファイルを共有可能）
+            ttl: エントリの有効期限（秒）
+            encode: 保存前に値をJSONシリアライズ可能な形式に変換する関数
+            decode: 読み込んだ値を元の形式に戻す関数
+            retention: 期限切れのエントリを保持する秒数（オフライン利用向け）。
+                指定した場合、開く時にこれより古いエントリを削除します
+            clock: 現在時刻（UNIX時間）を返す関数
+        
+        Raises:
+            sqlite3.Error: データベースを開けない場合
+        """
+        self.path = Path(path)
+        self.namespace = namespace
+        self.ttl = ttl
+        self._encode = encode
+        self._decode = decode
+        self._clock = clock
+        self._lock = threading.Lock()
+        
+        # 統計情報
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path),
+            timeout=5,
+            isolation_level=None,  # 自動コミット
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self._SCHEMA)
+        
+        if retention is not None:
+            self.prune(retention)
+    
+    def get(self, key: Hashable, default: Any = None, max_age: Optional[float] = None) -> Any:
+        """
+        キャッシュから値を取得
+        
+        Args:
+            key: キー
+            default: 見つからない場合に返す値
+            max_age: TTLの代わりに使う最大経過秒数（オフライン時は期限切れも許容できる）
+            
+        Returns:
+            キャッシュされた値、期限切れまたは存在しない場合はdefault
+        """
+        limit = self.ttl if max_age is None else max_age
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT stored_at, value FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, str(key))
+                ).fetchone()
+        except sqlite3.Error:
+            row = None
+        
+        if row is None or self._clock() - row[0] > limit:
+            self.misses += 1
+            return default
+        
+        try:
+            value = self._decode(json.loads(row[1]))
+        except (ValueError, KeyError, TypeError):
+            self.misses += 1
+            return default
+        
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """
+        キャッシュに値を保存（書き込みに失敗しても例外は送出しない）
+        
+        Args:
+            key: キー
+            value: 保存する値
+            age: 保存時点での経過秒数（別のキャッシュから取得した値を、元の取得時刻のまま保存する場合に指定）
+        """
+        encoded = json.dumps(self._encode(value), ensure_ascii=False)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, stored_at, value) VALUES (?, ?, ?, ?)",
+                    (self.namespace, str(key), self._clock() - age, encoded)
+                )
+        except sqlite3.Error:
+            pass  # キャッシュは補助的なものなので失敗しても処理を続ける
+    
+    def delete(self, key: Hashable) -> None:
+        """
+        キャッシュからエントリを削除
+        
+        Args:
+            key: キー
+        """
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, str(key))
+                )
+        except sqlite3.Error:
+            pass
+    
+    def prune(self, older_than: float) -> int:
+        """
+        指定した秒数より古いエントリを削除
+        
+        Args:
+            older_than: 経過秒数
+            
+        Returns:
+            削除した件数
+        """
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND stored_at < ?",
+                    (self.namespace, self._clock() - older_than)
+                )
+        except sqlite3.Error:
+            return 0
+        self.evictions += cursor.rowcount
+        return cursor.rowcount
+    
+    def clear(self) -> None:
+        """この名前空間のすべてのエントリを削除"""
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error:
+            pass
+    
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
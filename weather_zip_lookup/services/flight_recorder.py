@@ -0,0 +1,145 @@
+"""
+直近の取得処理と遅かった取得処理のフライトレコーダー
+
+取得処理ごとにTimingsのスパン（ステージごとの所要時間、キャッシュのヒット/ミス、
+上流APIのステータス、発生したフォールバック）をメモリ上に保持し、
+分散トレーシングの仕組みがなくても、後からテールレイテンシの原因を調べられるようにします。
+直近N件はリングバッファ、遅いN件は最小ヒープで保持するため、メモリ使用量は一定です。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from .timing import Timings, TimingSpan
+
+
+# 直近・遅い順のそれぞれで保持する件数
+DEFAULT_CAPACITY = 50
+
+
+@dataclass(slots=True)
+class FlightRecord:
+    """1回の取得処理の記録"""
+    postal_code: str
+    started_at: float  # UNIX時刻
+    duration: float  # 秒
+    outcome: Union[int, str]  # HTTPステータス、または 'ok' / 例外クラス名
+    spans: list[TimingSpan]
+    
+    @property
+    def fallbacks(self) -> list[str]:
+        """発生したフォールバックの一覧"""
+        return [f"{span.name}:{span.fallback}" for span in self.spans if span.fallback is not None]
+    
+    def to_dict(self) -> dict:
+        """
+        JSONに変換できる辞書に変換
+        
+        Returns:
+            記録の内容（記録されていないスパンの項目は省略）
+        """
+        spans = []
+        for span in self.spans:
+            entry = {'name': span.name, 'duration_ms': round(span.duration * 1000, 3)}
+            for key in ('cache', 'status', 'fallback'):
+                value = getattr(span, key)
+                if value is not None:
+                    entry[key] = value
+            spans.append(entry)
+        return {
+            'postal_code': self.postal_code,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3),
+            'outcome': self.outcome,
+            'fallbacks': self.fallbacks,
+            'spans': spans,
+        }
+
+
+class FlightRecorder:
+    """直近N件と最も遅いN件の取得処理を保持するスレッドセーフなレコーダー"""
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """
+        Args:
+            capacity: 直近・遅い順のそれぞれで保持する件数
+        
+        Raises:
+            ValueError: 件数が1未満の場合
+        """
+        if capacity < 1:
+            raise ValueError(f"フライトレコーダーの件数は1以上を指定してください: {capacity}")
+        self.capacity = capacity
+        self.recorded = 0
+        self._recent: deque[FlightRecord] = deque(maxlen=capacity)
+        # (所要時間, 連番, 記録) の最小ヒープ。先頭が保持している中で最も速い記録
+        self._slowest: list[tuple[float, int, FlightRecord]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+    
+    def record(
+        self,
+        postal_code: str,
+        timings: Timings,
+        outcome: Union[int, str],
+        duration: Optional[float] = None,
+        started_at: Optional[float] = None
+    ) -> FlightRecord:
+        """
+        1回の取得処理を記録
+        
+        Args:
+            postal_code: 郵便番号
+            timings: 取得処理のスパン
+            outcome: HTTPステータス、または 'ok' / 例外クラス名
+            duration: 処理全体の所要時間（秒、省略時はスパンの合計）
+            started_at: 開始時刻（UNIX時刻、省略時は現在時刻から所要時間を引いた値）
+        
+        Returns:
+            記録したFlightRecord
+        """
+        if duration is None:
+            duration = timings.total
+        if started_at is None:
+            started_at = time.time() - duration
+        record = FlightRecord(postal_code, started_at, duration, outcome, list(timings.spans))
+        
+        with self._lock:
+            self.recorded += 1
+            self._recent.append(record)
+            entry = (duration, next(self._sequence), record)
+            if len(self._slowest) < self.capacity:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+        return record
+    
+    def snapshot(self) -> dict:
+        """
+        保持している記録を取得
+        
+        Returns:
+            'recent'（新しい順）と 'slowest'（遅い順）の記録を含む辞書
+        """
+        with self._lock:
+            recent = list(self._recent)
+            slowest = sorted(self._slowest, reverse=True)
+            recorded = self.recorded
+        return {
+            'capacity': self.capacity,
+            'recorded': recorded,
+            'recent': [record.to_dict() for record in reversed(recent)],
+            'slowest': [record.to_dict() for _, _, record in slowest],
+        }
+    
+    def clear(self) -> None:
+        """保持している記録をすべて削除"""
+        with self._lock:
+            self._recent.clear()
+            self._slowest.clear()
+            self.recorded = 0
@@ -1,7 +1,10 @@
 """出力フォーマッターの実装"""
 
-from colorama import Fore, Back, Style, init
-from ..models import WeatherData, WeatherAlert
+from typing import Callable, Iterable, Optional, TextIO
+
+from colorama import Cursor, Fore, Back, Style, init
+from ..models import AggregateWeather, WeatherData, WeatherAlert
+from .timing import Timings
 
 # coloramaの初期化（クロスプラットフォーム対応）
 init(autoreset=True)
@@ -10,6 +13,18 @@ init(autoreset=True)
 class OutputFormatter:
     """出力をフォーマットするクラス"""
     
+    # 表形式の見出し
+    TABLE_HEADER = "郵便番号     気温  降水確率  地名 / 警報"
+    
+    # 表形式で一度に書き込む行数
+    TABLE_CHUNK_SIZE = 1000
+    
+    # しきい値ごとの色（事前に連結したエスケープシーケンス）
+    _TEMP_COLORS = (Fore.BLUE, Fore.GREEN, Fore.RED)
+    _PRECIP_COLORS = (Fore.LIGHTBLACK_EX, Fore.YELLOW, Fore.RED)
+    _ALERT_COLOR = Fore.RED
+    _RESET = Style.RESET_ALL
+    
     def format_weather_output(self, weather_data: WeatherData) -> str:
         """
         天気データをフォーマット
@@ -47,6 +62,191 @@ class OutputFormatter:
         
         return "\n".join(lines)
     
+    def format_aggregate_output(self, aggregate: AggregateWeather) -> str:
+        """
+        地域の天気の集計をフォーマット
+        
+        Args:
+            aggregate: 表示する集計結果
+            
+        Returns:
+            フォーマットされた文字列
+        """
+        lines = []
+        
+        # ヘッダー
+        lines.append("=" * 50)
+        lines.append(f"地域の天気 - 郵便番号 {aggregate.prefix}*（{aggregate.postal_codes}件、{aggregate.locations}地点）")
+        lines.append("=" * 50)
+        lines.append("")
+        
+        # 気温と降水確率
+        lines.append(
+            f"気温: {self._format_temperature(aggregate.min_temperature)} 〜 "
+            f"{self._format_temperature(aggregate.max_temperature)}"
+            f"（平均 {self._format_temperature(aggregate.mean_temperature)}）"
+        )
+        lines.append(f"最大降水確率: {self._format_precipitation(aggregate.max_precipitation_probability)}")
+        
+        # 気象警報
+        if aggregate.alerts:
+            lines.append("")
+            lines.append(self._format_alerts(aggregate.alerts))
+        
+        if aggregate.failed:
+            lines.append("")
+            lines.append(f"取得できなかった郵便番号: {aggregate.failed}件")
+        
+        lines.append("")
+        lines.append("=" * 50)
+        
+        return "\n".join(lines)
+    
+    def format_summary_line(self, weather_data: WeatherData) -> str:
+        """
+        天気データを1行に要約してフォーマット（監視モード用）
+        
+        Args:
+            weather_data: 表示する天気データ
+            
+        Returns:
+            フォーマットされた1行の文字列
+        """
+        line = (
+            f"{weather_data.postal_code} {weather_data.location_name}  "
+            f"気温: {self._format_temperature(weather_data.temperature)}  "
+            f"降水確率: {self._format_precipitation(weather_data.precipitation_probability)}"
+        )
+        if weather_data.alerts:
+            alert_types = "、".join(alert.alert_type for alert in weather_data.alerts)
+            line += f"  {Fore.RED}⚠ {alert_types}{Style.RESET_ALL}"
+        return line
+    
+    def format_error_line(self, postal_code: str, message: str) -> str:
+        """
+        取得に失敗した郵便番号を1行でフォーマット（監視モード用）
+        
+        Args:
+            postal_code: 郵便番号
+            message: エラーメッセージ
+            
+        Returns:
+            フォーマットされた1行の文字列
+        """
+        return f"{postal_code} {Fore.RED}取得失敗: {message}{Style.RESET_ALL}"
+    
+    def format_timings(self, timings: Timings) -> str:
+        """
+        ステージごとの所要時間をフォーマット（--timings 用）
+        
+        Args:
+            timings: 計測結果
+            
+        Returns:
+            1ステージ1行のフォーマットされた文字列
+        """
+        lines = ["タイミング:"]
+        for span in timings.spans:
+            lines.append(f"  {span.name:<10} {span.duration * 1000:>8.1f} ms  {span.describe()}".rstrip())
+        lines.append(f"  {'合計':<8} {timings.total * 1000:>8.1f} ms")
+        return "\n".join(lines)
+    
+    def render_table(
+        self,
+        records: Iterable[WeatherData],
+        stream: TextIO,
+        color: Optional[bool] = None,
+        header: bool = True,
+        chunk_size: int = TABLE_CHUNK_SIZE
+    ) -> int:
+        """
+        大量の天気データを1レコード1行の表形式でストリームに書き込む
+        
+        行はバッファにまとめて chunk_size 行ごとに書き込むため、
+        format_weather_output() を1件ずつ呼ぶより大幅に高速です。
+        
+        Args:
+            records: 天気データのイテラブル（ジェネレーターも可）
+            stream: 出力先のファイルオブジェクト
+            color: 色付けするかどうか（省略時は出力先がTTYの場合のみ）
+            header: 見出し行を出力するかどうか
+            chunk_size: 一度に書き込む行数
+            
+        Returns:
+            書き込んだレコード数
+        """
+        if color is None:
+            color = self.should_colorize(stream)
+        format_row = self.table_row_formatter(color)
+        
+        buffer = [self.TABLE_HEADER + "\n"] if header else []
+        count = 0
+        for record in records:
+            buffer.append(format_row(record))
+            count += 1
+            if len(buffer) >= chunk_size:
+                stream.write("".join(buffer))
+                buffer.clear()
+        
+        if buffer:
+            stream.write("".join(buffer))
+        stream.flush()
+        return count
+    
+    @staticmethod
+    def should_colorize(stream: TextIO) -> bool:
+        """
+        出力先に色を付けるべきかどうかを判定
+        
+        Args:
+            stream: 出力先
+            
+        Returns:
+            出力先がTTYの場合はTrue
+        """
+        isatty = getattr(stream, 'isatty', None)
+        return bool(isatty and isatty())
+    
+    def table_row_formatter(self, color: bool) -> Callable[[WeatherData], str]:
+        """
+        表形式の1行（改行付き）を作成する関数を返す
+        
+        色の選択に必要なエスケープシーケンスはこの時点で確定させ、
+        行ごとの処理はしきい値の比較と1回の文字列フォーマットだけにします。
+        
+        Args:
+            color: 色付けするかどうか
+            
+        Returns:
+            WeatherDataを受け取り、表の1行を返す関数
+        """
+        if color:
+            temp_cold, temp_mild, temp_hot = self._TEMP_COLORS
+            precip_low, precip_mid, precip_high = self._PRECIP_COLORS
+            alert_color, reset = self._ALERT_COLOR, self._RESET
+        else:
+            temp_cold = temp_mild = temp_hot = ""
+            precip_low = precip_mid = precip_high = ""
+            alert_color = reset = ""
+        
+        def format_row(weather_data: WeatherData) -> str:
+            temp = weather_data.temperature
+            precip = weather_data.precipitation_probability
+            temp_color = temp_cold if temp < 10 else temp_mild if temp < 25 else temp_hot
+            precip_color = precip_low if precip < 30 else precip_mid if precip < 70 else precip_high
+            
+            alerts = weather_data.alerts
+            alert_text = ""
+            if alerts:
+                alert_text = f"  {alert_color}⚠ {'、'.join([alert.alert_type for alert in alerts])}{reset}"
+            
+            return (
+                f"{weather_data.postal_code}  {temp_color}{temp:6.1f}°C{reset}  "
+                f"{precip_color}{precip:7.0f}%{reset}  {weather_data.location_name}{alert_text}\n"
+            )
+        
+        return format_row
+    
     def _format_temperature(self, temp: float) -> str:
         """
         気温をフォーマット
@@ -109,3 +309,60 @@ class OutputFormatter:
             lines.append("")
         
         return "\n".join(lines)
+
+
+class IncrementalRenderer:
+    """前回の描画内容と比較し、変化した行だけを再描画するクラス"""
+    
+    # 行全体を消去するエスケープシーケンス
+    CLEAR_LINE = "\x1b[2K"
+    
+    def __init__(self, stream: TextIO, interactive: bool = None):
+        """
+        Args:
+            stream: 出力先
+            interactive: カーソル移動で再描画するかどうか（省略時はTTYかどうかで判定）。
+                Falseの場合は変化した行だけを追記します。
+        """
+        self._stream = stream
+        if interactive is None:
+            isatty = getattr(stream, 'isatty', None)
+            interactive = bool(isatty and isatty())
+        self._interactive = interactive
+        self._lines: list[str] = []
+    
+    def render(self, lines: list[str]) -> int:
+        """
+        行を描画
+        
+        Args:
+            lines: 描画する行のリスト
+            
+        Returns:
+            実際に書き込んだ行数
+        """
+        previous = self._lines
+        
+        if len(lines) != len(previous):
+            # 初回描画または行数が変わった場合はすべて出力
+            self._stream.write("".join(f"{line}\n" for line in lines))
+            written = len(lines)
+        elif self._interactive:
+            # カーソルを変化した行まで上げて書き換え、元の位置に戻す
+            count = len(lines)
+            chunks = []
+            for index, (line, old) in enumerate(zip(lines, previous)):
+                if line != old:
+                    distance = count - index
+                    chunks.append(f"{Cursor.UP(distance)}\r{self.CLEAR_LINE}{line}{Cursor.DOWN(distance)}\r")
+            self._stream.write("".join(chunks))
+            written = len(chunks)
+        else:
+            # 端末でない場合は変化した行だけを追記
+            changed = [line for line, old in zip(lines, previous) if line != old]
+            self._stream.write("".join(f"{line}\n" for line in changed))
+            written = len(changed)
+        
+        self._stream.flush()
+        self._lines = list(lines)
+        return written
@@ -0,0 +1,157 @@
+"""
+郵便番号の存在確認用のビットセット
+
+7桁の郵便番号（0000000〜9999999）それぞれに1ビットを割り当てた約1.25MBのビットセットです。
+ローカルの郵便番号データから一度だけ構築してファイルに保存し、以降はメモリマップで読み込むため、
+起動時にCSVを読み直さず、存在確認も郵便番号の件数によらず定数時間で済みます。
+"""
+
+import mmap
+import os
+from pathlib import Path
+from typing import Iterable, Union
+
+from .postal_index import POSTAL_CODE_DIGITS, PostalIndex
+
+
+# ビットセットのビット数とバイト数
+SIZE_BITS = 10 ** POSTAL_CODE_DIGITS
+SIZE_BYTES = SIZE_BITS // 8
+
+# 郵便番号データの隣に保存するビットセットのファイルの拡張子
+BITSET_SUFFIX = '.bitset'
+
+
+class PostalBitset:
+    """
+    郵便番号ごとに1ビットを持つ存在確認用のビットセット
+    
+    ファイルから開いた場合は読み取り専用のメモリマップとして保持し、
+    複数のプロセスで同じページを共有します。
+    """
+    
+    __slots__ = ('_bits', '_mmap')
+    
+    def __init__(self, bits: Union[bytes, bytearray, mmap.mmap]):
+        """
+        Args:
+            bits: SIZE_BYTESバイトのビット列
+        
+        Raises:
+            ValueError: ビット列の長さが違う場合
+        """
+        if len(bits) != SIZE_BYTES:
+            raise ValueError(f"ビットセットの大きさは{SIZE_BYTES}バイトである必要があります: {len(bits)}")
+        self._bits = bits
+        self._mmap = bits if isinstance(bits, mmap.mmap) else None
+    
+    @classmethod
+    def from_postal_codes(cls, postal_codes: Iterable[str]) -> 'PostalBitset':
+        """
+        郵便番号の一覧からメモリ上にビットセットを構築
+        
+        Args:
+            postal_codes: 7桁の郵便番号
+        
+        Returns:
+            PostalBitset
+        """
+        bits = bytearray(SIZE_BYTES)
+        for postal_code in postal_codes:
+            code = int(postal_code)
+            bits[code >> 3] |= 1 << (code & 7)
+        return cls(bits)
+    
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> 'PostalBitset':
+        """
+        保存済みのビットセットをメモリマップで開く
+        
+        Args:
+            path: ビットセットのファイルのパス
+        
+        Returns:
+            PostalBitset
+        
+        Raises:
+            OSError: ファイルを開けない場合
+            ValueError: ファイルの大きさが違う場合
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size != SIZE_BYTES:
+                raise ValueError(f"ビットセットのファイルの大きさが不正です: {path}")
+            return cls(mmap.mmap(f.fileno(), SIZE_BYTES, access=mmap.ACCESS_READ))
+    
+    @classmethod
+    def for_dataset(cls, dataset: Union[str, Path]) -> 'PostalBitset':
+        """
+        郵便番号データに対応するビットセットを取得
+        
+        データの隣の「<データのファイル名>.bitset」がデータより新しければそれを開き、
+        なければデータから構築して保存します。保存できない場合はメモリ上のビットセットを返します。
+        郵便番号を1件も読み取れないデータ（区切り文字の誤りなど）からは構築も保存もしません。
+        
+        Args:
+            dataset: 郵便番号データのCSVのパス
+        
+        Returns:
+            PostalBitset
+        
+        Raises:
+            OSError: 郵便番号データを読み込めない場合
+            ValueError: 郵便番号データを解析できない、または郵便番号が1件もない場合
+        """
+        dataset = Path(dataset)
+        path = dataset.with_name(dataset.name + BITSET_SUFFIX)
+        try:
+            if path.stat().st_mtime >= dataset.stat().st_mtime:
+                bitset = cls.open(path)
+                if len(bitset):
+                    return bitset
+                bitset.close()  # 空のビットセットはすべての郵便番号を拒否するため作り直す
+        except (OSError, ValueError):
+            pass  # 未作成・古い・壊れている場合は作り直す
+        
+        index = PostalIndex.from_csv(dataset)
+        if not len(index):
+            raise ValueError(f"郵便番号データに有効な郵便番号がありません: {dataset}")
+        bitset = cls.from_postal_codes(index)
+        try:
+            bitset.save(path)
+        except OSError:
+            return bitset
+        return cls.open(path)
+    
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        ビットセットをファイルに保存（一時ファイルに書き込んでから置き換える）
+        
+        Args:
+            path: 保存先のパス
+        
+        Raises:
+            OSError: 書き込めない場合
+        """
+        path = Path(path)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            temporary.write_bytes(self._bits)
+            os.replace(temporary, path)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+            raise
+    
+    def close(self) -> None:
+        """メモリマップを閉じる"""
+        if self._mmap is not None:
+            self._mmap.close()
+    
+    def __contains__(self, postal_code: str) -> bool:
+        if len(postal_code) != POSTAL_CODE_DIGITS or not postal_code.isdigit():
+            return False
+        code = int(postal_code)
+        return bool(self._bits[code >> 3] & (1 << (code & 7)))
+    
+    def __len__(self) -> int:
+        """登録されている郵便番号の件数"""
+        return int.from_bytes(self._bits, 'little').bit_count()
@@ -0,0 +1,220 @@
+"""
+ローカルの郵便番号データから構築する、前方一致検索用のソート済みインデックス
+
+日本郵便の郵便番号データ（KEN_ALL.CSV、Shift_JIS/UTF-8）または
+「郵便番号,地名」の2列のCSVを読み込み、郵便番号を整数としてソート済みの型付き配列に格納します。
+前方一致は二分探索による範囲の特定だけで済むため、件数によらず数マイクロ秒で応答できます。
+"""
+
+import csv
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+
+# 郵便番号の桁数
+POSTAL_CODE_DIGITS = 7
+
+# KEN_ALL.CSVの列（郵便番号、都道府県名、市区町村名、町域名）
+_KEN_ALL_CODE = 2
+_KEN_ALL_NAME = slice(6, 9)
+
+# KEN_ALL.CSVで町域名の代わりに記載される文言
+_KEN_ALL_NO_TOWN = '以下に掲載がない場合'
+
+
+def _normalize_postal_code(value: str) -> Optional[str]:
+    """ハイフンを除いた7桁の郵便番号、形式が違う場合はNone"""
+    code = value.strip().replace('-', '')
+    if len(code) == POSTAL_CODE_DIGITS and code.isascii() and code.isdigit():
+        return code
+    return None
+
+
+def _parse_row(row: list[str]) -> Optional[tuple[str, str]]:
+    """
+    CSVの1行から郵便番号と地名を取り出す
+    
+    Args:
+        row: CSVの1行
+    
+    Returns:
+        (郵便番号, 地名)、郵便番号の行でなければNone
+    """
+    if len(row) >= _KEN_ALL_NAME.stop and _normalize_postal_code(row[_KEN_ALL_CODE]):
+        prefecture, city, town = row[_KEN_ALL_NAME]
+        town = '' if town == _KEN_ALL_NO_TOWN else town.split('（', 1)[0]
+        return _normalize_postal_code(row[_KEN_ALL_CODE]), f"{prefecture}{city}{town}"
+    if row:
+        code = _normalize_postal_code(row[0])
+        if code is not None:
+            return code, row[1].strip() if len(row) > 1 else ''
+    return None
+
+
+class PostalIndex:
+    """
+    郵便番号と地名をソート済みの型付き配列で保持する前方一致検索用のインデックス
+    
+    郵便番号は整数の配列、地名は重複を除いた一覧へのインデックスとして格納します。
+    同じ郵便番号が複数回現れた場合は最初の地名を使います。
+    """
+    
+    __slots__ = ('_codes', '_location_ids', '_locations')
+    
+    def __init__(self, entries: Iterable[tuple[str, str]] = ()):
+        """
+        Args:
+            entries: (7桁の郵便番号, 地名) の組
+        
+        Raises:
+            ValueError: 郵便番号が7桁の数字でない場合
+        """
+        names: dict[int, str] = {}
+        for postal_code, location_name in entries:
+            code = _normalize_postal_code(postal_code)
+            if code is None:
+                raise ValueError(f"郵便番号は7桁の数字である必要があります: {postal_code}")
+            names.setdefault(int(code), location_name)
+        
+        self._codes = array('I', sorted(names))
+        self._location_ids = array('I')
+        self._locations: list[str] = []
+        location_index: dict[str, int] = {}
+        for code in self._codes:
+            name = names[code]
+            location_id = location_index.get(name)
+            if location_id is None:
+                location_id = location_index[name] = len(self._locations)
+                self._locations.append(name)
+            self._location_ids.append(location_id)
+    
+    @classmethod
+    def from_csv(cls, path: Union[str, Path], encoding: Optional[str] = None) -> 'PostalIndex':
+        """
+        郵便番号データのCSVからインデックスを構築
+        
+        KEN_ALL.CSV形式（3列目が郵便番号、7〜9列目が都道府県・市区町村・町域）と、
+        1列目が郵便番号・2列目が地名のCSVに対応します。郵便番号でない行（見出しなど）は読み飛ばします。
+        
+        Args:
+            path: CSVファイルのパス
+            encoding: 文字コード（省略時はUTF-8、読めなければShift_JIS）
+        
+        Returns:
+            PostalIndex
+        
+        Raises:
+            OSError: ファイルを読み込めない場合
+        """
+        path = Path(path)
+        if encoding is None:
+            try:
+                return cls.from_csv(path, 'utf-8-sig')
+            except UnicodeDecodeError:
+                return cls.from_csv(path, 'cp932')
+        
+        with path.open(encoding=encoding, newline='') as f:
+            entries = [entry for entry in map(_parse_row, csv.reader(f)) if entry is not None]
+        return cls(entries)
+    
+    def _range(self, prefix: str) -> tuple[int, int]:
+        """
+        前方一致する郵便番号の配列上の範囲
+        
+        Args:
+            prefix: 0〜7桁の数字
+        
+        Returns:
+            (開始位置, 終了位置) の半開区間
+        
+        Raises:
+            ValueError: 前方一致の条件が数字でない、または7桁を超える場合
+        """
+        if len(prefix) > POSTAL_CODE_DIGITS or (prefix and not (prefix.isascii() and prefix.isdigit())):
+            raise ValueError(f"郵便番号の前方一致は7桁以内の数字で指定してください: {prefix}")
+        scale = 10 ** (POSTAL_CODE_DIGITS - len(prefix))
+        low = int(prefix or 0) * scale
+        return bisect_left(self._codes, low), bisect_left(self._codes, low + scale)
+    
+    def search(self, prefix: str, limit: int = 10) -> list[tuple[str, str]]:
+        """
+        前方一致する郵便番号と地名を郵便番号順に取得
+        
+        Args:
+            prefix: 郵便番号の先頭の数字（0〜7桁）
+            limit: 返す最大件数
+        
+        Returns:
+            (郵便番号, 地名) のリスト
+        
+        Raises:
+            ValueError: 前方一致の条件が不正な場合
+        """
+        start, stop = self._range(prefix)
+        stop = min(stop, start + max(0, limit))
+        return [
+            (f"{self._codes[index]:07d}", self._locations[self._location_ids[index]])
+            for index in range(start, stop)
+        ]
+    
+    def postal_codes(self, prefix: str) -> list[str]:
+        """
+        前方一致するすべての郵便番号を郵便番号順に取得
+        
+        Args:
+            prefix: 郵便番号の先頭の数字（0〜7桁）
+        
+        Returns:
+            郵便番号のリスト
+        
+        Raises:
+            ValueError: 前方一致の条件が不正な場合
+        """
+        start, stop = self._range(prefix)
+        return [f"{code:07d}" for code in self._codes[start:stop]]
+    
+    def count(self, prefix: str) -> int:
+        """
+        前方一致する郵便番号の件数
+        
+        Args:
+            prefix: 郵便番号の先頭の数字（0〜7桁）
+        
+        Returns:
+            件数
+        
+        Raises:
+            ValueError: 前方一致の条件が不正な場合
+        """
+        start, stop = self._range(prefix)
+        return stop - start
+    
+    def location_name(self, postal_code: str) -> Optional[str]:
+        """
+        郵便番号の地名
+        
+        Args:
+            postal_code: 7桁の郵便番号
+        
+        Returns:
+            地名、登録されていない場合はNone
+        """
+        code = _normalize_postal_code(postal_code)
+        if code is None:
+            return None
+        index = bisect_left(self._codes, int(code))
+        if index < len(self._codes) and self._codes[index] == int(code):
+            return self._locations[self._location_ids[index]]
+        return None
+    
+    def __contains__(self, postal_code: str) -> bool:
+        return self.location_name(postal_code) is not None
+    
+    def __len__(self) -> int:
+        return len(self._codes)
+    
+    def __iter__(self) -> Iterator[str]:
+        for code in self._codes:
+            yield f"{code:07d}"
@@ -0,0 +1,71 @@
+"""上流APIへのリクエストレート制限"""
+
+import threading
+import time
+from typing import Callable
+
+
+class RateLimiter:
+    """トークンバケット方式のスレッドセーフなレートリミッター"""
+    
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            rate: 1秒あたりに補充されるトークン数
+            burst: バケットの容量（連続して送信できる最大リクエスト数）
+            clock: 現在時刻を返す関数（テスト用に差し替え可能）
+            sleep: 待機に使う関数（テスト用に差し替え可能）
+        
+        Raises:
+            ValueError: rateまたはburstが正でない場合
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rateは正の値、burstは1以上である必要があります")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = clock()
+    
+    @classmethod
+    def per_minute(cls, calls: int, **kwargs) -> 'RateLimiter':
+        """
+        1分あたりの呼び出し回数からレートリミッターを作成
+        
+        Args:
+            calls: 1分あたりの最大呼び出し回数
+            **kwargs: コンストラクタに渡す追加の引数
+            
+        Returns:
+            RateLimiter
+        """
+        kwargs.setdefault('burst', max(1, calls // 6))
+        return cls(calls / 60.0, **kwargs)
+    
+    def acquire(self) -> float:
+        """
+        トークンを1つ取得（不足している場合は補充されるまで待機）
+        
+        Returns:
+            待機した秒数
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            
+            # トークンを前借りし、不足分の補充時間だけ待つ
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        
+        if wait > 0:
+            self._sleep(wait)
+        return wait
@@ -0,0 +1,246 @@
+"""
+取得済みの座標の空間インデックス
+
+郵便番号の座標をgeohashのセルごとに保持し、指定した距離以内の郵便番号を近い順に返します。
+天気データのキャッシュにない郵便番号を、近くのキャッシュ済みの観測値で答えるために使います。
+"""
+
+import math
+import threading
+from typing import Optional
+
+
+# geohashで使う32進数の文字
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# 地球の平均半径（km）
+EARTH_RADIUS_KM = 6371.0088
+
+# 緯度1度あたりの距離（km）
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# セルの精度（geohashの文字数）の範囲
+MIN_PRECISION = 1
+MAX_PRECISION = 9
+
+
+def encode_geohash(lat: float, lon: float, precision: int) -> str:
+    """
+    緯度経度をgeohashに変換
+    
+    Args:
+        lat: 緯度
+        lon: 経度
+        precision: 文字数
+    
+    Returns:
+        geohash文字列
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # 偶数番目のビットは経度
+    while len(chars) < precision:
+        coordinate, bounds = (lon, lon_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            bounds[0] = middle
+        else:
+            value <<= 1
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """
+    geohashのセルの大きさ
+    
+    Args:
+        precision: 文字数
+    
+    Returns:
+        (緯度方向の度数, 経度方向の度数)
+    """
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    2点間の大円距離
+    
+    Args:
+        lat1, lon1: 1点目の緯度経度
+        lat2, lon2: 2点目の緯度経度
+    
+    Returns:
+        距離（km）
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    郵便番号の座標をgeohashのセルごとに保持するスレッドセーフな空間インデックス
+    
+    検索では中心のセルと、半径を覆うのに必要な周囲のセルだけを調べます。
+    セルが細かいほど調べる候補は少なくなりますが、調べるセルの数は増えます。
+    """
+    
+    def __init__(self, precision: int = 5):
+        """
+        Args:
+            precision: セルの精度（geohashの文字数。5で約5km四方）
+        
+        Raises:
+            ValueError: 精度が範囲外の場合
+        """
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"精度は{MIN_PRECISION}から{MAX_PRECISION}の範囲で指定してください: {precision}")
+        self.precision = precision
+        self._cell_lat, self._cell_lon = cell_size(precision)
+        self._cells: dict[str, dict[str, tuple[float, float]]] = {}
+        self._locations: dict[str, str] = {}  # 郵便番号 -> セル
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def for_distance(cls, distance_km: float) -> 'SpatialIndex':
+        """
+        検索する距離に合ったセルの精度でインデックスを作成
+        
+        セルの短い辺が距離以上になる最も細かい精度を選ぶため、
+        通常は中心と隣接する8セルだけを調べれば済みます。
+        
+        Args:
+            distance_km: 検索する最大距離（km）
+        
+        Returns:
+            SpatialIndex
+        """
+        precision = MIN_PRECISION
+        for candidate in range(MIN_PRECISION, MAX_PRECISION + 1):
+            lat_degrees, lon_degrees = cell_size(candidate)
+            # 経度方向は中緯度（45度）での長さで見積もる
+            shortest = min(lat_degrees, lon_degrees * math.cos(math.radians(45))) * _KM_PER_DEGREE
+            if shortest < distance_km:
+                break
+            precision = candidate
+        return cls(precision)
+    
+    def add(self, postal_code: str, lat: float, lon: float) -> None:
+        """
+        郵便番号の座標を追加（既にあれば更新）
+        
+        Args:
+            postal_code: 郵便番号
+            lat: 緯度
+            lon: 経度
+        """
+        cell = encode_geohash(lat, lon, self.precision)
+        with self._lock:
+            previous = self._locations.get(postal_code)
+            if previous is not None and previous != cell:
+                self._discard(postal_code, previous)
+            self._cells.setdefault(cell, {})[postal_code] = (lat, lon)
+            self._locations[postal_code] = cell
+    
+    def remove(self, postal_code: str) -> None:
+        """
+        郵便番号を削除
+        
+        Args:
+            postal_code: 郵便番号
+        """
+        with self._lock:
+            cell = self._locations.pop(postal_code, None)
+            if cell is not None:
+                self._discard(postal_code, cell)
+    
+    def _discard(self, postal_code: str, cell: str) -> None:
+        members = self._cells.get(cell)
+        if members is not None:
+            members.pop(postal_code, None)
+            if not members:
+                del self._cells[cell]
+    
+    def nearby(
+        self,
+        lat: float,
+        lon: float,
+        max_distance_km: float,
+        limit: Optional[int] = None
+    ) -> list[tuple[float, str]]:
+        """
+        指定した距離以内の郵便番号を近い順に取得
+        
+        Args:
+            lat: 中心の緯度
+            lon: 中心の経度
+            max_distance_km: 最大距離（km）
+            limit: 返す最大件数（省略時はすべて）
+        
+        Returns:
+            (距離km, 郵便番号) のリスト（近い順）
+        """
+        # 半径を覆うのに必要なセルの数（経度方向は緯度が高いほど短くなる）
+        lat_steps = math.ceil(max_distance_km / (self._cell_lat * _KM_PER_DEGREE))
+        lon_km = self._cell_lon * _KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6)
+        lon_steps = min(math.ceil(max_distance_km / lon_km), int(360 / self._cell_lon))
+        
+        # 調べるセルが登録済みのセルより多ければ、登録済みのセルをすべて調べる方が速い
+        if (2 * lat_steps + 1) * (2 * lon_steps + 1) > len(self._cells):
+            cells = None
+        else:
+            cells = set()
+            for lat_step in range(-lat_steps, lat_steps + 1):
+                cell_lat = lat + lat_step * self._cell_lat
+                if not -90.0 <= cell_lat <= 90.0:
+                    continue
+                for lon_step in range(-lon_steps, lon_steps + 1):
+                    cell_lon = (lon + lon_step * self._cell_lon + 180.0) % 360.0 - 180.0
+                    cells.add(encode_geohash(cell_lat, cell_lon, self.precision))
+        
+        with self._lock:
+            if cells is None:
+                candidates = [
+                    (postal_code, point)
+                    for members in self._cells.values()
+                    for postal_code, point in members.items()
+                ]
+            else:
+                candidates = [
+                    (postal_code, point)
+                    for cell in cells
+                    for postal_code, point in self._cells.get(cell, {}).items()
+                ]
+        
+        results = []
+        for postal_code, (point_lat, point_lon) in candidates:
+            distance = haversine_km(lat, lon, point_lat, point_lon)
+            if distance <= max_distance_km:
+                results.append((distance, postal_code))
+        results.sort()
+        return results if limit is None else results[:limit]
+    
+    def __len__(self) -> int:
+        return len(self._locations)
+    
+    def __contains__(self, postal_code: str) -> bool:
+        return postal_code in self._locations
@@ -0,0 +1,161 @@
+"""
+天気データ取得のステージごとの計測
+
+get_weather_by_postal_code の各ステージ（ジオコーディング、現在の天気、One Call など）を
+軽量なスパンで囲み、所要時間・キャッシュのヒット/ミス・上流APIのステータスを記録します。
+Webでは Server-Timing ヘッダー、CLIでは --timings で出力します。
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Union
+
+
+@dataclass(slots=True)
+class TimingSpan:
+    """1ステージの計測結果"""
+    name: str
+    duration: float = 0.0  # 秒
+    cache: Optional[str] = None  # 'hit' / 'miss' / 'negative'（見つからなかったことを記録済み）
+    status: Optional[Union[int, str]] = None  # 上流APIのHTTPステータス、または例外時は 'error'
+    fallback: Optional[str] = None  # 失敗を握りつぶして代替の値で続行した場合の理由
+    
+    def describe(self) -> str:
+        """
+        キャッシュ・ステータス・フォールバックを "cache=hit status=200" の形式で返す
+        
+        Returns:
+            説明文字列（どちらも記録されていない場合は空文字列）
+        """
+        parts = []
+        if self.cache is not None:
+            parts.append(f"cache={self.cache}")
+        if self.status is not None:
+            parts.append(f"status={self.status}")
+        if self.fallback is not None:
+            parts.append(f"fallback={self.fallback}")
+        return ' '.join(parts)
+
+
+# 現在開いているスパン（上流APIのステータスを記録するため）
+_current_span: ContextVar[Optional[TimingSpan]] = ContextVar('current_span', default=None)
+
+
+def current_span() -> Optional[TimingSpan]:
+    """
+    現在のコンテキストで開いているスパンを取得
+    
+    Returns:
+        TimingSpan、計測していない場合はNone
+    """
+    return _current_span.get()
+
+
+def note_fallback(reason: str) -> None:
+    """
+    現在のスパンにフォールバックが発生したことを記録
+    
+    計測していない場合は何もしません。同じスパンで複数回発生した場合は最初の理由を残します。
+    
+    Args:
+        reason: フォールバックの理由（'onecall_failed' など）
+    """
+    span = _current_span.get()
+    if span is not None and span.fallback is None:
+        span.fallback = reason
+
+
+class Timings:
+    """1回の取得処理におけるスパンの記録（スレッド間で共有しない）"""
+    
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            clock: 時刻を返す関数（テスト用に差し替え可能）
+        """
+        self.spans: list[TimingSpan] = []
+        self._clock = clock
+    
+    @contextmanager
+    def span(self, name: str) -> Iterator[TimingSpan]:
+        """
+        処理をスパンで囲んで所要時間を記録
+        
+        スパン内で例外が発生し、ステータスが記録されていなければ 'error' とします。
+        
+        Args:
+            name: ステージ名（Server-Timingのメトリクス名として使える英数字）
+        
+        Yields:
+            記録中のTimingSpan（cache/statusを設定できる）
+        """
+        span = TimingSpan(name)
+        self.spans.append(span)
+        token = _current_span.set(span)
+        started = self._clock()
+        try:
+            yield span
+        except BaseException:
+            if span.status is None:
+                span.status = 'error'
+            raise
+        finally:
+            span.duration = self._clock() - started
+            _current_span.reset(token)
+    
+    @property
+    def total(self) -> float:
+        """全スパンの所要時間の合計（秒）"""
+        return sum(span.duration for span in self.spans)
+    
+    def to_server_timing(self) -> str:
+        """
+        Server-Timingヘッダーの値に変換
+        
+        Returns:
+            'geocode;dur=12.3;desc="cache=miss status=200", ...' 形式の文字列
+        """
+        entries = []
+        for span in self.spans:
+            entry = f"{span.name};dur={span.duration * 1000:.1f}"
+            description = span.describe()
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+class _DiscardingSpan:
+    """書き込まれても捨てるだけの共有スパンを返すコンテキストマネージャー"""
+    
+    __slots__ = ('span',)
+    
+    def __init__(self):
+        self.span = TimingSpan('')
+    
+    def __enter__(self) -> TimingSpan:
+        return self.span
+    
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+class _NullTimings:
+    """計測しない場合に使う、何も記録しないTimings（呼び出しごとの確保を避ける）"""
+    
+    spans: tuple = ()
+    total = 0.0
+    
+    def __init__(self):
+        self._context = _DiscardingSpan()
+    
+    def span(self, name: str) -> _DiscardingSpan:
+        return self._context
+    
+    def to_server_timing(self) -> str:
+        return ''
+
+
+NULL_TIMINGS = _NullTimings()
@@ -1,10 +1,23 @@
 """天気データを取得するサービスクラス"""
 
 import re
+import threading
+import time
 import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+from urllib.parse import urlsplit
 
-from ..models import WeatherData, WeatherAlert
+from .alert_matcher import AlertTypeMatcher
+from .cache import ComponentTTLCache, TTLCache
+from .rate_limiter import RateLimiter
+from .spatial_index import SpatialIndex, encode_geohash
+from .postal_index import PostalIndex
+from .postal_bitset import PostalBitset
+from .timing import NULL_TIMINGS, Timings, current_span, note_fallback
+from ..metrics import UPSTREAM_PREWARMS, UPSTREAM_PREWARM_DURATION, upstream_metrics
+from ..models import AggregateWeather, HourlyForecast, WeatherBatch, WeatherData, WeatherAlert
 from ..exceptions import (
     InvalidPostalCodeError,
     APIError,
@@ -13,6 +26,41 @@ from ..exceptions import (
 )
 
 
+# 構成要素ごとのキャッシュで扱う構成要素（気温はCurrent Weather API、降水確率と警報はOne Call API）
+COMPONENTS = ('temperature', 'precipitation', 'alerts')
+
+
+def create_component_cache(
+    temperature_ttl: float,
+    precipitation_ttl: Optional[float] = None,
+    alerts_ttl: Optional[float] = None,
+    maxsize: int = 1024
+) -> tuple[Optional[ComponentTTLCache], float]:
+    """
+    構成要素ごとのキャッシュと、まとめた天気データのキャッシュの有効期限を決める
+    
+    まとめた天気データは、最も早く期限切れになる構成要素に合わせて取得し直します。
+    
+    Args:
+        temperature_ttl: 気温の有効期限（秒）
+        precipitation_ttl: 降水確率と予報の有効期限（秒、省略時または0以下は気温と同じ）
+        alerts_ttl: 警報の有効期限（秒、省略時または0以下は気温と同じ）
+        maxsize: 保持する最大件数（郵便番号ごとに構成要素の数だけ使う）
+    
+    Returns:
+        (ComponentTTLCache, 天気データのキャッシュの有効期限)。すべての有効期限が同じ場合
+        （天気データのキャッシュで足りる）は (None, temperature_ttl)
+    """
+    ttls = {
+        'temperature': temperature_ttl,
+        'precipitation': precipitation_ttl if precipitation_ttl and precipitation_ttl > 0 else temperature_ttl,
+        'alerts': alerts_ttl if alerts_ttl and alerts_ttl > 0 else temperature_ttl,
+    }
+    if len(set(ttls.values())) == 1:
+        return None, temperature_ttl
+    return ComponentTTLCache(ttls, maxsize=maxsize), min(ttls.values())
+
+
 class WeatherService:
     """天気データを取得するサービスクラス"""
     
@@ -24,6 +72,9 @@ class WeatherService:
     # 郵便番号の正規表現パターン（7桁の数字）
     POSTAL_CODE_PATTERN = re.compile(r'^\d{7}$')
     
+    # ジオコーディングAPIが郵便番号を見つけられなかった場合のエラーメッセージ
+    NOT_FOUND_MESSAGE = "指定された郵便番号が見つかりませんでした。"
+    
     # 警報イベントのマッピング
     ALERT_TYPE_MAPPING = {
         'extreme temperature': '熱波/寒波',
@@ -36,24 +87,259 @@ class WeatherService:
         'thunderstorm': '雷',
     }
     
-    def __init__(self, api_key: str):
+    # ALERT_TYPE_MAPPINGから構築したマッチャー（初回使用時に構築）
+    _alert_type_matcher: Optional[AlertTypeMatcher] = None
+    
+    # HTTP接続プールのデフォルトサイズ（ホストごと）
+    DEFAULT_POOL_SIZE = 10
+    
+    # 上流APIのホストへの接続を事前に確立する際のタイムアウト（秒）
+    PREWARM_TIMEOUT = 5.0
+    
+    # ジオコーディング結果のキャッシュ設定（郵便番号の座標はほぼ変わらない）
+    GEOCODE_CACHE_SIZE = 10000
+    GEOCODE_CACHE_TTL = 24 * 60 * 60
+    
+    # 近くの観測値で答えた郵便番号をバックグラウンドで取得し直すスレッド数
+    REFRESH_WORKERS = 2
+    
+    # 構成要素ごとのキャッシュで扱う構成要素
+    COMPONENTS = COMPONENTS
+    
+    # 地域の集計で同じ地点とみなすセルの精度（geohashの文字数。5で約5km四方）
+    AGGREGATE_PRECISION = 5
+    
+    # 地域の集計で対象にできる郵便番号の最大数
+    MAX_AGGREGATE_POSTAL_CODES = 1000
+    
+    def __init__(
+        self,
+        api_key: str,
+        session: Optional[requests.Session] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        geocode_cache: Optional[TTLCache] = None,
+        weather_cache: Optional[TTLCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+        nearby_distance_km: Optional[float] = None,
+        postal_bitset: Optional[PostalBitset] = None,
+        negative_cache: Optional[TTLCache] = None,
+        component_cache: Optional[ComponentTTLCache] = None
+    ):
         """
         Args:
             api_key: OpenWeatherMap APIキー
+            session: 使用するHTTPセッション（省略時は接続プール付きで新規作成）
+            pool_size: 新規作成するセッションのホストごとの最大接続数
+            geocode_cache: 郵便番号→座標のキャッシュ（省略時はインメモリで新規作成）
+            weather_cache: 郵便番号→天気データのキャッシュ（省略時はキャッシュしない）
+            rate_limiter: 上流APIへのリクエストを制限するレートリミッター（省略時は制限なし）
+            base_url: 上流APIのベースURL（省略時はOpenWeatherMap。ローカルのスタブサーバーなどに向ける場合に指定）
+            nearby_distance_km: 天気データのキャッシュにない郵便番号を、この距離（km）以内にある
+                キャッシュ済みの観測値で答える（省略時または0以下は答えない）。大きいほど上流APIを
+                待たずに答えられる割合が増え、小さいほど正確になる。weather_cacheが必要
+            postal_bitset: 存在する郵便番号のビットセット（指定すると、存在しない郵便番号を
+                上流APIに問い合わせる前にInvalidPostalCodeErrorにする）
+            negative_cache: ジオコーディングAPIが404を返した郵便番号のキャッシュ（省略時は記録しない）。
+                有効期限内の同じ郵便番号は上流APIを呼ばずにAPIErrorにする
+            component_cache: 気温・降水確率（予報を含む）・警報を別々の有効期限で保持するキャッシュ
+                （省略時は保持しない）。天気データのキャッシュが期限切れになっても、期限内の構成要素は
+                再利用し、期限切れの構成要素を返す上流APIだけを呼ぶ。ttlsにはCOMPONENTSのすべてが必要で、
+                weather_cacheの有効期限は最も短い構成要素の有効期限以下にする
         
         Raises:
             MissingAPIKeyError: APIキーが空または無効な場合
+            ValueError: component_cacheに有効期限のない構成要素がある場合
         """
         if not api_key or not api_key.strip():
             raise MissingAPIKeyError("APIキーが設定されていません。OpenWeatherMapからAPIキーを取得してください。")
         self.api_key = api_key.strip()
+        self._session = session if session is not None else self._create_session(pool_size)
+        self._owns_session = session is None
+        self.geocode_cache = geocode_cache if geocode_cache is not None else TTLCache(
+            maxsize=self.GEOCODE_CACHE_SIZE,
+            ttl=self.GEOCODE_CACHE_TTL
+        )
+        self.weather_cache = weather_cache
+        self.rate_limiter = rate_limiter
+        self.postal_bitset = postal_bitset
+        self.negative_cache = negative_cache
+        if component_cache is not None and not set(self.COMPONENTS) <= component_cache.ttls.keys():
+            raise ValueError(f"構成要素のキャッシュには {', '.join(self.COMPONENTS)} の有効期限が必要です")
+        self.component_cache = component_cache
+        
+        # 近くの観測値で答える場合の空間インデックスと、正確な値を取得し直すスレッド
+        self.nearby_distance_km = nearby_distance_km if nearby_distance_km and nearby_distance_km > 0 else None
+        self.spatial_index = (
+            SpatialIndex.for_distance(self.nearby_distance_km)
+            if self.nearby_distance_km is not None and weather_cache is not None else None
+        )
+        if self.spatial_index is not None and isinstance(weather_cache, TTLCache):
+            # 天気データのキャッシュから消えた郵便番号は、近くの観測値の候補から外す
+            weather_cache.on_evict = self.spatial_index.remove
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refreshing: set[str] = set()
+        self._refresh_lock = threading.Lock()
+        self._closed = False
+        
+        if base_url:
+            # エンドポイントのパスはそのままに、スキームとホストだけを置き換える
+            base_url = base_url.rstrip('/')
+            self.GEOCODING_API_URL = base_url + urlsplit(self.GEOCODING_API_URL).path
+            self.CURRENT_WEATHER_API_URL = base_url + urlsplit(self.CURRENT_WEATHER_API_URL).path
+            self.ONE_CALL_API_URL = base_url + urlsplit(self.ONE_CALL_API_URL).path
+        
+        # エンドポイントごとのメトリクス（リクエストのたびにラベルを解決しないよう事前に取得）
+        self._upstream_metrics = {
+            self.GEOCODING_API_URL: upstream_metrics('geocode'),
+            self.CURRENT_WEATHER_API_URL: upstream_metrics('weather'),
+            self.ONE_CALL_API_URL: upstream_metrics('onecall'),
+        }
+    
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """
+        接続プール付きのHTTPセッションを作成
+        
+        同じインスタンスで複数の郵便番号を取得する場合（一括取得など）に
+        TCP/TLS接続を再利用します。セッションはスレッド間で共有されます。
+        
+        Args:
+            pool_size: ホストごとの最大接続数
+            
+        Returns:
+            設定済みのrequests.Session
+        """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def prewarm(self) -> dict[str, Optional[float]]:
+        """
+        上流APIの各ホストへの接続を確立して接続プールに入れておく
+        
+        DNS解決とTCP/TLS接続だけを行い、HTTPリクエストは送りません。ホストごとに並列に接続し、
+        結果はメトリクス（weather_zip_lookup_upstream_prewarm_*）にも記録します。
+        
+        Returns:
+            ホスト（スキーム付き） → 接続にかかった秒数（失敗した場合はNone）
+        """
+        origins = []
+        for url in (self.GEOCODING_API_URL, self.CURRENT_WEATHER_API_URL, self.ONE_CALL_API_URL):
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}"
+            if origin not in origins:
+                origins.append(origin)
+        
+        results: dict[str, Optional[float]] = {}
+        
+        def connect(origin: str) -> None:
+            host = urlsplit(origin).netloc
+            started = time.perf_counter()
+            try:
+                self._connect_pool(origin)
+            except Exception:
+                # 事前の接続は補助的なものなので、失敗しても最初のリクエストで接続すればよい
+                UPSTREAM_PREWARMS.labels(host, 'error').inc()
+                results[origin] = None
+                return
+            elapsed = time.perf_counter() - started
+            UPSTREAM_PREWARMS.labels(host, 'ok').inc()
+            UPSTREAM_PREWARM_DURATION.labels(host).set(elapsed)
+            results[origin] = elapsed
+        
+        threads = [
+            threading.Thread(target=connect, args=(origin,), name='weather-prewarm', daemon=True)
+            for origin in origins
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {origin: results.get(origin) for origin in origins}
+    
+    def prewarm_in_background(self) -> threading.Thread:
+        """
+        prewarm をバックグラウンドのスレッドで実行
+        
+        Returns:
+            開始したスレッド
+        """
+        thread = threading.Thread(target=self.prewarm, name='weather-prewarm', daemon=True)
+        thread.start()
+        return thread
+    
+    def _connection_pool(self, origin: str) -> urllib3.connectionpool.HTTPConnectionPool:
+        """
+        セッションがホストへのリクエストに使う接続プールを取得
+        
+        Args:
+            origin: スキーム付きのホスト（例: https://api.openweathermap.org）
+            
+        Returns:
+            urllib3の接続プール
+        """
+        request = requests.Request('GET', origin + '/').prepare()
+        adapter = self._session.get_adapter(request.url)
+        get_connection_with_tls_context = getattr(adapter, 'get_connection_with_tls_context', None)
+        if get_connection_with_tls_context is None:
+            # requests 2.32.2より前は、接続プールをURLから取得する
+            return adapter.get_connection(request.url)
+        return get_connection_with_tls_context(request, self._session.verify)
     
-    def get_weather_by_postal_code(self, postal_code: str) -> WeatherData:
+    def _connect_pool(self, origin: str) -> None:
+        """
+        セッションがリクエストに使うのと同じ接続プールで1本の接続を確立して返却
+        
+        urllib3には確立済みの接続をプールに入れる公開APIがないため、_get_conn/_put_conn を使います。
+        将来のバージョンで使えなくなった場合も、prewarm は失敗として記録するだけです。
+        
+        Args:
+            origin: スキーム付きのホスト（例: https://api.openweathermap.org）
+            
+        Raises:
+            OSError: 接続に失敗した場合
+            urllib3.exceptions.HTTPError: 接続に失敗した場合
+        """
+        pool = self._connection_pool(origin)
+        connection = pool._get_conn()
+        try:
+            connection.timeout = self.PREWARM_TIMEOUT
+            connection.connect()
+        finally:
+            # 接続に失敗した場合も未接続のまま返却する（次のリクエストで接続し直す）
+            pool._put_conn(connection)
+    
+    def close(self) -> None:
+        """
+        バックグラウンドで取得し直すスレッドと、作成したHTTPセッションの接続プールを閉じる
+        
+        実行中のリクエストはそのまま完了します。閉じた後は近くの観測値で答えた郵便番号を取得し直しません。
+        引数で渡されたセッションは呼び出し側が管理するため閉じません。
+        """
+        with self._refresh_lock:
+            self._closed = True
+            executor, self._refresh_executor = self._refresh_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_session:
+            self._session.close()
+    
+    def get_weather_by_postal_code(
+        self,
+        postal_code: str,
+        max_age: Optional[float] = None,
+        timings: Optional[Timings] = None
+    ) -> WeatherData:
         """
         郵便番号から天気データを取得
         
         Args:
             postal_code: 7桁の日本の郵便番号
+            max_age: キャッシュを使う場合の最大経過秒数（省略時はキャッシュのTTL）
+            timings: ステージごとの所要時間を記録する先（省略時は計測しない）
             
         Returns:
             天気データを含むWeatherDataオブジェクト
@@ -63,30 +349,369 @@ class WeatherService:
             APIError: API呼び出しが失敗した場合
             NetworkError: ネットワーク接続が失敗した場合
         """
+        if timings is None:
+            timings = NULL_TIMINGS
+        
         # 郵便番号の検証
         self._validate_postal_code(postal_code)
         
+        # キャッシュ済みの天気データがあればそのまま返す
+        if self.weather_cache is not None:
+            with timings.span('cache') as span:
+                cached = self.weather_cache.get(postal_code, max_age=max_age)
+                span.cache = 'miss' if cached is None else 'hit'
+            if cached is not None:
+                return cached
+        
         # 郵便番号を緯度経度に変換
-        lat, lon, location_name = self._convert_postal_code_to_coordinates(postal_code)
+        with timings.span('geocode'):
+            lat, lon, location_name = self._convert_postal_code_to_coordinates(postal_code)
         
-        # 現在の天気データを取得
-        weather_data = self._fetch_current_weather(lat, lon)
+        # 近くにキャッシュ済みの観測値があればそれで答え、正確な値はバックグラウンドで取得する
+        if self.spatial_index is not None:
+            with timings.span('nearby') as span:
+                nearby = self._find_nearby_weather(postal_code, lat, lon, location_name, max_age)
+                span.cache = 'miss' if nearby is None else 'hit'
+            if nearby is not None:
+                self._schedule_refresh(postal_code, lat, lon, location_name)
+                return nearby
         
-        # 気象警報を取得
-        alerts = self._fetch_weather_alerts(lat, lon)
+        return self._fetch_weather(postal_code, lat, lon, location_name, timings)
+    
+    def get_weather_by_prefix(
+        self,
+        prefix: str,
+        postal_index: PostalIndex,
+        precision: int = AGGREGATE_PRECISION,
+        workers: int = DEFAULT_POOL_SIZE,
+        timings: Optional[Timings] = None
+    ) -> AggregateWeather:
+        """
+        郵便番号の前方一致でまとめた地域の天気を取得
+        
+        対象の郵便番号をすべてジオコーディングし、座標のセル（geohash）ごとに代表の
+        郵便番号1件だけ天気を取得します。統計は地点ごとの天気データから計算します。
+        
+        Args:
+            prefix: 郵便番号の先頭の数字
+            postal_index: 対象の郵便番号を列挙するインデックス
+            precision: 同じ地点とみなすセルの精度（小さいほど粗く、取得する地点が減る）
+            workers: 並列数
+            timings: ステージごとの所要時間を記録する先（省略時は計測しない）
+            
+        Returns:
+            AggregateWeatherオブジェクト
+            
+        Raises:
+            InvalidPostalCodeError: 前方一致の条件が不正、一致する郵便番号がない、多すぎる、
+                またはすべての郵便番号で座標を取得できなかった場合
+            APIError: すべての郵便番号で取得に失敗した場合（最後のエラー）
+            NetworkError: すべての郵便番号で取得に失敗した場合（最後のエラー）
+        """
+        if timings is None:
+            timings = NULL_TIMINGS
+        
+        try:
+            postal_codes = postal_index.postal_codes(prefix)
+        except ValueError as e:
+            raise InvalidPostalCodeError(str(e))
+        if not postal_codes:
+            raise InvalidPostalCodeError(f"{prefix}で始まる郵便番号が見つかりませんでした。")
+        if len(postal_codes) > self.MAX_AGGREGATE_POSTAL_CODES:
+            raise InvalidPostalCodeError(
+                f"{prefix}で始まる郵便番号が多すぎます（{len(postal_codes)}件、最大{self.MAX_AGGREGATE_POSTAL_CODES}件）。"
+                "桁数を増やしてください。"
+            )
+        
+        failed = 0
+        last_error: Optional[Exception] = None
+        
+        def geocode(postal_code: str):
+            try:
+                return postal_code, self._convert_postal_code_to_coordinates(postal_code), None
+            except (InvalidPostalCodeError, APIError, NetworkError) as e:
+                return postal_code, None, e
+        
+        def lookup(cell_postal_codes: list[str]):
+            try:
+                return self.get_weather_by_postal_code(cell_postal_codes[0]), None
+            except (APIError, NetworkError) as e:
+                return None, e
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(postal_codes)))) as executor:
+            # 郵便番号を座標のセルごとにまとめる（ジオコーディングはキャッシュされる）
+            cells: dict[str, list[str]] = {}
+            with timings.span('geocode'):
+                for postal_code, coordinates, error in executor.map(geocode, postal_codes):
+                    if error is not None:
+                        failed += 1
+                        last_error = error
+                        continue
+                    lat, lon, _ = coordinates
+                    cells.setdefault(encode_geohash(lat, lon, precision), []).append(postal_code)
+            
+            # セルごとに1回だけ天気を取得する
+            batch = WeatherBatch()
+            with timings.span('weather'):
+                for cell_postal_codes, (weather_data, error) in zip(cells.values(), executor.map(lookup, cells.values())):
+                    if error is not None:
+                        failed += len(cell_postal_codes)
+                        last_error = error
+                        continue
+                    batch.append(weather_data)
+        
+        if not len(batch):
+            raise last_error
+        with timings.span('aggregate'):
+            return AggregateWeather.from_batch(prefix, batch, postal_codes=len(postal_codes), failed=failed)
+    
+    def _fetch_weather(
+        self,
+        postal_code: str,
+        lat: float,
+        lon: float,
+        location_name: str,
+        timings: Timings
+    ) -> WeatherData:
+        """
+        座標の天気データを上流APIから取得してキャッシュに保存
+        
+        Args:
+            postal_code: 郵便番号
+            lat: 緯度
+            lon: 経度
+            location_name: 地名
+            timings: ステージごとの所要時間を記録する先
+            
+        Returns:
+            WeatherDataオブジェクト
+            
+        Raises:
+            APIError: API呼び出しが失敗した場合
+            NetworkError: ネットワーク接続が失敗した場合
+        """
+        # 有効期限内の構成要素は再利用し、期限切れの構成要素を返す上流APIだけを呼ぶ
+        temperature = precipitation = alerts = None
+        if self.component_cache is not None:
+            temperature = self.component_cache.get_component(postal_code, 'temperature')
+            precipitation = self.component_cache.get_component(postal_code, 'precipitation')
+            alerts = self.component_cache.get_component(postal_code, 'alerts')
+        
+        # One Call APIは降水確率と警報の両方に使うため、1回だけ取得する
+        onecall_failed = False
+        with timings.span('onecall') as span:
+            if precipitation is not None and alerts is not None:
+                span.cache = 'hit'
+                onecall_data = None
+            else:
+                if self.component_cache is not None:
+                    span.cache = 'miss'
+                try:
+                    onecall_data = self._fetch_onecall_data(lat, lon)
+                except Exception:
+                    # One Call APIが失敗しても、現在の天気データは返す
+                    onecall_data = {}
+                    onecall_failed = True
+                    if span.status is None:
+                        span.status = 'error'
+                    note_fallback('onecall_failed')
+        
+        # 現在の気温を取得（降水確率はOne Call APIのレスポンスから取り出すため、ここでは取得しない）
+        with timings.span('current') as span:
+            if temperature is not None:
+                span.cache = 'hit'
+            else:
+                if self.component_cache is not None:
+                    span.cache = 'miss'
+                temperature = self._fetch_current_weather(lat, lon, onecall_data=onecall_data or {})['temperature']
+                if self.component_cache is not None:
+                    self.component_cache.set_component(postal_code, 'temperature', temperature)
+        
+        if onecall_data is not None:
+            # One Call APIが失敗した場合は、キャッシュ済みの構成要素を残し、ないものだけを空の値で補う
+            if not onecall_failed or precipitation is None:
+                # 取得済みのhourly配列を予報として保持し、予報の問い合わせで上流APIを呼ばないようにする
+                precipitation = (
+                    self._extract_precipitation_probability(onecall_data),
+                    HourlyForecast.from_onecall(onecall_data.get('hourly') or ())
+                )
+            
+            # 気象警報を取得
+            if not onecall_failed or alerts is None:
+                with timings.span('alerts'):
+                    alerts = self._fetch_weather_alerts(lat, lon, onecall_data=onecall_data)
+            
+            # One Call APIが失敗した場合は、次の問い合わせで取得し直すため保存しない
+            if self.component_cache is not None and not onecall_failed:
+                self.component_cache.set_component(postal_code, 'precipitation', precipitation)
+                self.component_cache.set_component(postal_code, 'alerts', alerts)
         
         # WeatherDataオブジェクトを構築
-        return WeatherData(
+        precipitation_probability, forecast = precipitation
+        result = WeatherData(
             postal_code=postal_code,
-            temperature=weather_data['temperature'],
-            precipitation_probability=weather_data['precipitation_probability'],
+            temperature=temperature,
+            precipitation_probability=precipitation_probability,
             alerts=alerts,
-            location_name=location_name
+            location_name=location_name,
+            forecast=forecast
         )
+        
+        # One Call APIが失敗した場合は、補った値をキャッシュから返し続けないよう保存しない
+        if self.weather_cache is not None and not onecall_failed:
+            self.weather_cache.set(postal_code, result)
+            if self.spatial_index is not None:
+                self.spatial_index.add(postal_code, lat, lon)
+        
+        return result
+    
+    def _find_nearby_weather(
+        self,
+        postal_code: str,
+        lat: float,
+        lon: float,
+        location_name: str,
+        max_age: Optional[float]
+    ) -> Optional[WeatherData]:
+        """
+        最も近いキャッシュ済みの観測値から天気データを作成
+        
+        Args:
+            postal_code: 郵便番号
+            lat: 緯度
+            lon: 経度
+            location_name: 地名
+            max_age: キャッシュを使う場合の最大経過秒数（省略時はキャッシュのTTL）
+            
+        Returns:
+            近くの観測値を元にしたWeatherData（郵便番号と地名は要求されたもの）、なければNone
+        """
+        for _, neighbor in self.spatial_index.nearby(lat, lon, self.nearby_distance_km):
+            if neighbor == postal_code:
+                continue
+            cached = self.weather_cache.get(neighbor, max_age=max_age)
+            if cached is None:
+                continue
+            note_fallback(f'nearest={neighbor}')
+            return WeatherData(
+                postal_code=postal_code,
+                temperature=cached.temperature,
+                precipitation_probability=cached.precipitation_probability,
+                alerts=cached.alerts,
+                location_name=location_name,
+                forecast=cached.forecast
+            )
+        return None
+    
+    def _schedule_refresh(self, postal_code: str, lat: float, lon: float, location_name: str) -> None:
+        """
+        郵便番号の正確な天気データをバックグラウンドで取得してキャッシュに保存
+        
+        同じ郵便番号の取得が進行中であれば何もしません。
+        
+        Args:
+            postal_code: 郵便番号
+            lat: 緯度
+            lon: 経度
+            location_name: 地名
+        """
+        with self._refresh_lock:
+            if self._closed or postal_code in self._refreshing:
+                return
+            self._refreshing.add(postal_code)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=self.REFRESH_WORKERS,
+                    thread_name_prefix='weather-refresh'
+                )
+        
+        def refresh():
+            try:
+                self._fetch_weather(postal_code, lat, lon, location_name, NULL_TIMINGS)
+            except Exception:
+                # 取得できなければ、次の問い合わせで改めて取得する
+                pass
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(postal_code)
+        
+        self._refresh_executor.submit(refresh)
 
+    def get_hourly_forecast(
+        self,
+        postal_code: str,
+        hours: Optional[int] = None,
+        max_age: Optional[float] = None,
+        timings: Optional[Timings] = None
+    ) -> HourlyForecast:
+        """
+        郵便番号から1時間ごとの予報を取得
+        
+        天気データと同じOne Call APIのレスポンスから構築するため、天気データが
+        キャッシュされていれば上流APIを呼び出しません。
+        
+        Args:
+            postal_code: 7桁の日本の郵便番号
+            hours: 取得する時間数（省略時は取得できたすべて、最大48時間）
+            max_age: キャッシュを使う場合の最大経過秒数（省略時はキャッシュのTTL）
+            timings: ステージごとの所要時間を記録する先（省略時は計測しない）
+        
+        Returns:
+            HourlyForecast（One Call APIが失敗していた場合は空）
+        
+        Raises:
+            InvalidPostalCodeError: 郵便番号が無効な場合
+            APIError: API呼び出しが失敗した場合
+            NetworkError: ネットワーク接続が失敗した場合
+        """
+        weather_data = self.get_weather_by_postal_code(postal_code, max_age=max_age, timings=timings)
+        forecast = weather_data.forecast if weather_data.forecast is not None else HourlyForecast()
+        return forecast if hours is None else forecast.head(hours)
+    
+    def _http_get(self, url: str, params: dict) -> requests.Response:
+        """
+        上流APIにGETリクエストを送信（レート制限を適用）
+        
+        Args:
+            url: リクエスト先のURL
+            params: クエリパラメータ
+            
+        Returns:
+            レスポンス
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        
+        metrics = self._upstream_metrics.get(url)
+        if metrics is None:
+            metrics = upstream_metrics('other')
+        metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            response = self._session.get(url, params=params, timeout=10)
+        except requests.exceptions.Timeout:
+            metrics.timeouts.inc()
+            metrics.requests('timeout').inc()
+            raise
+        except requests.exceptions.RequestException:
+            metrics.requests('error').inc()
+            raise
+        finally:
+            metrics.duration.observe(time.perf_counter() - started)
+            metrics.in_flight.dec()
+        
+        metrics.requests(response.status_code).inc()
+        if response.status_code == 429:
+            metrics.rate_limited.inc()
+        
+        span = current_span()
+        if span is not None:
+            span.status = response.status_code
+        return response
+    
     def _validate_postal_code(self, postal_code: str) -> None:
         """
-        郵便番号の形式を検証
+        郵便番号の形式と、ビットセットがある場合は存在を検証
         
         Args:
             postal_code: 検証する郵便番号
@@ -99,6 +724,9 @@ class WeatherService:
         
         if not self.POSTAL_CODE_PATTERN.match(postal_code):
             raise InvalidPostalCodeError("無効な郵便番号形式です。7桁の数字を入力してください。")
+        
+        if self.postal_bitset is not None and postal_code not in self.postal_bitset:
+            raise InvalidPostalCodeError(f"郵便番号 {postal_code} は存在しません。")
     
     def _convert_postal_code_to_coordinates(self, postal_code: str) -> tuple[float, float, str]:
         """
@@ -114,23 +742,34 @@ class WeatherService:
             APIError: API呼び出しが失敗した場合
             NetworkError: ネットワーク接続が失敗した場合
         """
+        cached = self.geocode_cache.get(postal_code)
+        span = current_span()
+        if span is not None:
+            span.cache = 'miss' if cached is None else 'hit'
+        if cached is not None:
+            return cached
+        
+        # 見つからなかったことを覚えている郵便番号は上流APIに問い合わせない
+        if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+            if span is not None:
+                span.cache = 'negative'
+            raise APIError(self.NOT_FOUND_MESSAGE)
+        
         params = {
             'zip': f'{postal_code},JP',
             'appid': self.api_key
         }
         
         try:
-            response = requests.get(
-                self.GEOCODING_API_URL,
-                params=params,
-                timeout=10
-            )
+            response = self._http_get(self.GEOCODING_API_URL, params)
             
             # HTTPステータスコードのチェック
             if response.status_code == 401:
                 raise APIError("無効なAPIキーです。設定を確認してください。")
             elif response.status_code == 404:
-                raise APIError("指定された郵便番号が見つかりませんでした。")
+                if self.negative_cache is not None:
+                    self.negative_cache.set(postal_code, True)
+                raise APIError(self.NOT_FOUND_MESSAGE)
             elif response.status_code == 429:
                 raise APIError("APIレート制限を超えました。しばらく待ってから再試行してください。")
             elif 500 <= response.status_code < 600:
@@ -139,7 +778,9 @@ class WeatherService:
             response.raise_for_status()
             
             data = response.json()
-            return data['lat'], data['lon'], data.get('name', '不明')
+            coordinates = (data['lat'], data['lon'], data.get('name', '不明'))
+            self.geocode_cache.set(postal_code, coordinates)
+            return coordinates
             
         except requests.exceptions.Timeout:
             raise NetworkError("ネットワーク接続に失敗しました。インターネット接続を確認してください。")
@@ -150,13 +791,14 @@ class WeatherService:
         except (KeyError, ValueError) as e:
             raise APIError(f"APIレスポンスの解析に失敗しました: {str(e)}")
 
-    def _fetch_current_weather(self, lat: float, lon: float) -> dict:
+    def _fetch_current_weather(self, lat: float, lon: float, onecall_data: Optional[dict] = None) -> dict:
         """
         現在の天気データを取得
         
         Args:
             lat: 緯度
             lon: 経度
+            onecall_data: 取得済みのOne Call APIのレスポンス（省略時は降水確率のために取得する）
             
         Returns:
             temperature と precipitation_probability を含む辞書
@@ -174,11 +816,7 @@ class WeatherService:
         }
         
         try:
-            response = requests.get(
-                self.CURRENT_WEATHER_API_URL,
-                params=params,
-                timeout=10
-            )
+            response = self._http_get(self.CURRENT_WEATHER_API_URL, params)
             
             # HTTPステータスコードのチェック
             if response.status_code == 401:
@@ -197,19 +835,15 @@ class WeatherService:
             # 気温を取得
             temperature = data['main']['temp']
             
-            # 降水確率を取得（Current Weather APIには含まれていないため、0をデフォルトとする）
-            # 実際の降水確率はOne Call APIから取得する必要がある
-            precipitation_probability = 0.0
-            
-            # One Call APIから降水確率を取得
-            try:
-                onecall_data = self._fetch_onecall_data(lat, lon)
-                if 'hourly' in onecall_data and len(onecall_data['hourly']) > 0:
-                    # 次の1時間の降水確率を取得
-                    precipitation_probability = onecall_data['hourly'][0].get('pop', 0.0) * 100
-            except Exception:
-                # One Call APIが失敗しても、現在の天気データは返す
-                pass
+            # 降水確率はCurrent Weather APIには含まれていないため、One Call APIから取得する
+            if onecall_data is None:
+                try:
+                    onecall_data = self._fetch_onecall_data(lat, lon)
+                except Exception:
+                    # One Call APIが失敗しても、現在の天気データは返す
+                    onecall_data = {}
+                    note_fallback('onecall_failed')
+            precipitation_probability = self._extract_precipitation_probability(onecall_data)
             
             return {
                 'temperature': temperature,
@@ -250,11 +884,7 @@ class WeatherService:
         }
         
         try:
-            response = requests.get(
-                self.ONE_CALL_API_URL,
-                params=params,
-                timeout=10
-            )
+            response = self._http_get(self.ONE_CALL_API_URL, params)
             
             # HTTPステータスコードのチェック
             if response.status_code == 401:
@@ -277,13 +907,30 @@ class WeatherService:
         except requests.exceptions.RequestException as e:
             raise NetworkError(f"ネットワーク接続に失敗しました: {str(e)}")
 
-    def _fetch_weather_alerts(self, lat: float, lon: float) -> list[WeatherAlert]:
+    @staticmethod
+    def _extract_precipitation_probability(onecall_data: dict) -> float:
+        """
+        One Call APIのレスポンスから次の1時間の降水確率を取り出す
+        
+        Args:
+            onecall_data: One Call APIのレスポンス辞書
+            
+        Returns:
+            降水確率（%）、データがない場合は0
+        """
+        hourly = onecall_data.get('hourly')
+        if hourly:
+            return hourly[0].get('pop', 0.0) * 100
+        return 0.0
+    
+    def _fetch_weather_alerts(self, lat: float, lon: float, onecall_data: Optional[dict] = None) -> list[WeatherAlert]:
         """
         気象警報データを取得
         
         Args:
             lat: 緯度
             lon: 経度
+            onecall_data: 取得済みのOne Call APIのレスポンス（省略時は取得する）
             
         Returns:
             警報データのリスト
@@ -294,7 +941,8 @@ class WeatherService:
         """
         try:
             # One Call APIから警報データを取得
-            onecall_data = self._fetch_onecall_data(lat, lon)
+            if onecall_data is None:
+                onecall_data = self._fetch_onecall_data(lat, lon)
             
             alerts = []
             if 'alerts' in onecall_data:
@@ -315,9 +963,11 @@ class WeatherService:
         except (APIError, NetworkError):
             # API呼び出しが失敗した場合は空のリストを返す
             # 警報データは必須ではないため
+            note_fallback('alerts_failed')
             return []
         except Exception:
             # その他のエラーも空のリストを返す
+            note_fallback('alerts_failed')
             return []
     
     def _map_alert_type(self, event: str) -> str:
@@ -330,10 +980,22 @@ class WeatherService:
         Returns:
             日本語の警報タイプ
         """
-        # 部分一致で検索
-        for key, value in self.ALERT_TYPE_MAPPING.items():
-            if key in event:
-                return value
+        # 部分一致で検索（マッピングで先に定義されたキーを優先）
+        return self._get_alert_type_matcher().map_event(event)
+    
+    @classmethod
+    def _get_alert_type_matcher(cls) -> AlertTypeMatcher:
+        """
+        ALERT_TYPE_MAPPINGのマッチャーを取得
+        
+        ALERT_TYPE_MAPPINGに別の辞書が代入された場合（サブクラスでの上書きを含む）は
+        作り直します。辞書をその場で変更した場合は反映されません。
         
-        # マッピングが見つからない場合は元のイベント名を返す
-        return event.title()
+        Returns:
+            AlertTypeMatcher
+        """
+        matcher = cls._alert_type_matcher
+        if matcher is None or matcher.mapping is not cls.ALERT_TYPE_MAPPING:
+            matcher = AlertTypeMatcher(cls.ALERT_TYPE_MAPPING)
+            cls._alert_type_matcher = matcher
+        return matcher